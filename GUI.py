@@ -1,21 +1,29 @@
 # app.py
 # pip install streamlit pandas python-dateutil
 import json
+import math
+import os
 import time
 from datetime import datetime, timedelta, timezone
 from dateutil import tz
 import pandas as pd
 import streamlit as st
-from concurrent.futures import ThreadPoolExecutor
 
 # сбор новостей
 from collect_news import fetch_news_sync
-# обработка новостей
-from src.news_precessor import NewsProcessor
 from src.data_struct.news import NewsStruct
+# фоновые задачи сбора/обработки с прогрессом и отменой
+from src.job_manager import ACTIVE_STATUSES, CANCELLED, FAILED, JobManager, get_shared
+# выгрузки собираются по запросу и один раз на версию результата
+from src.exports import EXPORT_FORMATS, ExportCache
+# результаты run_pipeline.py
+from src.news_store import NewsStore
 
 st.set_page_config(page_title="News Collector", layout="wide")
 TZ = tz.gettz("Europe/Berlin")
+# обработка из GUI пишет снимок и архив сюжетов отдельно от run_pipeline.py
+GUI_SNAPSHOT_DIR = "gui_clusters_snapshot"
+GUI_ARCHIVE_DIR = "gui_stories_archive"
 
 # -------- helpers --------
 def _combine_local_to_utc(d, t):
@@ -29,14 +37,92 @@ def _init_state():
             "https://www.kommersant.ru/RSS/news.xml",
             "https://lenta.ru/rss/top7",
         ]
-    if "results" not in st.session_state:
-        st.session_state.results = []
-    if "clusters" not in st.session_state:
-        st.session_state.clusters = []
-    if "processor_ready" not in st.session_state:
-        st.session_state.processor_ready = False
+    # в сессии только id задач, результаты хранит JobManager
+    if "news_job" not in st.session_state:
+        st.session_state.news_job = None
+    if "clusters_job" not in st.session_state:
+        st.session_state.clusters_job = None
+
+@st.cache_resource
+def _open_store(path: str) -> NewsStore:
+    # одно соединение на процесс: перезапуски скрипта его не пересоздают
+    return NewsStore(path)
+
+@st.cache_resource
+def _job_manager() -> JobManager:
+    # один пул на процесс: задачи переживают перезапуски скрипта, тёплый процессор общий для всех вкладок
+    return JobManager(workers=2)
+
+def _make_processor():
+    # импорт здесь: для просмотра хранилища модели и клиент LLM не нужны
+    from src.news_processor import NewsProcessor
+    # свои папки: снимок и архив run_pipeline.py (clusters_snapshot, stories_archive) GUI только читает
+    return NewsProcessor(archive_dir=GUI_ARCHIVE_DIR, snapshot_dir=GUI_SNAPSHOT_DIR)
+
+def _collect_job(feeds, store, progress=None, cancel_event=None, **fetch_kwargs):
+    items = fetch_news_sync(feeds, progress=progress, cancel_event=cancel_event, **fetch_kwargs)
+    # просмотр новостей идёт через хранилище
+    store.upsert_news(items)
+    return items
+
+def _process_job(items, progress=None, cancel_event=None):
+    news_processor = get_shared("news_processor", _make_processor)
+    # конвертация в NewsStruct
+    news_structs = [NewsStruct(n.get("published"), n.get("url"), n.get("title"), n.get("text")) for n in items]
+    # процессор внутри пишет свои промежуточные файлы; возвращает список кластеров
+    return news_processor.process_news(news_structs, progress=progress, cancel_event=cancel_event)
+
+def _load_news_job(store, since, until, limit, progress=None, cancel_event=None):
+    return store.query(since=since, until=until, limit=limit)
+
+def _load_clusters_job(clusters_path, progress=None, cancel_event=None):
+    if not os.path.exists(clusters_path):
+        return []
+    with open(clusters_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@st.cache_resource
+def _export_cache() -> ExportCache:
+    return ExportCache()
+
+def _export_buttons(name: str, version, rows: list, formats=("json", "ndjson", "csv", "parquet")):
+    # файл пишется потоково на диск только по кнопке; версия - id задачи, давшей результат
+    cache = _export_cache()
+    for col, fmt in zip(st.columns(len(formats)), formats):
+        path = cache.get(name, version, fmt)
+        if path is None and col.button(f"Подготовить {fmt.upper()}", key=f"export_{name}_{fmt}",
+                                       use_container_width=True):
+            try:
+                path = cache.build(name, version, fmt, rows)
+            except ImportError as e:
+                col.error(str(e))
+        if path is not None:
+            extension, mime = EXPORT_FORMATS[fmt]
+            with open(path, "rb") as f:
+                col.download_button(f"Скачать {fmt.upper()}", data=f, file_name=f"{name}.{extension}", mime=mime,
+                                    key=f"download_{name}_{fmt}", use_container_width=True)
+
+PHASE_STATUS = {"running": "идёт", "finished": "готово", "cancelled": "остановлено"}
+JOB_STATUS = {"queued": "в очереди", "running": "выполняется"}
+
+def _render_progress(phases: dict):
+    # по строке на фазу: готово/всего, скачано, запросов к LLM в работе, время
+    for name, phase in phases.items():
+        total = phase["total"]
+        if total:
+            fraction = min(1.0, phase["done"] / total)
+        else:
+            fraction = 1.0 if phase["status"] == "finished" else 0.0
+        parts = [f"{phase['done']}/{total}" if total is not None else str(phase["done"])]
+        if phase["bytes"]:
+            parts.append(f"{phase['bytes'] / 2 ** 20:.1f} МБ")
+        if phase["llm_in_flight"]:
+            parts.append(f"запросов к LLM: {phase['llm_in_flight']}")
+        parts.append(f"{phase['seconds']:.1f} с")
+        st.progress(fraction, text=f"{name} ({PHASE_STATUS[phase['status']]}): {', '.join(parts)}")
 
 _init_state()
+manager = _job_manager()
 
 st.title("News Collector GUI")
 
@@ -99,14 +185,35 @@ with st.sidebar:
         max_per_domain = st.slider("MAX_PER_DOMAIN", 50, 2000, 800, step=50)
         title_sim_threshold = st.slider("TITLE_SIM_THRESHOLD", 70, 100, 92, step=1)
 
+    # Хранилище, которое заполняет run_pipeline.py
+    with st.expander("Хранилище", expanded=False):
+        store_path = st.text_input("Файл хранилища", value="news_store.sqlite")
+        snapshot_dir = st.text_input("Папка снимка кластеров", value="clusters_snapshot")
+        run_load = st.button("Загрузить из хранилища", use_container_width=True,
+                             disabled=not os.path.exists(store_path))
+
     run_collect = st.button("Собрать новости", type="primary", use_container_width=True)
     run_process = st.button("Обработать новости (кластеризация)", use_container_width=True)
+    if st.button("Остановить", use_container_width=True):
+        # сбор/обработка прерываются между новостями, задачи из очереди не запускаются
+        manager.cancel(st.session_state.news_job)
+        manager.cancel(st.session_state.clusters_job)
 
 # -------- входные --------
 feeds = st.session_state.feeds
 since_dt = _combine_local_to_utc(since_date, since_time)
 until_dt = _combine_local_to_utc(until_date, until_time)
 
+# -------- просмотр результатов run_pipeline.py --------
+if run_load:
+    if since_dt >= until_dt:
+        st.error("Начало периода должно быть раньше конца.")
+    else:
+        st.session_state.news_job = manager.submit("load_news", _load_news_job, _open_store(store_path),
+                                                   since_dt.timestamp(), until_dt.timestamp(), total_limit)
+        st.session_state.clusters_job = manager.submit("load_clusters", _load_clusters_job,
+                                                       os.path.join(snapshot_dir, "clusters.json"))
+
 # -------- сбор новостей с лоадером --------
 if run_collect:
     if not feeds:
@@ -114,115 +221,100 @@ if run_collect:
     elif since_dt >= until_dt:
         st.error("Начало периода должно быть раньше конца.")
     else:
-        status = st.empty()
-        bar = st.progress(0)
-        note = st.empty()
-
-        def _collect_task():
-            return fetch_news_sync(
-                feeds,
-                since=since_dt,
-                until=until_dt,
-                per_feed_limit=per_feed_limit,
-                total_limit=total_limit,
-                article_workers=article_workers,
-                max_per_domain=max_per_domain,
-                title_sim_threshold=title_sim_threshold,
-            )
-
-        with ThreadPoolExecutor(max_workers=1) as pool:
-            future = pool.submit(_collect_task)
-            phase = 0
-            phases = ["Получение лент", "Фильтрация", "Дедупликация", "Загрузка текстов"]
-            while not future.done():
-                phase = (phase + 1) % len(phases)
-                status.markdown(f"**{phases[phase]}...**")
-                for p in range(0, 101, 10):
-                    if future.done():
-                        break
-                    bar.progress(p)
-                    time.sleep(0.06)
-                note.caption("Идёт сбор. При большом числе источников это дольше обычного.")
-            try:
-                st.session_state.results = future.result()
-                st.session_state.processor_ready = False
-                st.session_state.clusters = []
-            finally:
-                bar.progress(100)
-                status.markdown("**Готово**")
-                note.empty()
-
-        st.success(f"Найдено: {len(st.session_state.results)}")
+        st.session_state.news_job = manager.submit(
+            "collect", _collect_job, feeds, _open_store(store_path),
+            since=since_dt,
+            until=until_dt,
+            per_feed_limit=per_feed_limit,
+            total_limit=total_limit,
+            article_workers=article_workers,
+            max_per_domain=max_per_domain,
+            title_sim_threshold=title_sim_threshold,
+        )
+        st.session_state.clusters_job = None
 
 # -------- обработка новостей (кластеризация) --------
 if run_process:
-    if not st.session_state.results:
+    news_for_processing = manager.result(st.session_state.news_job, [])
+    if not news_for_processing:
         st.error("Сначала соберите новости.")
     else:
-        proc_status = st.empty()
-        proc_bar = st.progress(0)
-        proc_note = st.empty()
-
-        def _process_task(items: list[dict]):
-            # конвертация в NewsStruct
-            news_structs = []
-            for n in items:
-                news_structs.append(
-                    NewsStruct(
-                        n.get("published"),
-                        n.get("url"),
-                        n.get("title"),
-                        n.get("text"),
-                    )
-                )
-            np = NewsProcessor()
-            # процессор внутри пишет свои промежуточные файлы; возвращает список кластеров
-            return np.process_news(news_structs)
-
-        with ThreadPoolExecutor(max_workers=1) as pool:
-            future = pool.submit(_process_task, st.session_state.results)
-            ticks = 0
-            while not future.done():
-                ticks = (ticks + 10) % 100
-                proc_status.markdown("**Анализ кластеров...**")
-                proc_bar.progress(ticks)
-                proc_note.caption("NE, классификация компаний, эмбеддинги, DBSCAN, суммаризация…")
-                time.sleep(0.2)
+        # процессор один на процесс, его задачи выполняются по очереди
+        st.session_state.clusters_job = manager.submit("process", _process_job, news_for_processing,
+                                                       exclusive=True)
 
-            try:
-                st.session_state.clusters = future.result()
-                st.session_state.processor_ready = True
-            finally:
-                proc_bar.progress(100)
-                proc_status.markdown("**Готово**")
-                proc_note.empty()
-
-        st.success(f"Кластеров: {len(st.session_state.clusters)}")
+# -------- фоновые задачи --------
+# скрипт не ждёт задачи: пока они идут, страница перерисовывается с их прогрессом
+jobs_running = False
+for job_key, job_title in (("news_job", "Новости"), ("clusters_job", "Кластеры")):
+    job_info = manager.poll(st.session_state[job_key])
+    if job_info is None:
+        continue
+    if job_info["status"] in ACTIVE_STATUSES:
+        jobs_running = True
+        st.markdown(f"**{job_title}:** {JOB_STATUS[job_info['status']]} ({job_info['job_id']})")
+        _render_progress(job_info["phases"])
+    elif job_info["status"] == FAILED:
+        st.error(f"{job_title}: ошибка {job_info['error']}")
+    elif job_info["status"] == CANCELLED:
+        st.warning(f"{job_title}: остановлено.")
 
 # -------- раздел Новости --------
+# фильтрация, сортировка и постраничный вывод выполняются в SQLite, на экране только одна страница,
+# текст загружается только для открытой новости
 st.subheader("Новости")
-results = st.session_state.results
-if results:
-    df = pd.DataFrame(results)
-    for i, row in df.iterrows():
-        title = row.get("title") or "Без заголовка"
-        with st.expander(f"{i+1}. {title}", expanded=False):
+results = manager.result(st.session_state.news_job, [])
+SORT_COLUMNS = {"Дата": "published_ts", "Домен": "domain", "Заголовок": "title", "Кластер": "story_id"}
+if os.path.exists(store_path):
+    store = _open_store(store_path)
+    f1, f2, f3 = st.columns([3, 1, 2])
+    domains_filter = f1.multiselect("Домены", [d for d, _ in store.domains()])
+    ticker_filter = f2.text_input("Тикер", placeholder="SBER")
+    text_filter = f3.text_input("Поиск по тексту", placeholder="слова из заголовка или текста")
+    s1, s2, s3, s4 = st.columns([2, 1, 1, 1])
+    sort_label = s1.selectbox("Сортировка", list(SORT_COLUMNS))
+    descending = s2.selectbox("Порядок", ["По убыванию", "По возрастанию"]) == "По убыванию"
+    page_size = s3.selectbox("На странице", [25, 50, 100, 200], index=1)
+    page = s4.number_input("Страница", min_value=1, value=1, step=1)
+
+    rows, total = store.page(since=since_dt.timestamp(), until=until_dt.timestamp(), domains=domains_filter,
+                             ticker=ticker_filter, text_query=text_filter, order_by=SORT_COLUMNS[sort_label],
+                             descending=descending, offset=(page - 1) * page_size, limit=page_size)
+    n_pages = max(1, math.ceil(total / page_size))
+    if page > n_pages:
+        st.caption(f"Страницы {page} нет, всего страниц: {n_pages}")
+    elif rows:
+        st.caption(f"Найдено: {total}, страница {page} из {n_pages}")
+        table = pd.DataFrame(rows)[["published", "domain", "title", "tickers", "story_id", "url"]]
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
+        opened = st.selectbox("Открыть новость", [None] + list(range(len(rows))),
+                              format_func=lambda i: "—" if i is None else (rows[i]["title"] or "Без заголовка"))
+        if opened is not None:
+            row = store.get(rows[opened]["url"])
             st.markdown(f"**Опубликовано:** {row.get('published')}")
             st.markdown(f"**Источник:** {row.get('source')}")
-            if row.get("url"):
-                st.markdown(f"[Ссылка на материал]({row.get('url')})")
+            st.markdown(f"[Ссылка на материал]({row.get('url')})")
             if row.get("error"):
                 st.caption(f"Ошибка разбора: {row['error']}")
-            st.text_area("Текст", row.get("text") or "", height=280, key=f"text_{i}")
+            st.text_area("Текст", row.get("text") or "", height=280, key=f"text_{row['id']}")
+    else:
+        st.caption("Ничего не найдено.")
 else:
     st.caption("Нет данных. Сначала соберите новости.")
 
 # -------- раздел Кластеры --------
 st.subheader("Кластеры")
-clusters = st.session_state.clusters
+clusters = manager.result(st.session_state.clusters_job, [])
 if clusters:
     # clusters: [{"headline","hotness","why_now","entities","sources","timeline","draft","dedup_group"}]
-    cdf = pd.DataFrame(clusters)
+    CLUSTERS_PAGE_SIZE = 20
+    n_cluster_pages = max(1, math.ceil(len(clusters) / CLUSTERS_PAGE_SIZE))
+    cluster_page = st.number_input("Страница кластеров", min_value=1, max_value=n_cluster_pages, value=1, step=1)
+    st.caption(f"Кластеров: {len(clusters)}, страница {cluster_page} из {n_cluster_pages}")
+    first_cluster = (cluster_page - 1) * CLUSTERS_PAGE_SIZE
+    cdf = pd.DataFrame(clusters[first_cluster:first_cluster + CLUSTERS_PAGE_SIZE],
+                       index=range(first_cluster, min(len(clusters), first_cluster + CLUSTERS_PAGE_SIZE)))
     for idx, row in cdf.iterrows():
         with st.expander(f"{idx+1}. {row.get('headline') or 'Без заголовка'}", expanded=False):
             st.markdown(f"**Hotness:** {row.get('hotness')}")
@@ -246,18 +338,17 @@ if clusters:
                 st.code(row.get("draft"))
 
     with st.expander("Экспорт кластеров", expanded=False):
-        clusters_json = json.dumps(clusters, ensure_ascii=False, indent=2).encode("utf-8")
-        st.download_button("Скачать JSON кластеров", data=clusters_json, file_name="news_clusters.json", mime="application/json")
+        _export_buttons("news_clusters", st.session_state.clusters_job, clusters)
 else:
     st.caption("Кластеров нет. Нажмите «Обработать новости (кластеризация)».")
 
 # -------- Экспорт новостей --------
 with st.expander("Экспорт новостей", expanded=False):
     if results:
-        json_bytes = json.dumps(results, ensure_ascii=False, indent=2).encode("utf-8")
-        st.download_button("Скачать JSON новостей", data=json_bytes, file_name="news.json", mime="application/json")
-        df = pd.DataFrame(results)
-        csv_bytes = df.to_csv(index=False).encode("utf-8")
-        st.download_button("Скачать CSV новостей", data=csv_bytes, file_name="news.csv", mime="text/csv")
+        _export_buttons("news", st.session_state.news_job, results)
     else:
         st.caption("Экспорт недоступен. Сначала соберите новости.")
+
+if jobs_running:
+    time.sleep(0.5)
+    st.experimental_rerun()
@@ -0,0 +1,129 @@
+# python -m benchmarks.clustering_benchmark --sizes 1000 10000 --output clustering_benchmark_results.json
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
+
+from benchmarks.synthetic_news import make_news_embeddings
+from src.clusterization_step import Clasterizator
+from src.neural_gas import BatchNeuralGas, NeuralGas
+from src.online_clustering import OnlineClusterizator
+
+
+def _dbscan(eps: float) -> Callable:
+    def fit_predict(data):
+        return DBSCAN(eps=eps, min_samples=2).fit_predict(data["embeddings"])
+
+    return fit_predict
+
+
+def _clasterizator(data):
+    return Clasterizator().fit_predict(data["embeddings"])
+
+
+def _neural_gas(data):
+    n_units = max(2, len(set(data["labels"].tolist())))
+    return BatchNeuralGas(n_units=n_units, max_iter=20, random_state=42).fit_predict(data["embeddings"])
+
+
+def _neural_gas_reference(data):
+    n_units = max(2, len(set(data["labels"].tolist())))
+    return NeuralGas(n_units=n_units, max_iter=5, random_state=42).fit(data["embeddings"]).labels_
+
+
+def _online(data):
+    labels = OnlineClusterizator().partial_fit_predict(list(data["embeddings"]), None,
+                                                       data["timestamps"].tolist())
+    # single-article stories are reported as noise, like DBSCAN with min_samples=2 does
+    sizes = np.bincount(labels)
+    return np.where(sizes[labels] > 1, labels, -1)
+
+
+# name -> (fit_predict, max number of items the backend is run on)
+BACKENDS: Dict[str, tuple] = {
+    "dbscan": (_dbscan(3.0), 50000),
+    "dbscan_eps_0.6": (_dbscan(0.6), 50000),
+    "clasterizator": (_clasterizator, 50000),
+    "neural_gas": (_neural_gas, 200000),
+    "neural_gas_reference": (_neural_gas_reference, 2000),
+    "online": (_online, 1000000),
+}
+
+
+def duplicate_recall(labels: np.ndarray, duplicate_of: np.ndarray) -> float:
+    """Share of (duplicate, original) pairs put into the same cluster, noise label -1 never matches"""
+    duplicates = np.flatnonzero(duplicate_of >= 0)
+    if len(duplicates) == 0:
+        return float("nan")
+    same = (labels[duplicates] == labels[duplicate_of[duplicates]]) & (labels[duplicates] != -1)
+    return float(same.mean())
+
+
+def run_backend(name: str, fit_predict: Callable, data: Dict[str, np.ndarray]) -> dict:
+    tracemalloc.start()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    labels = np.asarray(fit_predict(data))
+    wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    true_labels = data["labels"]
+    return {
+        "backend": name,
+        "n_items": len(labels),
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "items_per_s": len(labels) / wall if wall > 0 else float("inf"),
+        "peak_memory_mb": peak / 2 ** 20,
+        "n_clusters": len(set(labels.tolist()) - {-1}),
+        "n_true_stories": len(set(true_labels.tolist()) - {-1}),
+        "ari": adjusted_rand_score(true_labels, labels),
+        "nmi": normalized_mutual_info_score(true_labels, labels),
+        "duplicate_recall": duplicate_recall(labels, data["duplicate_of"]),
+    }
+
+
+def run_benchmark(sizes: List[int], backends: List[str], **generator_kwargs) -> List[dict]:
+    results = []
+    for size in sizes:
+        data = make_news_embeddings(n_items=size, **generator_kwargs)
+        for name in backends:
+            fit_predict, max_items = BACKENDS[name]
+            if size > max_items:
+                print(f"{name}: skipped for {size} items (limit {max_items})")
+                continue
+            row = run_backend(name, fit_predict, data)
+            row.update(generator_kwargs)
+            print(", ".join(f"{k}: {v:.4f}" if isinstance(v, float) else f"{k}: {v}" for k, v in row.items()))
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clustering quality/speed benchmark on synthetic news embeddings")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--n-features", type=int, default=384)
+    parser.add_argument("--mean-story-size", type=float, default=8.0)
+    parser.add_argument("--story-spread", type=float, default=0.5)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--noise-rate", type=float, default=0.2)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--output", default="clustering_benchmark_results.json")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.backends, n_features=args.n_features,
+                            mean_story_size=args.mean_story_size, story_spread=args.story_spread,
+                            duplicate_rate=args.duplicate_rate, noise_rate=args.noise_rate,
+                            random_state=args.random_state)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
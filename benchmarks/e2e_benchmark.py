@@ -0,0 +1,148 @@
+# python -m benchmarks.e2e_benchmark --sizes 1000 10000 100000 --llm-latency 0.01 --output e2e_benchmark_results.json
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.fake_services import FAKE_TICKERS, FakeLLM, HashingEmbeddingsExtractor, SyntheticFeedServer
+from benchmarks.synthetic_news import make_news_corpus
+from src.data_struct.news import NewsStruct
+from src.metrics import METRICS
+from src.news_processor import NewsProcessor
+
+
+def collect(items: List[dict], n_feeds: int, article_workers: int, title_sim_threshold: int) -> List[dict]:
+    """fetch_news against the local feed server, returns fetch_news items"""
+    # imported here, so larger scales can run without the collection dependencies
+    from collect_news import fetch_news_sync
+
+    with SyntheticFeedServer(items, n_feeds=n_feeds) as server:
+        return fetch_news_sync(server.feed_urls, since=datetime.fromtimestamp(items[0]["published"], timezone.utc),
+                               until=datetime.fromtimestamp(items[-1]["published"] + 1, timezone.utc),
+                               per_feed_limit=len(items), total_limit=len(items), max_per_domain=len(items),
+                               article_workers=article_workers, title_sim_threshold=title_sim_threshold)
+
+
+def direct_items(items: List[dict]) -> List[dict]:
+    """The corpus in fetch_news output format, for scales where collection is skipped"""
+    return [{"title": x["title"], "url": f"http://127.0.0.1/article/{i}",
+             "published": datetime.fromtimestamp(x["published"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+             "source": "synthetic", "text": x["text"], "error": None} for i, x in enumerate(items)]
+
+
+def process(fetched: List[dict], args, work_dir: str, tag: str) -> Dict[str, int]:
+    """Run NewsProcessor with the fake LLM and embeddings, returns story id of every url"""
+    news_processor = NewsProcessor(
+        online=True, story_horizon=timedelta(hours=args.time_span_hours + 1),
+        archive_dir=os.path.join(work_dir, f"archive_{tag}"), snapshot_dir=os.path.join(work_dir, f"snapshot_{tag}"),
+        gpt_model=FakeLLM(args.llm_latency, args.llm_jitter), emb_extr=HashingEmbeddingsExtractor(),
+        tickers=FAKE_TICKERS)
+    news_structs_list = [NewsStruct(x["published"], x["url"], x["title"] or "", x["text"])
+                         for x in fetched if x.get("text")]
+    news_processor.process_news_pipelined(news_structs_list, llm_workers=args.llm_workers,
+                                          embed_batch_size=args.embed_batch_size,
+                                          summary_workers=args.summary_workers)
+    url_story = dict()
+    for story_id, cluster_list in news_processor.clusters_dict.items():
+        for news_struct in cluster_list:
+            url_story[news_struct.source_link] = int(story_id)
+    return url_story
+
+
+def _agreement(first: Dict[str, int], second: Dict[str, int]) -> Optional[float]:
+    urls = sorted(set(first) & set(second))
+    if not urls:
+        return None
+    return float(adjusted_rand_score([first[x] for x in urls], [second[x] for x in urls]))
+
+
+def run_scale(n_items: int, args) -> dict:
+    print(f"=== {n_items} news ===")
+    start_timestamp = time.time() - args.time_span_hours * 3600
+    items = make_news_corpus(n_items, time_span_hours=args.time_span_hours, start_timestamp=start_timestamp,
+                             random_state=args.random_state)
+    result = {"n_items": n_items}
+    METRICS.reset()
+    with tempfile.TemporaryDirectory() as work_dir:
+        # NewsProcessor writes its snapshot and story archive under work_dir (see process)
+        total_start = time.perf_counter()
+        if n_items <= args.max_fetch_items:
+            fetch_start = time.perf_counter()
+            fetched = collect(items, args.n_feeds, args.article_workers, args.title_sim_threshold)
+            fetch_time = time.perf_counter() - fetch_start
+            result["fetch"] = {"items": len(fetched), "seconds": fetch_time,
+                               "items_per_second": len(fetched) / fetch_time if fetch_time else None,
+                               "with_text": sum(1 for x in fetched if x.get("text"))}
+        else:
+            fetched = direct_items(items)
+            result["fetch"] = None
+        process_start = time.perf_counter()
+        url_story = process(fetched, args, work_dir, "main")
+        process_time = time.perf_counter() - process_start
+        total_time = time.perf_counter() - total_start
+        report = METRICS.report()
+
+        # every noise news is its own story
+        truth = {f"/article/{i}": x["label"] if x["label"] >= 0 else -1 - i for i, x in enumerate(items)}
+        url_truth = {url: truth[url[url.index("/article/"):]] for url in url_story}
+        result.update({
+            "processed": len(url_story),
+            "n_stories": len(set(url_story.values())),
+            "process_seconds": process_time,
+            "process_items_per_second": len(url_story) / process_time if process_time else None,
+            "total_seconds": total_time,
+            "total_items_per_second": len(url_story) / total_time if total_time else None,
+            "stages": report["stages"],
+            "llm": {name: {"calls": x["calls"], "prompt_tokens": x["prompt_tokens"],
+                           "completion_tokens": x["completion_tokens"], "p95_latency": x["latency"]["p95"]}
+                    for name, x in report["llm"].items()},
+            "peak_memory_bytes": report["peak_memory_bytes"],
+            "ari_vs_planted": _agreement(url_story, url_truth),
+        })
+        if n_items <= args.max_stability_items:
+            # the same news in another arrival order must give the same stories
+            shuffled = list(fetched)
+            random.Random(args.random_state).shuffle(shuffled)
+            result["stability_ari"] = _agreement(url_story, process(shuffled, args, work_dir, "shuffled"))
+    print(f"{n_items}: {result['total_items_per_second']:.1f} news/s total, "
+          f"{result['process_items_per_second']:.1f} news/s processing, {result['n_stories']} stories, "
+          f"ARI {result['ari_vs_planted']:.3f}, stability {result.get('stability_ari')}, "
+          f"peak RSS {result['peak_memory_bytes'] / 2 ** 20 if result['peak_memory_bytes'] else 0:.0f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end collect -> enrich -> embed -> cluster -> summarize "
+                                                 "benchmark with a local feed server and a fake LLM")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--llm-latency", type=float, default=0.01, help="seconds per fake LLM call")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--llm-workers", type=int, default=32)
+    parser.add_argument("--summary-workers", type=int, default=16)
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    parser.add_argument("--n-feeds", type=int, default=8)
+    parser.add_argument("--article-workers", type=int, default=32)
+    parser.add_argument("--title-sim-threshold", type=int, default=92)
+    parser.add_argument("--max-fetch-items", type=int, default=10000,
+                        help="larger scales skip collection: title dedup in fetch_news is quadratic")
+    parser.add_argument("--max-stability-items", type=int, default=10000,
+                        help="larger scales skip the second (shuffled) run")
+    parser.add_argument("--time-span-hours", type=float, default=24.0)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--output", default="e2e_benchmark_results.json")
+    args = parser.parse_args()
+
+    results = {"config": vars(args), "results": [run_scale(n, args) for n in args.sizes]}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
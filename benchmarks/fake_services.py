@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Sequence
+
+import numpy as np
+
+from src.data_struct.news import NewsRecord, NewsStructEmbed
+from src.data_struct.news_batch import NewsBatch
+
+FAKE_ENTITIES = [("geo", "Россия"), ("geo", "Москва"), ("org", "ЦБ РФ"), ("org", "Минфин"),
+                 ("person", "Эльвира Набиуллина"), ("org", "Сбербанк"), ("org", "Газпром")]
+FAKE_COMPANIES = [("Сбербанк", "SBER"), ("Газпром", "GAZP"), ("Лукойл", "LKOH"), ("Яндекс", "YDEX"),
+                  ("Норникель", "GMKN"), ("Роснефть", "ROSN")]
+FAKE_INDUSTRIES = ["Banks", "Gas", "Oil", "Retail", "IT", "Metals"]
+FAKE_TICKERS = {name: ticker for name, ticker in FAKE_COMPANIES}
+
+
+class FakeUsage:
+    __slots__ = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+
+class FakeLLM:
+    """
+    Deterministic stand-in for GIGACHAT_cstm: recognizes the prompt of every extractor and answers
+    in its format, the answer depends only on the messages. Every call sleeps latency seconds
+    (+- jitter, also deterministic) to model the network round trip.
+    """
+
+    def __init__(self, latency: float = 0.01, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, system_prompt: str, seed: int) -> str:
+        if "извлеки из него имена" in system_prompt:
+            entities = [FAKE_ENTITIES[(seed >> k) % len(FAKE_ENTITIES)] for k in (0, 5)]
+            return json.dumps([{"type": t, "text": x} for t, x in dict.fromkeys(entities)], ensure_ascii=False)
+        if "на какие компании" in system_prompt:
+            name, _ = FAKE_COMPANIES[seed % len(FAKE_COMPANIES)]
+            forecast = "positive" if seed & 1 else "negative"
+            return json.dumps([{"company": name, "forecast": forecast}], ensure_ascii=False)
+        if "области экономики" in system_prompt:
+            return json.dumps([{"type": FAKE_INDUSTRIES[seed % len(FAKE_INDUSTRIES)],
+                                "forecast": "positive" if seed & 2 else "negative"}], ensure_ascii=False)
+        if "Саммаризируй" in system_prompt:
+            return f"Сводка сюжета {seed % 100000}"
+        if "по шкале от 1 до 100" in system_prompt:
+            return str(1 + seed % 100)
+        return "ok"
+
+    def process_with_usage(self, messages):
+        prompt = "\n".join(x["content"] for x in messages)
+        seed = zlib.crc32("\n".join(x["content"] for x in messages[1:]).encode("utf-8"))
+        delay = self.latency + self.jitter * ((seed % 2001) / 1000.0 - 1.0)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.calls += 1
+        answer = self._answer(messages[0]["content"], seed)
+        # ~4 characters per token
+        return answer, FakeUsage(len(prompt) // 4, len(answer) // 4)
+
+    def process(self, messages):
+        return self.process_with_usage(messages)[0]
+
+
+class HashingEmbeddingsExtractor:
+    """
+    EmbeddingsExtractor replacement without a model: hashed bag of words of header and text, unit norm.
+    News sharing most words get close embeddings, so planted stories stay clusterable.
+    """
+
+    def __init__(self, n_features: int = 384):
+        self.n_features = n_features
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        for word in text.lower().split():
+            h = zlib.crc32(word.encode("utf-8"))
+            vector[h % self.n_features] += 1.0 if h & (1 << 31) else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def extract(self, texts_list: Sequence[str]) -> List[np.ndarray]:
+        return [self._embed(x) for x in texts_list]
+
+    def extract_from_news(self, news_struct):
+        embed = self._embed(f"{news_struct.header}\n{news_struct.text}")
+        if isinstance(news_struct, NewsRecord):
+            news_struct.embedding = embed
+            return news_struct
+        return NewsStructEmbed(news_struct, embed)
+
+    def extract_from_news_list(self, news_structs_list):
+        return [self.extract_from_news(x) for x in news_structs_list]
+
+    def extract_from_batch(self, news_batch: NewsBatch) -> NewsBatch:
+        news_batch.embeddings = np.stack(self.extract([f"{h}\n{t}" for h, t in zip(news_batch.headers,
+                                                                                     news_batch.texts)]))
+        return news_batch
+
+
+class SyntheticFeedServer:
+    """
+    Local HTTP server with RSS feeds and article pages of a synthetic corpus (make_news_corpus items):
+    /feed/<k>.rss lists every n_feeds-th item, /article/<i> is an html page with the item text.
+    Use as a context manager, feed_urls are ready for fetch_news.
+    """
+
+    def __init__(self, items: Sequence[dict], n_feeds: int = 4, host: str = "127.0.0.1", port: int = 0):
+        self.items = items
+        self.n_feeds = n_feeds
+        corpus = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                body, content_type = corpus.render(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self.feed_urls = [f"{self.base_url}/feed/{k}.rss" for k in range(n_feeds)]
+
+    def article_url(self, i: int) -> str:
+        return f"{self.base_url}/article/{i}"
+
+    def render(self, path: str):
+        if path.startswith("/feed/") and path.endswith(".rss"):
+            k = int(path[len("/feed/"):-len(".rss")])
+            entries = "".join(
+                f"<item><title>{escape(x['title'])}</title><link>{self.article_url(i)}</link>"
+                f"<pubDate>{formatdate(x['published'], usegmt=True)}</pubDate></item>"
+                for i, x in enumerate(self.items) if i % self.n_feeds == k)
+            body = (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+                    f"<title>feed {k}</title><link>{self.base_url}</link>{entries}</channel></rss>")
+            return body.encode("utf-8"), "application/rss+xml; charset=utf-8"
+        if path.startswith("/article/"):
+            i = int(path[len("/article/"):])
+            if i >= len(self.items):
+                return None, None
+            x = self.items[i]
+            body = (f"<html><head><meta charset='utf-8'><title>{escape(x['title'])}</title></head><body>"
+                    f"<article><h1>{escape(x['title'])}</h1><p>{escape(x['text'])}</p></article></body></html>")
+            return body.encode("utf-8"), "text/html; charset=utf-8"
+        return None, None
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.server.shutdown()
+        self.server.server_close()
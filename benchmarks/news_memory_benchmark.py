@@ -0,0 +1,95 @@
+# python -m benchmarks.news_memory_benchmark --n-items 100000
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.data_struct.news import NewsStruct, NewsStructNE, NewsStructCompany, NewsStructEmbed, NamedEntity, \
+    IndustryEntity, CompaniesEntity, NewsRecord, intern_named_entity, intern_industry_entity, \
+    intern_companies_entity
+
+ENTITY_VOCABULARY = [("geo", "Россия"), ("geo", "Москва"), ("org", "Сбербанк"), ("org", "Газпром"),
+                     ("org", "ЦБ РФ"), ("person", "Эльвира Набиуллина"), ("org", "Минфин")]
+INDUSTRY_VOCABULARY = [("Banks", "positive"), ("Gas", "negative"), ("Oil", "positive"), ("Retail", "negative")]
+COMPANY_VOCABULARY = [("Сбербанк", "positive", "SBER"), ("Газпром", "negative", "GAZP"),
+                      ("Лукойл", "positive", "LKOH"), ("Яндекс", "negative", "YDEX")]
+
+
+def _make_inputs(n_items: int, n_features: int, random_state: int):
+    rng = random.Random(random_state)
+    texts = [f"Текст новости номер {i}" for i in range(n_items)]
+    embeddings = np.random.default_rng(random_state).standard_normal((n_items, n_features)).astype(np.float32)
+    enrichments = [
+        (rng.sample(ENTITY_VOCABULARY, 3), rng.sample(INDUSTRY_VOCABULARY, 2), rng.sample(COMPANY_VOCABULARY, 2))
+        for _ in range(n_items)
+    ]
+    return texts, embeddings, enrichments
+
+
+def _staged_pipeline(texts, embeddings, enrichments):
+    # every stage list stays alive until the end of process_news, as in NewsProcessor
+    news_list = [NewsStruct("2025-01-01T00:00:00Z", f"https://example.com/{i}", "Заголовок", text)
+                 for i, text in enumerate(texts)]
+    ne_list = [NewsStructNE(x, [NamedEntity(t, v) for t, v in entities])
+               for x, (entities, _, _) in zip(news_list, enrichments)]
+    company_list = [NewsStructCompany(x, [IndustryEntity(n, f) for n, f in industries],
+                                      [CompaniesEntity(n, f) for n, f, _ in companies],
+                                      [t for _, _, t in companies])
+                    for x, (_, industries, companies) in zip(ne_list, enrichments)]
+    embed_list = [NewsStructEmbed(x, e) for x, e in zip(company_list, embeddings)]
+    return news_list, ne_list, company_list, embed_list
+
+
+def _record_pipeline(texts, embeddings, enrichments):
+    records = [NewsRecord("2025-01-01T00:00:00Z", f"https://example.com/{i}", "Заголовок", text)
+               for i, text in enumerate(texts)]
+    for record, (entities, industries, companies), embedding in zip(records, enrichments, embeddings):
+        record.named_entities = [intern_named_entity(t, v) for t, v in entities]
+        record.industry_list = [intern_industry_entity(n, f) for n, f in industries]
+        record.companies_names_list = [intern_companies_entity(n, f) for n, f, _ in companies]
+        record.companies_tickers_list = [t for _, _, t in companies]
+        record.embedding = embedding
+    return records
+
+
+def measure(build, *inputs) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    result = build(*inputs)
+    elapsed = time.perf_counter() - start_time
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return {"build_s": elapsed, "retained_mb": current / 2 ** 20, "peak_mb": peak / 2 ** 20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of staged NewsStruct* objects vs slotted NewsRecord")
+    parser.add_argument("--n-items", type=int, default=100000)
+    parser.add_argument("--n-features", type=int, default=384)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--output", default="news_memory_benchmark_results.json")
+    args = parser.parse_args()
+
+    # article texts and embeddings are shared by both variants and allocated before measuring
+    inputs = _make_inputs(args.n_items, args.n_features, args.random_state)
+    results = {"n_items": args.n_items}
+    for name, build in [("staged", _staged_pipeline), ("record", _record_pipeline)]:
+        row = measure(build, *inputs)
+        row["bytes_per_item"] = row["retained_mb"] * 2 ** 20 / args.n_items
+        results[name] = row
+        print(f"{name}: " + ", ".join(f"{k}: {v:.2f}" for k, v in row.items()))
+    results["retained_ratio"] = results["staged"]["retained_mb"] / results["record"]["retained_mb"]
+    print(f"retained memory ratio staged/record: {results['retained_ratio']:.2f}")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
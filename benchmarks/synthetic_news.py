@@ -0,0 +1,138 @@
+from typing import Dict, List
+
+import numpy as np
+
+
+def make_news_embeddings(n_items: int = 10000, n_features: int = 384, mean_story_size: float = 8.0,
+                         story_spread: float = 0.5, duplicate_rate: float = 0.2, duplicate_spread: float = 0.05,
+                         noise_rate: float = 0.2, time_span_hours: float = 24.0,
+                         random_state: int = 42) -> Dict[str, np.ndarray]:
+    """
+    Synthetic news-like embeddings with planted stories, duplicates and noise
+
+    Embeddings are unit-norm like the output of all-MiniLM-L6-v2. Story sizes are geometric, so there are
+    many small stories and a few large ones. Members of a story are its center plus gaussian noise
+    (story_spread is the noise norm relative to the center), duplicates are near-copies of an earlier
+    member of the same story, noise items are random directions.
+
+    Parameters:
+    - n_items: Total number of embeddings
+    - n_features: Embedding dimension
+    - mean_story_size: Mean number of members per planted story
+    - story_spread: Relative spread of members around the story center
+    - duplicate_rate: Share of story members that are reprints of another member
+    - duplicate_spread: Relative spread of a duplicate around its original
+    - noise_rate: Share of items that belong to no story
+    - time_span_hours: Publication times are spread over this period
+    - random_state: Random seed
+
+    Returns:
+    - data: Dict with embeddings (n_items, n_features) float32, labels (story id, -1 for noise),
+      duplicate_of (index of the original, -1 for non-duplicates) and timestamps (seconds)
+    """
+    rng = np.random.default_rng(random_state)
+    n_noise = int(n_items * noise_rate)
+    n_story_items = n_items - n_noise
+
+    sizes = []
+    while sum(sizes) < n_story_items:
+        sizes.append(int(rng.geometric(1.0 / mean_story_size)))
+    sizes[-1] -= sum(sizes) - n_story_items
+    labels = np.repeat(np.arange(len(sizes)), sizes)
+
+    centers = rng.standard_normal((len(sizes), n_features))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    noise = rng.standard_normal((n_story_items, n_features)) * (story_spread / np.sqrt(n_features))
+    embeddings = centers[labels] + noise
+
+    duplicate_of = np.full(n_items, -1, dtype=np.int64)
+    story_starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    offsets = np.arange(n_story_items) - story_starts[labels]
+    is_duplicate = (offsets > 0) & (rng.random(n_story_items) < duplicate_rate)
+    duplicate_idx = np.flatnonzero(is_duplicate)
+    originals = story_starts[labels[duplicate_idx]] + (
+            rng.random(len(duplicate_idx)) * offsets[duplicate_idx]).astype(np.int64)
+    # a reprint of a reprint points to the first original
+    for i, original in zip(duplicate_idx, originals):
+        while duplicate_of[original] != -1:
+            original = duplicate_of[original]
+        duplicate_of[i] = original
+        embeddings[i] = embeddings[original] + rng.standard_normal(n_features) * (
+            duplicate_spread / np.sqrt(n_features))
+
+    noise_items = rng.standard_normal((n_noise, n_features))
+    embeddings = np.concatenate([embeddings, noise_items])
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    labels = np.concatenate([labels, np.full(n_noise, -1)])
+
+    timestamps = np.sort(rng.random(len(sizes))) * time_span_hours * 3600
+    timestamps = np.concatenate([
+        timestamps[labels[:n_story_items]] + rng.exponential(1800, n_story_items),
+        rng.random(n_noise) * time_span_hours * 3600
+    ])
+
+    order = rng.permutation(n_items)
+    position = np.empty(n_items, dtype=np.int64)
+    position[order] = np.arange(n_items)
+    duplicate_of = duplicate_of[order]
+    duplicate_of[duplicate_of >= 0] = position[duplicate_of[duplicate_of >= 0]]
+    return {
+        "embeddings": embeddings[order].astype(np.float32),
+        "labels": labels[order],
+        "duplicate_of": duplicate_of,
+        "timestamps": timestamps[order],
+    }
+
+
+_SYLLABLES = ["ба", "ве", "ги", "до", "жу", "за", "ки", "ло", "ми", "но", "пу", "ра", "се", "ти", "фу", "ха",
+              "це", "ча", "ши", "эк", "ют", "ям", "ор", "ин"]
+
+
+def _make_vocabulary(n_words: int, rng: np.random.Generator) -> List[str]:
+    words = set()
+    while len(words) < n_words:
+        words.add("".join(rng.choice(_SYLLABLES, size=int(rng.integers(2, 5)))))
+    return sorted(words)
+
+
+def make_news_corpus(n_items: int = 10000, mean_story_size: float = 8.0, noise_rate: float = 0.2,
+                     story_words: int = 100, own_words: int = 10, time_span_hours: float = 24.0,
+                     start_timestamp: float = 0.0, random_state: int = 42) -> List[dict]:
+    """
+    Synthetic news texts with planted stories, for the end-to-end benchmark
+
+    Members of a story share story_words words of its text and add own_words unique words,
+    noise news consist of random words only. Titles are unique.
+
+    Returns:
+    - items: Dicts with title, text, published (unix seconds from start_timestamp) and label
+      (story id, -1 for noise), ordered by publication time
+    """
+    rng = np.random.default_rng(random_state)
+    vocabulary = _make_vocabulary(20000, rng)
+    n_noise = int(n_items * noise_rate)
+    sizes = []
+    while sum(sizes) < n_items - n_noise:
+        sizes.append(int(rng.geometric(1.0 / mean_story_size)))
+    sizes[-1] -= sum(sizes) - (n_items - n_noise)
+    labels = np.concatenate([np.repeat(np.arange(len(sizes)), sizes), np.full(n_noise, -1)]).astype(np.int64)
+    story_texts = [rng.choice(vocabulary, size=story_words) for _ in sizes]
+    story_times = rng.random(len(sizes)) * time_span_hours * 3600
+
+    items = []
+    for i, label in enumerate(labels.tolist()):
+        own = rng.choice(vocabulary, size=own_words)
+        if label == -1:
+            words = rng.choice(vocabulary, size=story_words + own_words)
+            published = rng.random() * time_span_hours * 3600
+        else:
+            words = np.concatenate([story_texts[label], own])
+            published = min(story_times[label] + rng.exponential(1800), time_span_hours * 3600)
+        items.append({
+            "title": f"{' '.join(words[:4]).capitalize()} {' '.join(own[:3])} {i}",
+            "text": " ".join(words) + ".",
+            "published": start_timestamp + float(published),
+            "label": label,
+        })
+    items.sort(key=lambda x: x["published"])
+    return items
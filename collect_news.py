@@ -1,6 +1,7 @@
 # pip install aiohttp feedparser newspaper3k tqdm beautifulsoup4 lxml readability-lxml rapidfuzz requests
 
 import asyncio
+import codecs
 import time
 import re
 import urllib.parse as ul
@@ -8,6 +9,7 @@ from calendar import timegm
 from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
 from datetime import datetime, timezone
+from threading import Event
 from typing import Iterable, Optional, Sequence
 
 import aiohttp
@@ -17,9 +19,24 @@ from newspaper import Article
 from readability import Document
 from rapidfuzz.fuzz import partial_ratio
 
+from src.metrics import METRICS
+from src.progress import ProgressCallback, ProgressReporter
+
 UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
       "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
 
+# ограничения на размер ответа: больше не читаем, такие страницы пропускаются
+MAX_FEED_BYTES = 5 * 2**20
+MAX_ARTICLE_BYTES = 3 * 2**20
+CHUNK_SIZE = 64 * 2**10
+# читаем только html/xml (ленты бывают и text/plain); pdf, картинки, видео и прочее пропускаются по заголовку
+ALLOWED_CONTENT_TYPES = ("html", "xml", "rss", "atom", "text/plain")
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+# UTF-32 раньше UTF-16: BOM UTF-32 LE начинается с BOM UTF-16 LE
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF32_LE, "utf-32"), (codecs.BOM_UTF32_BE, "utf-32"),
+         (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
 # ---------- helpers ----------
 
 def _entry_timestamp(e):
@@ -48,20 +65,75 @@ def _domain(u: str) -> str:
     except Exception:
         return "unknown"
 
-async def _get(session, url, timeout=20):
+def _skip_reason(status: int, ctype: str, content_length: str | None, max_bytes: int) -> str | None:
+    """Причина не читать тело ответа (по статусу и заголовкам) или None"""
+    if status >= 400:
+        return "http_status"
+    if ctype and not any(x in ctype for x in ALLOWED_CONTENT_TYPES):
+        return "content_type"
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        return "too_large"
+    return None
+
+def _charset(content: bytes, ctype: str | None) -> str:
+    """Кодировка из BOM, затем из Content-Type и <meta charset> / <?xml encoding>, по умолчанию utf-8"""
+    # BOM надёжнее заголовка: серверы часто отдают charset по умолчанию независимо от файла
+    for bom, name in _BOMS:
+        if content.startswith(bom):
+            return name
+    candidates = []
+    m = re.search(r"charset\s*=\s*[\"']?([\w.:-]+)", ctype or "", re.I)
+    if m:
+        candidates.append(m.group(1))
+    head = content[:4096]
+    m = _META_CHARSET.search(head) or re.search(rb"""<\?xml[^>]+encoding\s*=\s*["']([\w.:-]+)""", head, re.I)
+    if m:
+        candidates.append(m.group(1).decode("ascii", "ignore"))
+    for name in candidates:
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+def _decode(content: bytes, ctype: str | None) -> str:
+    return content.decode(_charset(content, ctype), errors="replace")
+
+async def _get(session, url, timeout=20, max_bytes: int = MAX_FEED_BYTES):
+    """
+    (тело, content-type, ошибка). Тело читается потоком и не больше max_bytes; неподходящий тип,
+    слишком большой ответ или статус ошибки дают ошибку "skipped:<причина>" без повторных попыток.
+    """
+    domain = _domain(url)
     for attempt in range(3):
+        start_time = time.perf_counter()
         try:
             async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as r:
-                content = await r.read()
                 ctype = r.headers.get("Content-Type","").lower()
-                return content, ctype, None
+                reason = _skip_reason(r.status, ctype, r.headers.get("Content-Length"), max_bytes)
+                chunks, size = [], 0
+                if reason is None:
+                    async for chunk in r.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            # Content-Length нет или он неверный: обрываем чтение
+                            reason = "too_large"
+                            break
+                        chunks.append(chunk)
+                METRICS.observe_http(domain, time.perf_counter() - start_time, size)
+                if reason is not None:
+                    METRICS.skip_http(domain, reason)
+                    return None, ctype, f"skipped:{reason}"
+                return b"".join(chunks), ctype, None
         except Exception as e:
+            # каждая попытка считается отдельным запросом
+            METRICS.observe_http(domain, time.perf_counter() - start_time, error=type(e).__name__)
             if attempt == 2:
                 return None, None, str(e)
             await asyncio.sleep(0.6 * (2**attempt))
     return None, None, "unknown_error"
 
-def _discover_rss_from_html(url: str, html: bytes) -> list[str]:
+def _discover_rss_from_html(url: str, html: str | bytes) -> list[str]:
     try:
         soup = BeautifulSoup(html, "lxml")
         out = []
@@ -115,60 +187,112 @@ def _entry_to_item(feed_url, e):
         "source": feed_url,
     }
 
-def _download_article_text(url: str, lang: str = "ru") -> tuple[str, str | None, str | None]:
+def _download_html(url: str, max_bytes: int = MAX_ARTICLE_BYTES, timeout=20) -> tuple[str | None, int, str | None]:
+    """
+    (html, скачано байт, ошибка): потоковое чтение не больше max_bytes с проверкой типа содержимого.
+    timeout ограничивает и всё скачивание: таймаут requests действует на каждое чтение сокета,
+    поэтому медленно отдающий сервер иначе держал бы поток сколько угодно.
+    """
+    import requests
+
+    domain = _domain(url)
+    start_time = time.perf_counter()
+    deadline = start_time + timeout
+    size = 0
+    try:
+        with requests.get(url, headers={"User-Agent": UA}, timeout=timeout, stream=True) as r:
+            ctype = r.headers.get("Content-Type", "").lower()
+            reason = _skip_reason(r.status_code, ctype, r.headers.get("Content-Length"), max_bytes)
+            chunks = []
+            if reason is None:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        reason = "too_large"
+                        break
+                    if time.perf_counter() > deadline:
+                        reason = "timeout"
+                        break
+                    chunks.append(chunk)
+    except Exception as e:
+        METRICS.observe_http(domain, time.perf_counter() - start_time, error=f"requests_{type(e).__name__}")
+        return None, size, f"download:{e}"
+    METRICS.observe_http(domain, time.perf_counter() - start_time, size)
+    if reason is not None:
+        METRICS.skip_http(domain, reason)
+        return None, size, f"skipped:{reason}"
+    return _decode(b"".join(chunks), ctype), size, None
+
+def _download_article_text(url: str, lang: str = "ru",
+                           max_bytes: int = MAX_ARTICLE_BYTES) -> tuple[str, str | None, str | None, int]:
+    # страница скачивается один раз (с ограничением размера), newspaper3k и readability разбирают её же
+    html, n_bytes, err = _download_html(url, max_bytes)
+    if html is None:
+        return url, None, err, n_bytes
     # 1) newspaper3k
     try:
         art = Article(url, language=lang)
-        art.download(); art.parse()
+        art.download(input_html=html)
+        art.parse()
         text = (art.text or "").strip()
         if text and len(text) > 300:
-            return url, text, None
+            return url, text, None, n_bytes
     except Exception as e:
         n_err = str(e)
     else:
         n_err = "short_or_empty"
     # 2) readability
     try:
-        import requests
-        r = requests.get(url, headers={"User-Agent": UA}, timeout=20)
-        doc = Document(r.text)
+        doc = Document(html)
         html = doc.summary()
         soup = BeautifulSoup(html, "lxml")
         text = soup.get_text("\n", strip=True)
         text = re.sub(r'\n{3,}', '\n\n', text).strip()
         if text and len(text) > 300:
-            return url, text, None
-        return url, None, f"readability_short ({len(text) if text else 0})"
+            return url, text, None, n_bytes
+        return url, None, f"readability_short ({len(text) if text else 0})", n_bytes
     except Exception as e2:
-        return url, None, f"newspaper:{n_err}; readability:{e2}"
+        return url, None, f"newspaper:{n_err}; readability:{e2}", n_bytes
 
-async def _fetch_article_texts(urls: Sequence[str], lang: str = "ru", workers: int = 12) -> dict:
+async def _fetch_article_texts(urls: Sequence[str], lang: str = "ru", workers: int = 12,
+                               reporter: Optional[ProgressReporter] = None, phase: Optional[str] = None,
+                               max_bytes: int = MAX_ARTICLE_BYTES) -> dict:
     loop = asyncio.get_running_loop()
     results = {}
-    with ThreadPoolExecutor(max_workers=workers) as pool:
-        tasks = [loop.run_in_executor(pool, _download_article_text, url, lang) for url in urls]
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        tasks = [loop.run_in_executor(pool, _download_article_text, url, lang, max_bytes) for url in urls]
         for fut in asyncio.as_completed(tasks):
-            url, text, err = await fut
+            url, text, err, n_bytes = await fut
             results[url] = {"text": text, "error": err}
+            if reporter is not None:
+                reporter.advance(phase, n_bytes=n_bytes)
+    finally:
+        # при отмене не ждём очередь загрузок, только уже начатые
+        pool.shutdown(wait=True, cancel_futures=True)
     return results
 
-async def _fetch_feed_or_discover(session: aiohttp.ClientSession, feed_url: str, limit: int) -> list:
-    content, ctype, err = await _get(session, feed_url)
+async def _fetch_feed_or_discover(session: aiohttp.ClientSession, feed_url: str, limit: int,
+                                  max_bytes: int = MAX_FEED_BYTES) -> tuple[list, int]:
+    """Записи ленты (или лент, найденных на html-странице) и число скачанных байт"""
+    content, ctype, err = await _get(session, feed_url, max_bytes=max_bytes)
     if err or not content:
-        return []
+        return [], 0
+    n_bytes = len(content)
     if "xml" in (ctype or "") or b"<rss" in content[:2000] or b"<feed" in content[:2000]:
         d = feedparser.parse(content)
-        return [_entry_to_item(feed_url, e) for e in d.entries[:limit]]
-    discovered = _discover_rss_from_html(feed_url, content)
+        return [_entry_to_item(feed_url, e) for e in d.entries[:limit]], n_bytes
+    discovered = _discover_rss_from_html(feed_url, _decode(content, ctype))
     items = []
     for rss in discovered:
-        c2, ct2, err2 = await _get(session, rss)
+        c2, ct2, err2 = await _get(session, rss, max_bytes=max_bytes)
         if err2 or not c2:
             continue
+        n_bytes += len(c2)
         d2 = feedparser.parse(c2)
         if d2.entries:
             items.extend([_entry_to_item(rss, e) for e in d2.entries[:limit]])
-    return items
+    return items, n_bytes
 
 # ---------- public API for GUI ----------
 
@@ -183,73 +307,97 @@ async def fetch_news(
     max_per_domain: int = 800,
     title_sim_threshold: int = 92,
     lang: str = "ru",
-    user_agent: str = UA
+    user_agent: str = UA,
+    max_feed_bytes: int = MAX_FEED_BYTES,
+    max_article_bytes: int = MAX_ARTICLE_BYTES,
+    progress: Optional[ProgressCallback] = None,
+    cancel_event: Optional[Event] = None
 ) -> list[dict]:
     """
     Асинхронная функция для GUI.
     Вход: период времени (since/until, UTC-aware или naive как UTC) и список источников (RSS/страницы).
     Выход: список объектов новостей с полями: title, url, published, source, text, error.
+    progress получает события фаз (см. src.progress.ProgressReporter): "Получение лент",
+    "Фильтрация", "Загрузка текстов". Если установлен cancel_event, сбор прерывается с исключением Cancelled.
+    Ленты и страницы читаются потоком не больше max_feed_bytes / max_article_bytes байт, ответы не html/xml
+    пропускаются по Content-Type; счётчики пропусков по причинам — в METRICS.report()["http"][домен]["skip_reasons"].
     """
     since_ts = _to_ts(since)
     until_ts = _to_ts(until)
+    reporter = ProgressReporter(progress, cancel_event)
 
     headers = {"User-Agent": user_agent}
-    async with aiohttp.ClientSession(headers=headers) as session:
-        feed_tasks = [_fetch_feed_or_discover(session, u, per_feed_limit) for u in feeds]
-        candidates = []
-        for fut in asyncio.as_completed(feed_tasks):
-            items = await fut
-            candidates.extend(items)
-
-    # фильтр по времени
-    if since_ts is not None or until_ts is not None:
-        filtered = []
-        for it in candidates:
-            ts = it.get("published_ts") or 0
-            if since_ts is not None and ts < since_ts:
-                continue
-            if until_ts is not None and ts > until_ts:
-                continue
-            filtered.append(it)
-        candidates = filtered
+    feeds = list(feeds)
+    with METRICS.stage("Fetch feeds", len(feeds)), reporter.phase("Получение лент", len(feeds)):
+        async with aiohttp.ClientSession(headers=headers) as session:
+            feed_tasks = [asyncio.ensure_future(_fetch_feed_or_discover(session, u, per_feed_limit, max_feed_bytes))
+                          for u in feeds]
+            candidates = []
+            try:
+                for fut in asyncio.as_completed(feed_tasks):
+                    items, n_bytes = await fut
+                    candidates.extend(items)
+                    reporter.advance("Получение лент", n_bytes=n_bytes)
+            finally:
+                for task in feed_tasks:
+                    task.cancel()
 
-    # сортировка по времени
-    candidates.sort(key=lambda x: x.get("published_ts", 0), reverse=True)
+    n_candidates = len(candidates)
+    with reporter.phase("Фильтрация", n_candidates):
+        # фильтр по времени
+        if since_ts is not None or until_ts is not None:
+            filtered = []
+            for it in candidates:
+                ts = it.get("published_ts") or 0
+                if since_ts is not None and ts < since_ts:
+                    continue
+                if until_ts is not None and ts > until_ts:
+                    continue
+                filtered.append(it)
+            candidates = filtered
 
-    # дедуп по URL
-    seen_urls = set(); dedup_url = []
-    for it in candidates:
-        u = it.get("url")
-        if u and u not in seen_urls:
-            seen_urls.add(u); dedup_url.append(it)
-
-    # дедуп по заголовкам
-    picked = []; title_bank = []
-    for it in dedup_url:
-        tk = _title_key(it.get("title"))
-        if not tk:
-            picked.append(it); title_bank.append(tk); continue
-        if any(_is_similar_title(tk, tb, title_sim_threshold) for tb in title_bank if tb):
-            continue
-        picked.append(it); title_bank.append(tk)
+        # сортировка по времени
+        candidates.sort(key=lambda x: x.get("published_ts", 0), reverse=True)
 
-    # диверсификация по доменам и общий лимит
-    per_domain = defaultdict(int); diverse = []
-    for it in picked:
-        u = it.get("url")
-        if not u:
-            continue
-        d = _domain(u)
-        if per_domain[d] >= max_per_domain:
-            continue
-        per_domain[d] += 1
-        diverse.append(it)
-        if len(diverse) >= total_limit:
-            break
+        # дедуп по URL
+        seen_urls = set(); dedup_url = []
+        for it in candidates:
+            u = it.get("url")
+            if u and u not in seen_urls:
+                seen_urls.add(u); dedup_url.append(it)
+        reporter.advance("Фильтрация", n_candidates - len(dedup_url))
+
+        # дедуп по заголовкам (квадратичный, прогресс и отмена по каждой записи)
+        picked = []; title_bank = []
+        for it in dedup_url:
+            reporter.advance("Фильтрация")
+            tk = _title_key(it.get("title"))
+            if not tk:
+                picked.append(it); title_bank.append(tk); continue
+            if any(_is_similar_title(tk, tb, title_sim_threshold) for tb in title_bank if tb):
+                continue
+            picked.append(it); title_bank.append(tk)
+
+        # диверсификация по доменам и общий лимит
+        per_domain = defaultdict(int); diverse = []
+        for it in picked:
+            u = it.get("url")
+            if not u:
+                continue
+            d = _domain(u)
+            if per_domain[d] >= max_per_domain:
+                continue
+            per_domain[d] += 1
+            diverse.append(it)
+            if len(diverse) >= total_limit:
+                break
 
     # тексты
     urls = [it["url"] for it in diverse if it.get("url")]
-    url2text = await _fetch_article_texts(urls, lang=lang, workers=article_workers)
+    with METRICS.stage("Fetch articles", len(urls)), reporter.phase("Загрузка текстов", len(urls)):
+        url2text = await _fetch_article_texts(urls, lang=lang, workers=article_workers,
+                                              reporter=reporter, phase="Загрузка текстов",
+                                              max_bytes=max_article_bytes)
 
     # мерж и очистка служебного поля
     out = []
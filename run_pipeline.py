@@ -0,0 +1,132 @@
+# python run_pipeline.py --config pipeline_config.json --once
+# python run_pipeline.py --config pipeline_config.json --interval 300
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from collect_news import fetch_news_sync
+from src.data_struct.news import NewsStruct
+from src.metrics import METRICS
+from src.news_store import NewsStore
+
+
+def load_config(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_processor(config: dict):
+    # импорт здесь: модели и клиент LLM нужны только для обработки
+    from src.news_processor import NewsProcessor
+
+    processing = config.get("processing", {})
+    return NewsProcessor(
+        online=processing.get("online", True),
+        story_horizon=timedelta(hours=processing.get("story_horizon_hours", 24)),
+        archive_dir=config.get("archive_dir", "stories_archive"),
+        snapshot_dir=config.get("snapshot_dir", "clusters_snapshot"),
+    )
+
+
+PROCESSING_MODES = ("incremental", "pipelined", "cluster_first")
+
+
+def process_window(processing: dict, news_processor, news_structs_list: list) -> dict:
+    """
+    Обработка окна в режиме processing["mode"]:
+    - incremental: только новые и изменённые новости, сюжеты делятся на new / updated / unchanged
+    - pipelined: полная обработка окна параллельными стадиями (process_news_pipelined), все сюжеты в new
+    - cluster_first: сначала кластеризация, LLM только для представителей сюжетов
+      (process_news_cluster_first), все сюжеты в new
+    """
+    mode = processing.get("mode", "incremental")
+    if mode == "incremental":
+        return news_processor.process_news_incremental(news_structs_list)
+    if mode == "pipelined":
+        stories = news_processor.process_news_pipelined(
+            news_structs_list, llm_workers=processing.get("llm_workers", 8),
+            summary_workers=processing.get("summary_workers", 4))
+    elif mode == "cluster_first":
+        stories = news_processor.process_news_cluster_first(
+            news_structs_list, n_representatives=processing.get("n_representatives", 3))
+    else:
+        raise ValueError(f"Unknown processing mode {mode!r}, expected one of {PROCESSING_MODES}")
+    return {"new": stories, "updated": [], "unchanged": []}
+
+
+def run_once(config: dict, store: NewsStore, news_processor) -> dict:
+    """
+    Один цикл: сбор за окно window_hours до текущего момента, запись в хранилище,
+    обработка (по умолчанию инкрементальная, см. process_window), запись обогащений и id сюжетов в хранилище.
+    """
+    until = datetime.now(timezone.utc)
+    since = until - timedelta(hours=config.get("window_hours", 24))
+    feeds = config["feeds"]
+    print(f"[{until.isoformat(timespec='seconds')}] Сбор {len(feeds)} источников за {since} - {until}")
+    items = fetch_news_sync(feeds, since=since, until=until, **config.get("fetch", {}))
+    with METRICS.stage("Store news", len(items)):
+        store.upsert_news(items)
+
+    # без текста обработка невозможна, такие новости остаются в хранилище с полем error
+    items = [x for x in items if x.get("text") and x.get("url")]
+    processing = config.get("processing", {})
+    max_news = processing.get("max_news_per_run")
+    if max_news:
+        items = items[:max_news]
+    news_structs_list = [NewsStruct(x.get("published"), x["url"], x.get("title") or "", x["text"]) for x in items]
+    diff = process_window(processing, news_processor, news_structs_list)
+
+    news_list, story_ids = [], []
+    for label, cluster_list in news_processor.clusters_dict.items():
+        news_list.extend(cluster_list)
+        # шум DBSCAN (-1) не сюжет: обогащения сохраняются, id сюжета нет
+        story_id = None if label == -1 and not news_processor.online else label
+        story_ids.extend([story_id] * len(cluster_list))
+    with METRICS.stage("Store enrichments", len(news_list)):
+        store.upsert_enrichments(news_list, story_ids)
+
+    if config.get("metrics_report"):
+        METRICS.save_report(config["metrics_report"])
+    if config.get("metrics_prometheus"):
+        METRICS.write_prometheus(config["metrics_prometheus"])
+    summary = {"collected": len(items), "new": len(diff["new"]), "updated": len(diff["updated"]),
+               "unchanged": len(diff["unchanged"]), "stored": store.count()}
+    print(f"Итог: {summary}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless collection and processing of news")
+    parser.add_argument("--config", default="pipeline_config.json")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="single run and exit")
+    mode.add_argument("--interval", type=float, help="seconds between run starts, overrides interval_seconds")
+    parser.add_argument("--store", help="SQLite store path, overrides store_path")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    interval = args.interval if args.interval is not None else config.get("interval_seconds", 300)
+    store = NewsStore(args.store or config.get("store_path", "news_store.sqlite"))
+    news_processor = make_processor(config)
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                run_once(config, store, news_processor)
+            except Exception as e:
+                # сервис не падает из-за одного неудачного цикла
+                if args.once:
+                    raise
+                print(f"Ошибка цикла: {e!r}")
+            if args.once:
+                break
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("Остановлено")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import re
+import time
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from src.data_struct.news import NewsStruct, news_timestamp
+
+
+def normalize_entity(text: str) -> str:
+    text = str(text).lower().replace("ё", "е")
+    text = re.sub(r'["«»“”„\'`]', "", text)
+    return " ".join(text.split())
+
+
+class Postings:
+    """Article ids of one key ordered by publication time"""
+    __slots__ = ("timestamps", "article_ids")
+
+    def __init__(self):
+        self.timestamps: List[float] = []
+        self.article_ids: List[Hashable] = []
+
+    def add(self, timestamp: float, article_id: Hashable):
+        # news mostly arrive in time order, so this is an append
+        if not self.timestamps or timestamp >= self.timestamps[-1]:
+            self.timestamps.append(timestamp)
+            self.article_ids.append(article_id)
+            return
+        position = bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(position, timestamp)
+        self.article_ids.insert(position, article_id)
+
+    def window(self, since: Optional[float], until: Optional[float]) -> Tuple[int, int]:
+        start = 0 if since is None else bisect_left(self.timestamps, since)
+        end = len(self.timestamps) if until is None else bisect_right(self.timestamps, until)
+        return start, end
+
+    def trim_before(self, timestamp: float) -> List[Hashable]:
+        position = bisect_left(self.timestamps, timestamp)
+        removed = self.article_ids[:position]
+        del self.timestamps[:position]
+        del self.article_ids[:position]
+        return removed
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+class AssetIndex:
+    """
+    Inverted index from ticker, industry and normalized named entity to articles and stories
+
+    Postings are ordered by publication time, so time-range queries are two binary searches per key.
+    A query intersects all given keys starting from the shortest posting window.
+    Articles are identified by any hashable id (source_link by default), story ids can be reassigned.
+    Adding an indexed article again merges its new keys (enrichments that arrived later).
+    Articles without publication time are indexed at the time they were added, so trim_before keeps them
+    as long as news published at that moment.
+    story_resolver maps stale story ids to current ones (OnlineClusterizator.resolve after merges).
+    """
+
+    def __init__(self, story_resolver: Optional[Callable[[int], int]] = None):
+        self.story_resolver = story_resolver
+        self.postings: Dict[Tuple[str, str], Postings] = dict()
+        self.article_story: Dict[Hashable, int] = dict()
+        self.article_timestamp: Dict[Hashable, float] = dict()
+        self.article_keys: Dict[Hashable, set] = dict()
+
+    @staticmethod
+    def _keys(tickers: Iterable[str] = (), industries: Iterable[str] = (),
+              entities: Iterable[str] = ()) -> List[Tuple[str, str]]:
+        keys = [("ticker", str(x).upper()) for x in tickers if x]
+        keys += [("industry", normalize_entity(x)) for x in industries if x]
+        keys += [("entity", normalize_entity(x)) for x in entities if x]
+        return list(dict.fromkeys(keys))
+
+    def add_article(self, article_id: Hashable, timestamp: Optional[float], tickers: Iterable[str] = (),
+                    industries: Iterable[str] = (), entities: Iterable[str] = (), story_id: Optional[int] = None):
+        if story_id is not None:
+            self.article_story[article_id] = story_id
+        if article_id in self.article_timestamp:
+            timestamp = self.article_timestamp[article_id]
+        else:
+            timestamp = time.time() if timestamp is None else timestamp
+            self.article_timestamp[article_id] = timestamp
+            self.article_keys[article_id] = set()
+        article_keys = self.article_keys[article_id]
+        for key in self._keys(tickers, industries, entities):
+            if key in article_keys:
+                continue
+            article_keys.add(key)
+            postings = self.postings.get(key)
+            if postings is None:
+                postings = self.postings[key] = Postings()
+            postings.add(timestamp, article_id)
+
+    def add_news(self, news_struct: NewsStruct, story_id: Optional[int] = None,
+                 article_id: Optional[Hashable] = None):
+        """Index an enriched news (NewsStructCompany and later stages or NewsRecord)"""
+        self.add_article(
+            article_id if article_id is not None else news_struct.source_link,
+            news_timestamp(news_struct),
+            getattr(news_struct, "companies_tickers_list", None) or [],
+            [x.industry_name for x in getattr(news_struct, "industry_list", None) or []],
+            [x.name_text for x in getattr(news_struct, "named_entities", None) or []],
+            story_id,
+        )
+
+    def set_story(self, article_id: Hashable, story_id: int):
+        self.article_story[article_id] = story_id
+
+    def __contains__(self, article_id: Hashable) -> bool:
+        return article_id in self.article_timestamp
+
+    def query(self, tickers: Iterable[str] = (), industries: Iterable[str] = (), entities: Iterable[str] = (),
+              since: Optional[float] = None, until: Optional[float] = None) -> List[Hashable]:
+        """Articles having all given tickers AND industries AND entities within [since, until], oldest first"""
+        keys = self._keys(tickers, industries, entities)
+        if not keys:
+            return []
+        windows = []
+        for key in keys:
+            postings = self.postings.get(key)
+            if postings is None:
+                return []
+            start, end = postings.window(since, until)
+            if start >= end:
+                return []
+            windows.append((end - start, postings, start, end))
+        windows.sort(key=lambda x: x[0])
+        _, postings, start, end = windows[0]
+        result = postings.article_ids[start:end]
+        for _, postings, start, end in windows[1:]:
+            if not result:
+                break
+            allowed = set(postings.article_ids[start:end])
+            result = [x for x in result if x in allowed]
+        return result
+
+    def query_stories(self, tickers: Iterable[str] = (), industries: Iterable[str] = (),
+                      entities: Iterable[str] = (), since: Optional[float] = None,
+                      until: Optional[float] = None) -> List[int]:
+        """Story ids of matching articles, the story with the most recent matching article first"""
+        stories = dict()
+        for article_id in self.query(tickers, industries, entities, since, until):
+            story_id = self.article_story.get(article_id)
+            if story_id is not None:
+                if self.story_resolver is not None:
+                    story_id = self.story_resolver(story_id)
+                stories.pop(story_id, None)
+                stories[story_id] = None
+        return list(reversed(stories))
+
+    def trim_before(self, timestamp: float) -> int:
+        """Drop postings of articles published before timestamp, returns number of dropped articles"""
+        for key in list(self.postings):
+            postings = self.postings[key]
+            postings.trim_before(timestamp)
+            if not postings:
+                del self.postings[key]
+        removed = [x for x, article_timestamp in self.article_timestamp.items() if article_timestamp < timestamp]
+        for article_id in removed:
+            self.article_story.pop(article_id, None)
+            del self.article_timestamp[article_id]
+            del self.article_keys[article_id]
+        return len(removed)
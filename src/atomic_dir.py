@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def replace_directory(source: str, path: str):
+    """
+    Move the directory source to path, replacing an existing directory
+
+    The old directory is renamed away before source takes its name and removed afterwards, so files
+    memory-mapped by readers keep their data (the unlinked files live until they are unmapped) instead of
+    being truncated in place. A reader opening path between the two renames gets FileNotFoundError.
+    """
+    old = None
+    if os.path.exists(path):
+        old = tempfile.mkdtemp(prefix=os.path.basename(path) + ".old-", dir=os.path.dirname(path) or ".")
+        os.replace(path, old)
+    os.replace(source, path)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+@contextmanager
+def atomic_directory(path: str):
+    """
+    Write a directory as a whole: with atomic_directory(path) as tmp: ... writes files into a sibling
+    temporary directory that replaces path on success and is removed on error
+    """
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=os.path.basename(path) + ".tmp-", dir=os.path.dirname(path))
+    try:
+        yield tmp
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    replace_directory(tmp, path)
@@ -1,5 +1,6 @@
 from typing import List
 
+import numpy as np
 from numpy import ndarray
 from sklearn.cluster import DBSCAN
 
@@ -11,3 +12,23 @@ class Clasterizator:
     def fit_predict(self, embeddings: List[ndarray]):
         self.data = embeddings
         return self.clustering.fit_predict(embeddings)
+
+
+def select_representatives(embeddings: ndarray, n_representatives: int = 3) -> List[int]:
+    """
+    Medoid of the cluster plus the most diverse members (farthest-point selection by cosine similarity)
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    embeddings = embeddings / norms
+    similarities = embeddings @ embeddings.T
+    representatives = [int(np.argmax(similarities.sum(axis=1)))]
+    closest = similarities[representatives[0]].copy()
+    while len(representatives) < min(n_representatives, len(embeddings)):
+        candidate = int(np.argmin(closest))
+        if candidate in representatives:
+            break
+        representatives.append(candidate)
+        np.maximum(closest, similarities[candidate], out=closest)
+    return representatives
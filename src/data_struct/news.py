@@ -1,6 +1,10 @@
+import hashlib
 import json
-from datetime import datetime
-from typing import List, Dict
+import threading
+import urllib.parse as ul
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
 
 from numpy import ndarray
 
@@ -25,7 +29,51 @@ class NewsStruct:
         )
 
 
+def parse_timestamp(date_time_) -> Optional[float]:
+    """Unix timestamp of a datetime, ISO string (as published in collect_news) or number"""
+    if date_time_ is None or date_time_ == "":
+        return None
+    if isinstance(date_time_, (int, float)):
+        return float(date_time_)
+    if not isinstance(date_time_, datetime):
+        try:
+            date_time_ = datetime.fromisoformat(str(date_time_).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if date_time_.tzinfo is None:
+        date_time_ = date_time_.replace(tzinfo=timezone.utc)
+    return date_time_.timestamp()
+
+
+def news_timestamp(news_struct: NewsStruct) -> Optional[float]:
+    return parse_timestamp(news_struct.date_time_)
+
+
+_TRACKING_PARAMS = {"yclid", "gclid", "fbclid", "from", "ref"}
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """Url without scheme, www., fragment, tracking parameters and trailing slash, the same article gets one key"""
+    if not url:
+        return ""
+    parts = ul.urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = [(k, v) for k, v in ul.parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS]
+    path = parts.path.rstrip("/")
+    return netloc + path + ("?" + ul.urlencode(sorted(query)) if query else "")
+
+
+def content_hash(news_struct: NewsStruct) -> str:
+    text = f"{news_struct.header or ''}\n{news_struct.text or ''}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
 class NamedEntity:
+    __slots__ = ("name_type", "name_text")
+
     def __init__(self, name_type: str, name_text: str):
         self.name_type = name_type
         self.name_text = name_text
@@ -57,6 +105,8 @@ class NewsStructNE(NewsStruct):
 
 
 class IndustryEntity:
+    __slots__ = ("industry_name", "industry_forecast")
+
     def __init__(self, industry_name, industry_forecast):
         self.industry_name = industry_name
         self.industry_forecast = industry_forecast
@@ -69,6 +119,8 @@ class IndustryEntity:
 
 
 class CompaniesEntity:
+    __slots__ = ("company_name", "company_forecast")
+
     def __init__(self, company_name, company_forecast):
         self.company_name = company_name
         self.company_forecast = company_forecast
@@ -132,3 +184,100 @@ class NewsStructEmbed(NewsStructCompany):
             f"companies_tickers_list: {self.companies_tickers_list}\n"
             f"embedding: {self.embedding.mean()}\n"
         )
+
+
+# entity objects are never mutated after creation, so equal entities share one instance;
+# keys are free-form LLM strings, so only the INTERN_CACHE_SIZE most recently used entities are kept
+INTERN_CACHE_SIZE = 100000
+_entities_cache = OrderedDict()
+_entities_lock = threading.Lock()
+
+
+def _as_text(value):
+    # the LLM sometimes answers with a list or dict instead of a string, such values are not hashable
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _interned(cls, *args):
+    args = tuple(_as_text(x) for x in args)
+    key = (cls, *args)
+    with _entities_lock:
+        entity = _entities_cache.get(key)
+        if entity is None:
+            entity = cls(*args)
+            _entities_cache[key] = entity
+            if len(_entities_cache) > INTERN_CACHE_SIZE:
+                _entities_cache.popitem(last=False)
+        else:
+            _entities_cache.move_to_end(key)
+    return entity
+
+
+def intern_named_entity(name_type: str, name_text: str) -> NamedEntity:
+    return _interned(NamedEntity, name_type, name_text)
+
+
+def intern_industry_entity(industry_name, industry_forecast) -> IndustryEntity:
+    return _interned(IndustryEntity, industry_name, industry_forecast)
+
+
+def intern_companies_entity(company_name, company_forecast) -> CompaniesEntity:
+    return _interned(CompaniesEntity, company_name, company_forecast)
+
+
+class NewsRecord:
+    """
+    Compact news record: one slotted object per article enriched in place by the pipeline stages.
+    Has the attributes of NewsStructNE, NewsStructCompany and NewsStructEmbed (None until filled),
+    and prints like the most enriched stage reached.
+    """
+    __slots__ = ("date_time_", "source_link", "header", "text", "named_entities", "industry_list",
+                 "companies_names_list", "companies_tickers_list", "embedding")
+
+    def __init__(self, date_time_: datetime,
+                 source_link: str,
+                 header: str,
+                 text: str,
+                 named_entities: Optional[List[NamedEntity]] = None,
+                 industry_list: Optional[List[IndustryEntity]] = None,
+                 companies_names_list: Optional[List[CompaniesEntity]] = None,
+                 companies_tickers_list: Optional[List[str]] = None,
+                 embedding: Optional[ndarray] = None):
+        self.date_time_ = date_time_
+        self.source_link = source_link
+        self.header = header
+        self.text = text
+        self.named_entities = named_entities
+        self.industry_list = industry_list
+        self.companies_names_list = companies_names_list
+        self.companies_tickers_list = companies_tickers_list
+        self.embedding = embedding
+
+    @classmethod
+    def from_news(cls, news_struct: NewsStruct) -> "NewsRecord":
+        if isinstance(news_struct, NewsRecord):
+            return news_struct
+        return cls(*[getattr(news_struct, x, None) for x in cls.__slots__])
+
+    def __str__(self):
+        result = (
+            f"date_time_: {self.date_time_}\n"
+            f"source_link: {self.source_link}\n"
+            f"header: {self.header}\n"
+            f"text: {self.text}\n"
+        )
+        if self.named_entities is not None:
+            result += f"named_entities: {self.named_entities}\n"
+        if self.industry_list is not None:
+            result += (
+                f"industry_list: {self.industry_list}\n"
+                f"companies_names_list: {self.companies_names_list}\n"
+                f"companies_tickers_list: {self.companies_tickers_list}\n"
+            )
+        if self.embedding is not None:
+            result += f"embedding: {self.embedding.mean()}\n"
+        return result
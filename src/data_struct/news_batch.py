@@ -0,0 +1,226 @@
+import urllib.parse as ul
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+from src.data_struct.news import NewsRecord, NewsStruct, news_timestamp, parse_timestamp, intern_named_entity
+
+# timestamp of news without a parsable publication time, as published_ts in collect_news
+MISSING_TIMESTAMP = 0
+
+
+def _dictionary_encode(values: Iterable[Optional[str]]) -> Tuple[ndarray, ndarray]:
+    vocabulary: Dict[Optional[str], int] = dict()
+    codes = np.fromiter((vocabulary.setdefault(x, len(vocabulary)) for x in values), dtype=np.int32)
+    dictionary = np.empty(len(vocabulary), dtype=object)
+    dictionary[:] = list(vocabulary)
+    return codes, dictionary
+
+
+def ragged_encode(lists: Sequence[Optional[Sequence[str]]]) -> Tuple[ndarray, ndarray, ndarray]:
+    lengths = np.fromiter((len(x) if x else 0 for x in lists), dtype=np.int64, count=len(lists))
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    codes, dictionary = _dictionary_encode(value for x in lists if x for value in x)
+    return offsets, codes, dictionary
+
+
+def _ragged_take(offsets: ndarray, values: ndarray, indices: ndarray) -> Tuple[ndarray, ndarray]:
+    lengths = np.diff(offsets)[indices]
+    new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    positions = np.repeat(offsets[:-1][indices] - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return new_offsets, values[positions]
+
+
+def url_domain(url: Optional[str]) -> str:
+    try:
+        return ul.urlsplit(url).netloc.lower() if url else "unknown"
+    except Exception:
+        return "unknown"
+
+
+def _entity_key(entity) -> str:
+    return f"{entity.name_type}:{entity.name_text}"
+
+
+class NewsBatch:
+    """
+    Columnar batch of news
+
+    Parallel arrays: timestamps (int64 unix seconds), dictionary-encoded urls and domains (int32 codes into
+    object arrays), headers and texts (object arrays), one 2-D embedding matrix and offset-encoded
+    entity/ticker lists: values of row i are values[offsets[i]:offsets[i + 1]], values are codes into
+    a dictionary. Entities are encoded as "type:text".
+    """
+
+    def __init__(self, timestamps: ndarray, url_codes: ndarray, urls: ndarray, domain_codes: ndarray,
+                 domains: ndarray, headers: ndarray, texts: ndarray, embeddings: Optional[ndarray] = None,
+                 entity_offsets: Optional[ndarray] = None, entity_codes: Optional[ndarray] = None,
+                 entities: Optional[ndarray] = None, ticker_offsets: Optional[ndarray] = None,
+                 ticker_codes: Optional[ndarray] = None, tickers: Optional[ndarray] = None,
+                 labels: Optional[ndarray] = None):
+        n = len(timestamps)
+        empty_offsets = np.zeros(n + 1, dtype=np.int64)
+        self.timestamps = timestamps
+        self.url_codes = url_codes
+        self.urls = urls
+        self.domain_codes = domain_codes
+        self.domains = domains
+        self.headers = headers
+        self.texts = texts
+        self.embeddings = embeddings
+        self.entity_offsets = entity_offsets if entity_offsets is not None else empty_offsets
+        self.entity_codes = entity_codes if entity_codes is not None else np.empty(0, dtype=np.int32)
+        self.entities = entities if entities is not None else np.empty(0, dtype=object)
+        self.ticker_offsets = ticker_offsets if ticker_offsets is not None else empty_offsets
+        self.ticker_codes = ticker_codes if ticker_codes is not None else np.empty(0, dtype=np.int32)
+        self.tickers = tickers if tickers is not None else np.empty(0, dtype=object)
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @staticmethod
+    def _object_array(values: Sequence) -> ndarray:
+        array = np.empty(len(values), dtype=object)
+        array[:] = list(values)
+        return array
+
+    @classmethod
+    def from_columns(cls, timestamps: Sequence[Optional[float]], urls: Sequence[Optional[str]],
+                     headers: Sequence[Optional[str]], texts: Sequence[Optional[str]],
+                     embeddings: Optional[ndarray] = None,
+                     entities_lists: Optional[Sequence[Optional[Sequence[str]]]] = None,
+                     tickers_lists: Optional[Sequence[Optional[Sequence[str]]]] = None) -> "NewsBatch":
+        timestamps = np.array([MISSING_TIMESTAMP if x is None else int(x) for x in timestamps], dtype=np.int64)
+        url_codes, url_dictionary = _dictionary_encode(urls)
+        domain_codes, domain_dictionary = _dictionary_encode(url_domain(x) for x in url_dictionary)
+        batch = cls(timestamps, url_codes, url_dictionary, domain_codes[url_codes], domain_dictionary,
+                    cls._object_array(headers), cls._object_array(texts),
+                    None if embeddings is None else np.asarray(embeddings, dtype=np.float32))
+        if entities_lists is not None:
+            batch.entity_offsets, batch.entity_codes, batch.entities = ragged_encode(entities_lists)
+        if tickers_lists is not None:
+            batch.ticker_offsets, batch.ticker_codes, batch.tickers = ragged_encode(
+                [[x for x in tickers if x] if tickers else None for tickers in tickers_lists])
+        return batch
+
+    @classmethod
+    def from_news_list(cls, news_structs_list: Sequence[NewsStruct]) -> "NewsBatch":
+        embeddings = None
+        if news_structs_list and all(getattr(x, "embedding", None) is not None for x in news_structs_list):
+            embeddings = np.stack([x.embedding for x in news_structs_list])
+        return cls.from_columns(
+            [news_timestamp(x) for x in news_structs_list],
+            [x.source_link for x in news_structs_list],
+            [x.header for x in news_structs_list],
+            [x.text for x in news_structs_list],
+            embeddings,
+            [[_entity_key(e) for e in x.named_entities] if getattr(x, "named_entities", None) else None
+             for x in news_structs_list],
+            [getattr(x, "companies_tickers_list", None) for x in news_structs_list],
+        )
+
+    @classmethod
+    def from_items(cls, items: Sequence[dict]) -> "NewsBatch":
+        """Batch from fetch_news output (dicts with title, url, published, text)"""
+        return cls.from_columns(
+            [parse_timestamp(x.get("published")) for x in items],
+            [x.get("url") for x in items],
+            [x.get("title") for x in items],
+            [x.get("text") for x in items],
+        )
+
+    def take(self, indices) -> "NewsBatch":
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        entity_offsets, entity_codes = _ragged_take(self.entity_offsets, self.entity_codes, indices)
+        ticker_offsets, ticker_codes = _ragged_take(self.ticker_offsets, self.ticker_codes, indices)
+        return NewsBatch(
+            self.timestamps[indices], self.url_codes[indices], self.urls, self.domain_codes[indices],
+            self.domains, self.headers[indices], self.texts[indices],
+            None if self.embeddings is None else self.embeddings[indices],
+            entity_offsets, entity_codes, self.entities, ticker_offsets, ticker_codes, self.tickers,
+            None if self.labels is None else self.labels[indices],
+        )
+
+    def filter(self, mask: ndarray) -> "NewsBatch":
+        return self.take(np.flatnonzero(mask))
+
+    def time_mask(self, since: Optional[float] = None, until: Optional[float] = None) -> ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if since is not None:
+            mask &= self.timestamps >= since
+        if until is not None:
+            mask &= self.timestamps <= until
+        return mask
+
+    def domain_mask(self, domains: Iterable[str]) -> ndarray:
+        codes = np.flatnonzero(np.isin(self.domains, list(domains)))
+        return np.isin(self.domain_codes, codes)
+
+    def _ragged_mask(self, offsets: ndarray, codes: ndarray, dictionary: ndarray, wanted: Iterable[str]) -> ndarray:
+        wanted_codes = np.flatnonzero(np.isin(dictionary, list(wanted)))
+        rows = np.repeat(np.arange(len(self)), np.diff(offsets))
+        mask = np.zeros(len(self), dtype=bool)
+        mask[rows[np.isin(codes, wanted_codes)]] = True
+        return mask
+
+    def ticker_mask(self, tickers: Iterable[str]) -> ndarray:
+        return self._ragged_mask(self.ticker_offsets, self.ticker_codes, self.tickers, tickers)
+
+    def entity_mask(self, entities: Iterable[str]) -> ndarray:
+        return self._ragged_mask(self.entity_offsets, self.entity_codes, self.entities, entities)
+
+    def text_mask(self, query: str) -> ndarray:
+        query = query.lower()
+        return np.fromiter(((query in (h or "").lower()) or (query in (t or "").lower())
+                            for h, t in zip(self.headers, self.texts)), dtype=bool, count=len(self))
+
+    def url(self, i: int) -> Optional[str]:
+        return self.urls[self.url_codes[i]]
+
+    def domain(self, i: int) -> str:
+        return self.domains[self.domain_codes[i]]
+
+    def tickers_of(self, i: int) -> List[str]:
+        return self.tickers[self.ticker_codes[self.ticker_offsets[i]:self.ticker_offsets[i + 1]]].tolist()
+
+    def entities_of(self, i: int) -> List[str]:
+        return self.entities[self.entity_codes[self.entity_offsets[i]:self.entity_offsets[i + 1]]].tolist()
+
+    def to_news_list(self) -> List[NewsRecord]:
+        news_records_list = []
+        for i in range(len(self)):
+            timestamp = int(self.timestamps[i])
+            news_record = NewsRecord(None if timestamp == MISSING_TIMESTAMP else timestamp, self.url(i),
+                                     self.headers[i], self.texts[i])
+            if self.embeddings is not None:
+                news_record.embedding = self.embeddings[i]
+            entities = self.entities_of(i)
+            if entities:
+                news_record.named_entities = [intern_named_entity(*x.split(":", 1)) for x in entities]
+            tickers = self.tickers_of(i)
+            if tickers:
+                news_record.companies_tickers_list = tickers
+            news_records_list.append(news_record)
+        return news_records_list
+
+    def to_frame(self):
+        """Compact table for the GUI: one row per news without texts and embeddings"""
+        import pandas as pd
+
+        frame = pd.DataFrame({
+            "published": pd.to_datetime(self.timestamps, unit="s", utc=True).where(
+                self.timestamps != MISSING_TIMESTAMP),
+            "domain": pd.Categorical.from_codes(self.domain_codes, categories=self.domains.astype(str)),
+            "title": list(self.headers),
+            "url": self.urls[self.url_codes],
+            "tickers": [", ".join(self.tickers_of(i)) for i in range(len(self))],
+        })
+        if self.labels is not None:
+            frame["cluster"] = self.labels
+        return frame
@@ -0,0 +1,191 @@
+import csv
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+EXPORT_FORMATS = {
+    "json": ("json", "application/json"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _chunks(rows: Sequence[dict], chunk_size: int) -> Iterator[Sequence[dict]]:
+    for start in range(0, len(rows), chunk_size):
+        yield rows[start:start + chunk_size]
+
+
+def _columns(rows: Iterable[dict]) -> List[str]:
+    # union of keys in order of first appearance, rows may miss optional fields
+    return list(OrderedDict.fromkeys(key for row in rows for key in row))
+
+
+def _flat(value):
+    # lists and dicts (entities, sources of clusters) are kept as JSON inside a CSV cell
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _as_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _kind(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "str"
+
+
+def _parquet_kinds(rows: Sequence[dict], columns: List[str]) -> Dict[str, str]:
+    """
+    Type of every column over all rows: bool, int, float (ints and floats mixed) or str
+
+    Columns with strings, nested values (lists, dicts like rolling counts with int keys), other objects,
+    types mixed otherwise or only None values are written as strings, nested values as JSON.
+    """
+    seen: Dict[str, set] = {column: set() for column in columns}
+    for row in rows:
+        for key, value in row.items():
+            kind = _kind(value)
+            if kind is not None:
+                seen[key].add(kind)
+    kinds = dict()
+    for column, column_kinds in seen.items():
+        if column_kinds == {"int", "float"}:
+            kinds[column] = "float"
+        elif len(column_kinds) == 1:
+            kinds[column] = next(iter(column_kinds))
+        else:
+            kinds[column] = "str"
+    return kinds
+
+
+def iter_ndjson(rows: Sequence[dict], chunk_size: int = 1000) -> Iterator[bytes]:
+    """One JSON object per line, chunk_size rows per yielded block"""
+    for chunk in _chunks(rows, chunk_size):
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk).encode("utf-8")
+
+
+def iter_json(rows: Sequence[dict], chunk_size: int = 1000) -> Iterator[bytes]:
+    """JSON array of rows, serialized chunk by chunk"""
+    yield b"["
+    for i, chunk in enumerate(_chunks(rows, chunk_size)):
+        block = ",\n".join(json.dumps(row, ensure_ascii=False) for row in chunk)
+        yield (("\n" if i == 0 else ",\n") + block).encode("utf-8")
+    yield b"\n]\n"
+
+
+def iter_csv(rows: Sequence[dict], columns: Optional[List[str]] = None, chunk_size: int = 1000) -> Iterator[bytes]:
+    """CSV with a header row (columns default to all keys of rows), chunk_size rows per yielded block"""
+    columns = columns or _columns(rows)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows({key: _flat(value) for key, value in row.items()} for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_parquet(rows: Sequence[dict], path: str, chunk_size: int = 10000):
+    """
+    Parquet file written one row group per chunk, needs pyarrow
+
+    The schema covers the keys of all rows (see _parquet_kinds), so keys appearing late and values
+    changing type between chunks do not break the file.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+
+    columns = _columns(rows)
+    kinds = _parquet_kinds(rows, columns)
+    types = {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([pa.field(column, types[kinds[column]]) for column in columns])
+    convert = {"bool": lambda x: x, "int": lambda x: x, "float": lambda x: None if x is None else float(x),
+               "str": _as_string}
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            arrays = [pa.array([convert[kinds[column]](row.get(column)) for row in chunk],
+                               type=types[kinds[column]]) for column in columns]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def write_export(rows: Sequence[dict], fmt: str, path: str, chunk_size: int = 1000):
+    """Stream rows into path in one of EXPORT_FORMATS without building the whole file in memory"""
+    if fmt == "parquet":
+        write_parquet(rows, path)
+        return
+    blocks = {"json": iter_json, "ndjson": iter_ndjson, "csv": iter_csv}.get(fmt)
+    if blocks is None:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {list(EXPORT_FORMATS)}")
+    with open(path, "wb") as f:
+        for block in blocks(rows, chunk_size=chunk_size):
+            f.write(block)
+
+
+class ExportCache:
+    """
+    Export files built on demand and memoized by (name, version, format)
+
+    version identifies the content of the rows (a job id, a store revision), so a file is never rebuilt
+    for the same rows. Files live in a temporary directory, callers open them for download instead of
+    holding serialized copies in memory; only the max_files most recently built files are kept.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_files: int = 16):
+        self.directory = directory or tempfile.mkdtemp(prefix="news_exports_")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_files = max_files
+        self.files: Dict[tuple, str] = OrderedDict()
+        self._file_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, name: str, version, fmt: str) -> Optional[str]:
+        with self._lock:
+            return self.files.get((name, version, fmt))
+
+    def build(self, name: str, version, fmt: str, rows: Sequence[dict]) -> str:
+        """Path of the export file, written only on the first call for this name, version and format"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}, expected one of {list(EXPORT_FORMATS)}")
+        with self._lock:
+            key = (name, version, fmt)
+            if key in self.files:
+                return self.files[key]
+            while len(self.files) >= self.max_files:
+                _, old_path = self.files.popitem(last=False)
+                os.remove(old_path)
+            extension = EXPORT_FORMATS[fmt][0]
+            path = os.path.join(self.directory, f"{name}_{next(self._file_ids)}.{extension}")
+            write_export(rows, fmt, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            self.files[key] = path
+            return path
+
+    def clear(self):
+        with self._lock:
+            self.files.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory, exist_ok=True)
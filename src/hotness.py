@@ -0,0 +1,177 @@
+import urllib.parse as ul
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.data_struct.news import NewsStruct, news_timestamp
+
+FEATURES = ("size", "domains", "velocity", "acceleration", "recency", "tickers", "trust")
+
+# weights of the saturated features in the 1-100 score
+DEFAULT_WEIGHTS = {
+    "size": 1.0,
+    "domains": 1.5,
+    "velocity": 1.5,
+    "acceleration": 0.5,
+    "recency": 1.5,
+    "tickers": 1.0,
+    "trust": 1.0,
+}
+
+# trust of a source domain in [0, 1], unknown domains get default_trust
+DEFAULT_SOURCE_TRUST = {
+    "interfax.ru": 1.0,
+    "tass.ru": 1.0,
+    "rbc.ru": 0.9,
+    "kommersant.ru": 0.9,
+    "vedomosti.ru": 0.9,
+    "moex.com": 1.0,
+    "cbr.ru": 1.0,
+    "ria.ru": 0.8,
+    "lenta.ru": 0.7,
+}
+
+
+def source_domain(url: Optional[str]) -> str:
+    netloc = ul.urlsplit(url or "").netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def _distinct_per_group(group_idx: np.ndarray, value_idx: np.ndarray, n_groups: int) -> np.ndarray:
+    # number of distinct values in every group: unique (group, value) pairs counted by group
+    if len(group_idx) == 0:
+        return np.zeros(n_groups, dtype=np.int64)
+    pairs = np.unique(np.stack([group_idx, value_idx], axis=1), axis=0)
+    return np.bincount(pairs[:, 0], minlength=n_groups)
+
+
+class HotnessScorer:
+    """
+    Local 1-100 hotness of stories from cheap features, computed for all stories at once
+
+    Features per story: size, distinct source domains, velocity (news in the last velocity_window),
+    acceleration (velocity minus the news of the window before), recency of the latest news
+    (halves every recency_half_life), distinct tickers and mean source trust.
+    Each feature is saturated to [0, 1] and the score is their weighted mean. The score of a story depends
+    only on its own news and on now, the time velocity and recency are measured at: callers pass one
+    watermark (e.g. NewsProcessor.watermark) so that scores of different calls are comparable.
+
+    Parameters:
+    - weights: Feature name -> weight, DEFAULT_WEIGHTS by default
+    - source_trust: Domain (without www.) -> trust in [0, 1], subdomains fall back to the parent domain
+    - default_trust: Trust of unknown domains
+    - velocity_window: Seconds
+    - recency_half_life: Seconds
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, source_trust: Optional[Dict[str, float]] = None,
+                 default_trust: float = 0.5, velocity_window: float = 3600.0, recency_half_life: float = 6 * 3600.0):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.source_trust = dict(DEFAULT_SOURCE_TRUST if source_trust is None else source_trust)
+        self.default_trust = default_trust
+        self.velocity_window = velocity_window
+        self.recency_half_life = recency_half_life
+        self._trust_cache: Dict[str, float] = dict()
+
+    def trust(self, domain: str) -> float:
+        trust = self._trust_cache.get(domain)
+        if trust is None:
+            trust = self.default_trust
+            parts = domain.split(".")
+            for i in range(len(parts) - 1):
+                parent = ".".join(parts[i:])
+                if parent in self.source_trust:
+                    trust = self.source_trust[parent]
+                    break
+            self._trust_cache[domain] = trust
+        return trust
+
+    def features(self, clusters: Sequence[Sequence[NewsStruct]], now: float) -> np.ndarray:
+        """
+        Raw features of every story
+
+        Parameters:
+        - clusters: News of every story
+        - now: Unix time the velocity and recency are measured at (the pipeline watermark when replaying
+          archived news, the current time for live news)
+
+        Returns:
+        - features: (n_stories, len(FEATURES)) float matrix, columns in FEATURES order
+        """
+        n_stories = len(clusters)
+        sizes = np.fromiter((len(x) for x in clusters), dtype=np.int64, count=n_stories)
+        story_idx = np.repeat(np.arange(n_stories), sizes)
+        news = [x for cluster_list in clusters for x in cluster_list]
+
+        timestamps = np.array([news_timestamp(x) for x in news], dtype=np.float64)
+        domains = [source_domain(x.source_link) for x in news]
+        domain_ids: Dict[str, int] = dict()
+        domain_idx = np.array([domain_ids.setdefault(x, len(domain_ids)) for x in domains], dtype=np.int64)
+        trust = np.array([self.trust(x) for x in domains], dtype=np.float64)
+        ticker_ids: Dict[str, int] = dict()
+        ticker_story, ticker_idx = [], []
+        for i, news_struct in zip(story_idx.tolist(), news):
+            for ticker in getattr(news_struct, "companies_tickers_list", None) or []:
+                ticker_story.append(i)
+                ticker_idx.append(ticker_ids.setdefault(ticker, len(ticker_ids)))
+
+        known = ~np.isnan(timestamps)
+        latest = np.full(n_stories, -np.inf)
+        np.maximum.at(latest, story_idx[known], timestamps[known])
+        age = np.where(np.isfinite(latest), np.maximum(now - latest, 0.0), np.inf)
+        recent = known & (timestamps > now - self.velocity_window)
+        previous = known & ~recent & (timestamps > now - 2 * self.velocity_window)
+        velocity = np.bincount(story_idx[recent], minlength=n_stories)
+        previous_velocity = np.bincount(story_idx[previous], minlength=n_stories)
+
+        features = np.zeros((n_stories, len(FEATURES)), dtype=np.float64)
+        features[:, 0] = sizes
+        features[:, 1] = _distinct_per_group(story_idx, domain_idx, n_stories)
+        features[:, 2] = velocity
+        features[:, 3] = velocity - previous_velocity
+        features[:, 4] = np.exp2(-age / self.recency_half_life)
+        features[:, 5] = _distinct_per_group(np.array(ticker_story, dtype=np.int64),
+                                             np.array(ticker_idx, dtype=np.int64), n_stories)
+        features[:, 6] = np.bincount(story_idx, weights=trust, minlength=n_stories) / np.maximum(sizes, 1)
+        return features
+
+    def score_features(self, features: np.ndarray) -> np.ndarray:
+        saturated = np.empty_like(features)
+        saturated[:, 0] = features[:, 0] / (features[:, 0] + 5.0)
+        saturated[:, 1] = features[:, 1] / (features[:, 1] + 3.0)
+        saturated[:, 2] = features[:, 2] / (features[:, 2] + 3.0)
+        saturated[:, 3] = 0.5 + 0.5 * np.tanh(features[:, 3] / 3.0)
+        saturated[:, 4] = features[:, 4]
+        saturated[:, 5] = features[:, 5] / (features[:, 5] + 2.0)
+        saturated[:, 6] = features[:, 6]
+        weights = np.array([self.weights.get(x, 0.0) for x in FEATURES])
+        return 1.0 + 99.0 * (saturated @ weights) / max(weights.sum(), 1e-12)
+
+    def score(self, clusters: Sequence[Sequence[NewsStruct]], now: float) -> np.ndarray:
+        """1-100 hotness of every story"""
+        if len(clusters) == 0:
+            return np.zeros(0, dtype=np.float64)
+        return self.score_features(self.features(clusters, now))
+
+
+def top_k(scores: np.ndarray, k: int) -> List[int]:
+    """Indices of the k highest scores, highest first"""
+    if k <= 0 or len(scores) == 0:
+        return []
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable").tolist()
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")].tolist()
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    domains_list = ["https://www.rbc.ru/a", "https://lenta.ru/b", "https://example.com/c", "https://tass.ru/d"]
+    clusters = [[NewsStruct(float(1.7e9 + rng.integers(0, 86400)), domains_list[rng.integers(0, 4)] + str(j), "", "")
+                 for j in range(int(rng.integers(1, 20)))] for _ in range(5000)]
+    scorer = HotnessScorer()
+    start_time = time.perf_counter()
+    scores = scorer.score(clusters, now=1.7e9 + 86400)
+    print(f"{len(clusters)} stories scored in {time.perf_counter() - start_time:.3f} s, top: {scores[top_k(scores, 5)]}")
@@ -0,0 +1,195 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional
+
+from src.progress import Cancelled, ProgressState
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class Job:
+    """
+    One background task of a JobManager
+
+    fn is called as fn(*args, progress=job.progress, cancel_event=job.cancel_event, **kwargs),
+    the same progress/cancel_event arguments fetch_news and NewsProcessor.process_news take.
+    """
+
+    def __init__(self, job_id: str, kind: str, fn: Callable, args: tuple, kwargs: dict):
+        self.job_id = job_id
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.progress = ProgressState()
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+        self.result = None
+        self.error: Optional[str] = None
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def info(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "phases": self.progress.snapshot(),
+        }
+
+
+class JobManager:
+    """
+    Long-lived worker pool for collection and processing jobs, meant to outlive Streamlit reruns
+    (create it once per process, e.g. with st.cache_resource) and to be shared by all sessions.
+
+    Jobs get ids and can be polled and cancelled from any thread; their results stay in the manager
+    until max_finished newer jobs have finished. Jobs of an exclusive kind run one at a time,
+    so a shared stateful object (a warm NewsProcessor) is never used by two jobs at once. They wait
+    in a queue of their kind, not in the pool: one worker runs them in turn and the other workers
+    stay free for other jobs.
+    """
+
+    def __init__(self, workers: int = 2, max_finished: int = 20):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.max_finished = max_finished
+        self.jobs: Dict[str, Job] = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # exclusive kinds: jobs waiting for their turn and kinds having a worker that runs them
+        self._waiting: Dict[str, Deque[Job]] = defaultdict(deque)
+        self._running_kinds: set = set()
+
+    def submit(self, kind: str, fn: Callable, *args, exclusive: bool = False, **kwargs) -> str:
+        """
+        Queue fn(*args, progress=..., cancel_event=..., **kwargs)
+
+        Returns:
+        - job_id: Id for poll, result and cancel
+        """
+        with self._lock:
+            job = Job(f"{kind}-{next(self._ids)}", kind, fn, args, kwargs)
+            self.jobs[job.job_id] = job
+            if exclusive:
+                self._waiting[kind].append(job)
+                if kind in self._running_kinds:
+                    return job.job_id
+                self._running_kinds.add(kind)
+        if exclusive:
+            self.pool.submit(self._run_exclusive, kind)
+        else:
+            job.future = self.pool.submit(self._run, job)
+        return job.job_id
+
+    def _run_exclusive(self, kind: str):
+        # runs the waiting jobs of kind one after another until none is left
+        while True:
+            with self._lock:
+                if not self._waiting[kind]:
+                    del self._waiting[kind]
+                    self._running_kinds.discard(kind)
+                    return
+                job = self._waiting[kind].popleft()
+            self._run(job)
+
+    def _run(self, job: Job):
+        try:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+                return
+            job.status = RUNNING
+            job.started = time.time()
+            try:
+                job.result = job.fn(*job.args, progress=job.progress, cancel_event=job.cancel_event, **job.kwargs)
+                job.status = FINISHED
+            except Cancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = FAILED
+        finally:
+            job.finished = time.time()
+            self._trim()
+
+    def _trim(self):
+        # results of old jobs are dropped, active jobs are always kept
+        with self._lock:
+            done = [x for x in self.jobs.values() if x.status not in ACTIVE_STATUSES]
+            for job in done[:max(0, len(done) - self.max_finished)]:
+                del self.jobs[job.job_id]
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        if job_id is None:
+            return None
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def poll(self, job_id: Optional[str]) -> Optional[dict]:
+        """Status, error, timings and progress of every phase, None for unknown (or trimmed) jobs"""
+        job = self.get(job_id)
+        return job.info() if job is not None else None
+
+    def result(self, job_id: Optional[str], default=None):
+        """Result of a finished job, default while it runs or when it failed or was cancelled"""
+        job = self.get(job_id)
+        if job is None or job.status != FINISHED:
+            return default
+        return job.result
+
+    def cancel(self, job_id: Optional[str]) -> bool:
+        """Ask a job to stop: queued jobs never start, running ones stop at their next progress check"""
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return False
+        job.cancel_event.set()
+        with self._lock:
+            waiting = self._waiting.get(job.kind)
+            queued = waiting is not None and job in waiting
+            if queued:
+                waiting.remove(job)
+        if queued or (job.future is not None and job.future.cancel()):
+            job.status = CANCELLED
+            job.finished = time.time()
+        return True
+
+    def active(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            return [x for x in self.jobs.values()
+                    if x.status in ACTIVE_STATUSES and (kind is None or x.kind == kind)]
+
+    def shutdown(self, cancel: bool = True):
+        if cancel:
+            for job in self.active():
+                self.cancel(job.job_id)
+        self.pool.shutdown(wait=True)
+
+
+# warm objects shared by all jobs and sessions of the process; a module global survives Streamlit reruns
+_SHARED: Dict[str, object] = dict()
+_SHARED_LOCK = threading.Lock()
+
+
+def get_shared(name: str, factory: Callable[[], object]):
+    """
+    Process-wide instance of name, built by factory on first use
+
+    Called from a job, so a slow factory (NewsProcessor loads models) runs in the background, not in the GUI.
+    """
+    with _SHARED_LOCK:
+        if name not in _SHARED:
+            _SHARED[name] = factory()
+        return _SHARED[name]
@@ -0,0 +1,354 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1 << 10, 1 << 14, 1 << 16, 1 << 18, 1 << 20, 1 << 22)
+
+
+class Histogram:
+    """Cumulative-bucket histogram as in Prometheus: counts[i] is the number of values <= buckets[i]"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else None,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95),
+                "buckets": dict(zip([str(x) for x in self.buckets] + ["+Inf"], self.counts))}
+
+
+class StageStats:
+    __slots__ = ("calls", "items", "wall_time", "cpu_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+
+
+class LLMStats:
+    __slots__ = ("calls", "errors", "prompt_tokens", "completion_tokens", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency = Histogram()
+
+
+class HTTPStats:
+    __slots__ = ("requests", "errors", "bytes", "latency", "size", "error_reasons", "skip_reasons")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = Histogram()
+        self.size = Histogram(SIZE_BUCKETS)
+        self.error_reasons: Dict[str, int] = defaultdict(int)
+        # responses dropped without reading the body: content type, size limit, status
+        self.skip_reasons: Dict[str, int] = defaultdict(int)
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class Metrics:
+    """
+    Run metrics: per-stage wall/CPU time and item counts, LLM calls per extractor (latency, tokens, errors),
+    HTTP requests per domain (latency, size, errors, skipped responses), cache hits/misses and peak memory.
+    Thread-safe, shared by collect_news, NewsProcessor and the LLM extractors through METRICS.
+
+    Exported with report() / save_report() as JSON and to_prometheus() / write_prometheus() / serve_prometheus()
+    in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = "news"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages: Dict[str, StageStats] = defaultdict(StageStats)
+            self.llm: Dict[str, LLMStats] = defaultdict(LLMStats)
+            self.http: Dict[str, HTTPStats] = defaultdict(HTTPStats)
+            self.cache_hits: Dict[str, int] = defaultdict(int)
+            self.cache_misses: Dict[str, int] = defaultdict(int)
+            self.llm_in_flight: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """
+        Time a block: with METRICS.stage("NE extraction", len(news)): ...
+        CPU time is process time, so it includes other threads working at the same moment.
+        """
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall_time, cpu_time = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            with self._lock:
+                stats = self.stages[name]
+                stats.calls += 1
+                stats.items += items
+                stats.wall_time += wall_time
+                stats.cpu_time += cpu_time
+
+    def observe_llm(self, extractor: str, latency: float, prompt_tokens: Optional[int] = None,
+                    completion_tokens: Optional[int] = None, error: bool = False):
+        with self._lock:
+            stats = self.llm[extractor]
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.prompt_tokens += prompt_tokens or 0
+            stats.completion_tokens += completion_tokens or 0
+            stats.latency.observe(latency)
+
+    def llm_started(self, extractor: str):
+        with self._lock:
+            self.llm_in_flight[extractor] += 1
+
+    def llm_finished(self, extractor: str):
+        with self._lock:
+            self.llm_in_flight[extractor] -= 1
+
+    def llm_in_flight_total(self) -> int:
+        with self._lock:
+            return sum(self.llm_in_flight.values())
+
+    def observe_http(self, domain: str, latency: float, size: Optional[int] = None, error: Optional[str] = None):
+        with self._lock:
+            stats = self.http[domain]
+            stats.requests += 1
+            stats.latency.observe(latency)
+            if size is not None:
+                stats.bytes += size
+                stats.size.observe(size)
+            if error is not None:
+                stats.errors += 1
+                # reasons are kept short, full exception texts would make too many label values
+                stats.error_reasons[str(error).split(":")[0][:40]] += 1
+
+    def skip_http(self, domain: str, reason: str):
+        with self._lock:
+            self.http[domain].skip_reasons[reason] += 1
+
+    def cache(self, name: str, hits: int = 0, misses: int = 0):
+        with self._lock:
+            self.cache_hits[name] += hits
+            self.cache_misses[name] += misses
+
+    @staticmethod
+    def peak_memory_bytes() -> Optional[int]:
+        if resource is None:
+            return None
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def report(self) -> dict:
+        with self._lock:
+            caches = sorted(set(self.cache_hits) | set(self.cache_misses))
+            return {
+                "started": self.started,
+                "duration": time.time() - self.started,
+                "peak_memory_bytes": self.peak_memory_bytes(),
+                "stages": {
+                    name: {"calls": x.calls, "items": x.items, "wall_time": x.wall_time, "cpu_time": x.cpu_time,
+                           "items_per_second": x.items / x.wall_time if x.wall_time else None}
+                    for name, x in self.stages.items()
+                },
+                "llm": {
+                    name: {"calls": x.calls, "errors": x.errors, "prompt_tokens": x.prompt_tokens,
+                           "completion_tokens": x.completion_tokens, "latency": x.latency.to_dict()}
+                    for name, x in self.llm.items()
+                },
+                "http": {
+                    domain: {"requests": x.requests, "errors": x.errors, "bytes": x.bytes,
+                             "error_reasons": dict(x.error_reasons), "skip_reasons": dict(x.skip_reasons),
+                             "latency": x.latency.to_dict(),
+                             "size": x.size.to_dict()}
+                    for domain, x in self.http.items()
+                },
+                "caches": {
+                    name: {"hits": self.cache_hits[name], "misses": self.cache_misses[name],
+                           "hit_rate": self.cache_hits[name] / max(1, self.cache_hits[name] + self.cache_misses[name])}
+                    for name in caches
+                },
+            }
+
+    def save_report(self, path: str = "metrics_report.json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def _histogram_lines(self, name: str, labels: str, histogram: Histogram) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip([str(x) for x in histogram.buckets] + ["+Inf"], histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return lines
+
+    def to_prometheus(self) -> str:
+        p = self.prefix
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {metric_type}")
+            lines.extend(samples)
+
+        with self._lock:
+            stages = sorted(self.stages.items())
+            metric("stage_wall_seconds_total", "counter", "Wall time spent in pipeline stages",
+                   [f'{p}_stage_wall_seconds_total{{stage="{_label(n)}"}} {x.wall_time}' for n, x in stages])
+            metric("stage_cpu_seconds_total", "counter", "Process CPU time spent in pipeline stages",
+                   [f'{p}_stage_cpu_seconds_total{{stage="{_label(n)}"}} {x.cpu_time}' for n, x in stages])
+            metric("stage_items_total", "counter", "Items processed by pipeline stages",
+                   [f'{p}_stage_items_total{{stage="{_label(n)}"}} {x.items}' for n, x in stages])
+
+            llm = sorted(self.llm.items())
+            metric("llm_calls_total", "counter", "LLM calls per extractor",
+                   [f'{p}_llm_calls_total{{extractor="{_label(n)}"}} {x.calls}' for n, x in llm])
+            metric("llm_errors_total", "counter", "Failed LLM calls per extractor",
+                   [f'{p}_llm_errors_total{{extractor="{_label(n)}"}} {x.errors}' for n, x in llm])
+            metric("llm_tokens_total", "counter", "LLM tokens per extractor",
+                   [f'{p}_llm_tokens_total{{extractor="{_label(n)}",kind="{kind}"}} {value}'
+                    for n, x in llm for kind, value in [("prompt", x.prompt_tokens),
+                                                        ("completion", x.completion_tokens)]])
+            metric("llm_in_flight", "gauge", "LLM calls in progress per extractor",
+                   [f'{p}_llm_in_flight{{extractor="{_label(n)}"}} {x}' for n, x in sorted(self.llm_in_flight.items())])
+            metric("llm_latency_seconds", "histogram", "LLM call latency per extractor",
+                   [line for n, x in llm
+                    for line in self._histogram_lines(f"{p}_llm_latency_seconds", f'extractor="{_label(n)}"',
+                                                      x.latency)])
+
+            http = sorted(self.http.items())
+            metric("http_requests_total", "counter", "HTTP requests per domain",
+                   [f'{p}_http_requests_total{{domain="{_label(d)}"}} {x.requests}' for d, x in http])
+            metric("http_errors_total", "counter", "Failed HTTP requests per domain and reason",
+                   [f'{p}_http_errors_total{{domain="{_label(d)}",reason="{_label(r)}"}} {c}'
+                    for d, x in http for r, c in sorted(x.error_reasons.items())])
+            metric("http_skipped_total", "counter", "Responses dropped per domain and reason (content type, size)",
+                   [f'{p}_http_skipped_total{{domain="{_label(d)}",reason="{_label(r)}"}} {c}'
+                    for d, x in http for r, c in sorted(x.skip_reasons.items())])
+            metric("http_response_bytes_total", "counter", "Downloaded bytes per domain",
+                   [f'{p}_http_response_bytes_total{{domain="{_label(d)}"}} {x.bytes}' for d, x in http])
+            metric("http_latency_seconds", "histogram", "HTTP request latency per domain",
+                   [line for d, x in http
+                    for line in self._histogram_lines(f"{p}_http_latency_seconds", f'domain="{_label(d)}"',
+                                                      x.latency)])
+            metric("http_response_size_bytes", "histogram", "HTTP response body size per domain",
+                   [line for d, x in http
+                    for line in self._histogram_lines(f"{p}_http_response_size_bytes", f'domain="{_label(d)}"',
+                                                      x.size)])
+
+            caches = sorted(set(self.cache_hits) | set(self.cache_misses))
+            metric("cache_hits_total", "counter", "Cache hits",
+                   [f'{p}_cache_hits_total{{cache="{_label(n)}"}} {self.cache_hits[n]}' for n in caches])
+            metric("cache_misses_total", "counter", "Cache misses",
+                   [f'{p}_cache_misses_total{{cache="{_label(n)}"}} {self.cache_misses[n]}' for n in caches])
+
+        peak_memory = self.peak_memory_bytes()
+        if peak_memory is not None:
+            metric("peak_memory_bytes", "gauge", "Peak resident memory of the process",
+                   [f"{p}_peak_memory_bytes {peak_memory}"])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str = "metrics.prom"):
+        """Text file for the node_exporter textfile collector, written atomically"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve_prometheus(self, port: int = 9108, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serve /metrics from a daemon thread, returns the server (call shutdown() to stop)"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class InstrumentedLLM:
+    """
+    Wrapper of a gpt_model (GIGACHAT_cstm) recording latency, errors and token usage of every call
+    under the extractor name. Token usage is taken from process_with_usage when the model has it.
+    """
+
+    def __init__(self, gpt_model, extractor: str, metrics: Optional[Metrics] = None):
+        self.gpt_model = gpt_model
+        self.extractor = extractor
+        self.metrics = metrics if metrics is not None else METRICS
+
+    def process(self, messages):
+        start_time = time.perf_counter()
+        usage = None
+        self.metrics.llm_started(self.extractor)
+        try:
+            if hasattr(self.gpt_model, "process_with_usage"):
+                content, usage = self.gpt_model.process_with_usage(messages)
+            else:
+                content = self.gpt_model.process(messages)
+        except Exception:
+            self.metrics.observe_llm(self.extractor, time.perf_counter() - start_time, error=True)
+            raise
+        finally:
+            self.metrics.llm_finished(self.extractor)
+        self.metrics.observe_llm(self.extractor, time.perf_counter() - start_time,
+                                 getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+        return content
+
+
+# process-wide metrics, like the default registry of prometheus_client
+METRICS = Metrics()
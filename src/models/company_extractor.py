@@ -1,18 +1,24 @@
 import datetime
 import json
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from src.data_struct.news import NewsStructCompany, NewsStructNE, IndustryEntity, CompaniesEntity, NamedEntity, \
-    NewsStruct
+    NewsStruct, NewsRecord, intern_industry_entity, intern_companies_entity
+from src.models.ticker_resolver import TickerResolver, shared_resolver
 
 
 class CompanyClassificator:
-    def __init__(self, gpt_model, tickers: Dict[str, str]):
+    def __init__(self, gpt_model, tickers: Dict[str, str], resolver: Optional[TickerResolver] = None):
+        """
+        Company names of the LLM answers are mapped to tickers by resolver,
+        by default the TickerResolver of tickers shared by the whole process.
+        """
         self.gpt_model = gpt_model
         self.tickers_dict = tickers
+        self.resolver = resolver if resolver is not None else shared_resolver(tickers)
 
-    def extract_company(self, text: str) -> List[str]:
+    def extract_company(self, text: str, resolve: bool = True) -> List[str]:
         messages = [
             {
                 "role": "system",
@@ -32,13 +38,8 @@ class CompanyClassificator:
             r = "[]"
         try:
             j = json.loads(r)
-            for company in j:
-                company_name = company["company"]
-                ticker = ""
-                if company_name in self.tickers_dict:
-                    ticker = self.tickers_dict[company_name]
-                if company_name.lower() in self.tickers_dict:
-                    ticker = self.tickers_dict[company_name.lower()]
+            tickers = self.resolver.resolve_many([x["company"] for x in j]) if resolve else [""] * len(j)
+            for company, ticker in zip(j, tickers):
                 company["ticker"] = ticker
         except json.decoder.JSONDecodeError as e:
             print(e)
@@ -63,17 +64,33 @@ class CompanyClassificator:
         j = json.loads(r)
         return j
 
-    def extract(self, news_struct: NewsStructNE) -> NewsStructCompany:
-        company = self.extract_company(f"{news_struct.header}\n{news_struct.text}")
+    def extract(self, news_struct: NewsStructNE, resolve: bool = True) -> NewsStructCompany:
+        """resolve=False leaves tickers empty for a later resolve_tickers call over the whole batch"""
+        company = self.extract_company(f"{news_struct.header}\n{news_struct.text}", resolve)
         industry = self.extract_industry(f"{news_struct.header}\n{news_struct.text}")
+        industry_list = [intern_industry_entity(x["type"], x["forecast"]) for x in industry]
+        companies_names_list = [intern_companies_entity(x["company"], x["forecast"]) for x in company]
+        companies_tickers_list = [x["ticker"] for x in company]
+        if isinstance(news_struct, NewsRecord):
+            news_struct.industry_list = industry_list
+            news_struct.companies_names_list = companies_names_list
+            news_struct.companies_tickers_list = companies_tickers_list
+            return news_struct
         news_struct_result = NewsStructCompany(
             news_struct,
-            [IndustryEntity(x["type"], x["forecast"]) for x in industry],
-            [CompaniesEntity(x["company"], x["forecast"]) for x in company],
-            [x["ticker"] for x in company]
+            industry_list,
+            companies_names_list,
+            companies_tickers_list
         )
         return news_struct_result
 
+    def resolve_tickers(self, news_structs_list: List[NewsStructCompany]):
+        """Tickers of the company mentions of all news resolved in one batched call, set in place"""
+        names = [x.company_name for news_struct in news_structs_list for x in news_struct.companies_names_list]
+        tickers = iter(self.resolver.resolve_many(names))
+        for news_struct in news_structs_list:
+            news_struct.companies_tickers_list = [next(tickers) for _ in news_struct.companies_names_list]
+
 
 if __name__ == "__main__":
     from src.models.gigachat_api import GIGACHAT_cstm
@@ -1,8 +1,10 @@
 from typing import List
 
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
-from src.data_struct.news import NewsStructCompany, NewsStructEmbed
+from src.data_struct.news import NewsStructCompany, NewsStructEmbed, NewsRecord
+from src.data_struct.news_batch import NewsBatch
 
 
 # pip install -U sentence-transformers
@@ -18,13 +20,25 @@ class EmbeddingsExtractor:
 
     def extract_from_news(self, news_struct: NewsStructCompany) -> NewsStructEmbed:
         embed = self.extract([str(news_struct)])[0]
+        if isinstance(news_struct, NewsRecord):
+            news_struct.embedding = embed
+            return news_struct
         return NewsStructEmbed(news_struct, embed)
 
+    def extract_from_batch(self, news_batch: NewsBatch) -> NewsBatch:
+        texts_list = [f"{header}\n{text}" for header, text in zip(news_batch.headers, news_batch.texts)]
+        news_batch.embeddings = np.asarray(self.model.encode(texts_list), dtype=np.float32)
+        return news_batch
+
     def extract_from_news_list(self, news_structs_list: List[NewsStructCompany]) -> List[NewsStructEmbed]:
         news_str_list = [str(x) for x in news_structs_list]
         news_embeds_list = self.extract(news_str_list)
         news_struct_embed_list = []
         for news_struct, news_embed in zip(news_structs_list, news_embeds_list):
+            if isinstance(news_struct, NewsRecord):
+                news_struct.embedding = news_embed
+                news_struct_embed_list.append(news_struct)
+                continue
             news_struct_emb = NewsStructEmbed(news_struct, news_embed)
             news_struct_embed_list.append(news_struct_emb)
         return news_struct_embed_list
@@ -24,6 +24,10 @@ class GIGACHAT_cstm:
         self.chosen_model = "GigaChat-2-Max"
 
     def process(self, messages):
+        return self.process_with_usage(messages)[0]
+
+    def process_with_usage(self, messages):
+        """Answer text and token usage (prompt_tokens, completion_tokens, total_tokens) of the call"""
         gigachat_messages_list = [
             Messages(role=MessagesRole(x["role"]), content=x["content"]) for x in messages
         ]
@@ -34,7 +38,7 @@ class GIGACHAT_cstm:
                 messages=gigachat_messages_list
             )
         )
-        return response_giga_model.choices[0].message.content
+        return response_giga_model.choices[0].message.content, response_giga_model.usage
 
 
 if __name__ == "__main__":
@@ -2,7 +2,7 @@ import json
 import re
 from typing import List
 
-from src.data_struct.news import NewsStruct, NewsStructNE, NamedEntity
+from src.data_struct.news import NewsStruct, NewsStructNE, NamedEntity, NewsRecord, intern_named_entity
 
 
 class NEExtractor:
@@ -30,7 +30,10 @@ class NEExtractor:
     def extract_ne_from_news(self, news_struct: NewsStruct) -> NewsStructNE:
         text = news_struct.header + news_struct.text
         ne_list = self.extract(text)
-        ne_structs_list = [NamedEntity(x["type"], x["text"]) for x in ne_list]
+        ne_structs_list = [intern_named_entity(x["type"], x["text"]) for x in ne_list]
+        if isinstance(news_struct, NewsRecord):
+            news_struct.named_entities = ne_structs_list
+            return news_struct
         return NewsStructNE(news_struct, ne_structs_list)
 
 
@@ -1,10 +1,18 @@
 import json
 import re
-from typing import List
+from typing import List, Optional
 
 from src.data_struct.news import NewsStruct, NewsStructNE, NamedEntity
 
 
+def parse_hotness(answer) -> Optional[float]:
+    """First number of the LLM answer clipped to 1-100, None when there is none"""
+    match = re.search(r"\d+(?:[.,]\d+)?", str(answer or ""))
+    if match is None:
+        return None
+    return min(100.0, max(1.0, float(match.group().replace(",", "."))))
+
+
 class SummarizatorHotness:
     def __init__(self, gpt_model):
         self.gpt_model = gpt_model
@@ -41,6 +49,9 @@ class SummarizatorHotness:
         response_giga_model = self.gpt_model.process(messages)
         return response_giga_model
 
+    def hotness_score(self, texts_list: List[str]) -> Optional[float]:
+        return parse_hotness(self.hotness_extractor(texts_list))
+
 
 if __name__ == "__main__":
     from src.models.gigachat_api import GIGACHAT_cstm
@@ -0,0 +1,185 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# legal forms, share types and generic words of MOEX listing names and of names in news
+LEGAL_FORMS = {
+    "пао", "оао", "зао", "нао", "ао", "ооо", "ап", "мкпао", "гк", "пк", "нк", "ак", "группа", "компания", "холдинг",
+    "банк", "pao", "pjsc", "ojsc", "jsc", "llc", "ltd", "inc", "corp", "plc", "group", "holding", "co", "bank",
+}
+
+# common names of MOEX issuers, used when the ticker is among the known tickers
+DEFAULT_ALIASES = {
+    "Сбер": "SBER", "Сбербанк": "SBER", "Sber": "SBER", "Sberbank": "SBER",
+    "Газпром": "GAZP", "Gazprom": "GAZP",
+    "Лукойл": "LKOH", "Lukoil": "LKOH",
+    "Роснефть": "ROSN", "Rosneft": "ROSN",
+    "Новатэк": "NVTK", "Novatek": "NVTK",
+    "Норникель": "GMKN", "Норильский никель": "GMKN", "Nornickel": "GMKN",
+    "Яндекс": "YDEX", "Yandex": "YDEX",
+    "ВТБ": "VTBR", "VTB": "VTBR",
+    "Аэрофлот": "AFLT", "Aeroflot": "AFLT",
+    "МТС": "MTSS", "MTS": "MTSS",
+    "Магнит": "MGNT", "Magnit": "MGNT",
+    "Татнефть": "TATN", "Tatneft": "TATN",
+    "Сургутнефтегаз": "SNGS", "Полюс": "PLZL", "Алроса": "ALRS", "Северсталь": "CHMF", "НЛМК": "NLMK",
+    "ММК": "MAGN", "Ростелеком": "RTKM", "Интер РАО": "IRAO", "РусГидро": "HYDR", "Мосбиржа": "MOEX",
+    "Московская биржа": "MOEX", "Фосагро": "PHOR", "Транснефть": "TRNF", "Мечел": "MTLR", "Самолет": "SMLT",
+    "ПИК": "PIKK", "АФК Система": "AFKS", "Газпром нефть": "SIBN", "Озон": "OZON", "Ozon": "OZON",
+}
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z", "и": "i", "й": "y",
+    "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "", "э": "e",
+    "ю": "yu", "я": "ya",
+})
+# transliterated Russian case endings, longest first
+_ENDINGS = ("yami", "ami", "akh", "yakh", "ogo", "ego", "omu", "emu", "ov", "ev", "oy", "ey", "om", "em",
+            "am", "ya", "yu", "a", "u", "e", "y", "i")
+_MIN_STEM = 4
+# shorter names ("МТС", "ЦБ") are resolved only by the table, fuzzy matches of them are mostly wrong
+_MIN_FUZZY = 5
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _fold_case(word: str) -> str:
+    # endings are stripped until none is left, so every case form of a word ends at the same stem
+    changed = True
+    while changed:
+        changed = False
+        for ending in _ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+                word = word[:-len(ending)]
+                changed = True
+                break
+    return word
+
+
+def normalize_company_name(name) -> str:
+    """
+    Comparable form of a company name: lowercased, without punctuation and legal forms,
+    transliterated to Latin and with Russian case endings folded
+    ("ПАО «Газпром»", "Газпрома" and "Gazprom" give the same string)
+    """
+    words = _NON_WORD.sub(" ", str(name or "").lower().replace("ё", "е")).split()
+    words = [x for x in words if x not in LEGAL_FORMS] or words
+    return " ".join(_fold_case(x.translate(_TRANSLIT)) for x in words)
+
+
+class TickerResolver:
+    """
+    Company name -> MOEX ticker resolution for whole batches of names
+
+    Names are normalized (normalize_company_name) and looked up in a table of normalized listing names,
+    their distinctive first words and aliases; the rest are matched at once with rapidfuzz process.cdist
+    against all names of the table and resolved when the best score reaches threshold. Results are memoized
+    per raw name (the max_memo most recently used ones), so a frequent name costs one fuzzy match.
+    Without rapidfuzz only the table is used.
+
+    Parameters:
+    - tickers: Company name -> ticker (MOEX listing names)
+    - aliases: Name -> ticker, DEFAULT_ALIASES by default; aliases of unknown tickers are ignored
+    - threshold: Minimal rapidfuzz score (0-100) of a fuzzy match
+    - max_memo: Number of memoized names
+    """
+
+    def __init__(self, tickers: Dict[str, str], aliases: Optional[Dict[str, str]] = None, threshold: float = 85.0,
+                 max_memo: int = 100000):
+        self.threshold = threshold
+        self.max_memo = max_memo
+        self.table: Dict[str, str] = dict()
+        for name, ticker in tickers.items():
+            self._add(normalize_company_name(name), ticker)
+        # the first word of a listing name ("сбербанк" of "Сбербанк России") when no other ticker shares it
+        first_words: Dict[str, set] = dict()
+        for name, ticker in self.table.items():
+            first_words.setdefault(name.split(" ")[0], set()).add(ticker)
+        for word, word_tickers in first_words.items():
+            if len(word_tickers) == 1 and len(word) >= _MIN_STEM:
+                self.table.setdefault(word, next(iter(word_tickers)))
+        known = set(tickers.values())
+        for name, ticker in (DEFAULT_ALIASES if aliases is None else aliases).items():
+            if ticker in known:
+                self.table[normalize_company_name(name)] = ticker
+        for ticker in known:
+            self.table.setdefault(normalize_company_name(ticker), ticker)
+        self.choices = [x for x in self.table if len(x) >= _MIN_FUZZY]
+        self.choice_tickers = [self.table[x] for x in self.choices]
+        self._memo: Dict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        try:
+            from rapidfuzz import fuzz, process
+            self._cdist, self._scorer = process.cdist, fuzz.token_sort_ratio
+        except ImportError:
+            print("rapidfuzz is not installed, company names are resolved by exact normalized names only")
+            self._cdist, self._scorer = None, None
+
+    def _add(self, name: str, ticker: str):
+        # ordinary and preferred shares have the same listing name: the shorter (ordinary) ticker wins
+        if name and (name not in self.table or len(ticker) < len(self.table[name])):
+            self.table[name] = ticker
+
+    def resolve(self, name) -> str:
+        return self.resolve_many([name])[0]
+
+    def resolve_many(self, names: Sequence) -> List[str]:
+        """Ticker of every name, "" when it is not resolved"""
+        keys = [str(x or "") for x in names]
+        with self._lock:
+            pending = {x for x in keys if x not in self._memo}
+            matched = self._match(sorted(pending)) if pending else dict()
+            result = []
+            for key in keys:
+                if key in matched:
+                    ticker = self._memo[key] = matched[key]
+                else:
+                    ticker = self._memo[key]
+                self._memo.move_to_end(key)
+                result.append(ticker)
+            while len(self._memo) > self.max_memo:
+                self._memo.popitem(last=False)
+            return result
+
+    def _match(self, names: List[str]) -> Dict[str, str]:
+        normalized = [normalize_company_name(x) for x in names]
+        result = {name: self.table.get(x, "") for name, x in zip(names, normalized)}
+        fuzzy = list(dict.fromkeys(x for name, x in zip(names, normalized)
+                                   if not result[name] and len(x) >= _MIN_FUZZY))
+        if fuzzy and self._cdist is not None and self.choices:
+            scores = self._cdist(fuzzy, self.choices, scorer=self._scorer, score_cutoff=self.threshold,
+                                 dtype=np.uint8, workers=-1)
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(fuzzy)), best]
+            matched = {x: self.choice_tickers[j] for x, j, score in zip(fuzzy, best, best_scores)
+                       if score >= self.threshold}
+            result = {name: result[name] or matched.get(x, "") for name, x in zip(names, normalized)}
+        return result
+
+
+_SHARED: Dict[tuple, TickerResolver] = dict()
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_resolver(tickers: Dict[str, str], aliases: Optional[Dict[str, str]] = None) -> TickerResolver:
+    """TickerResolver built once per process for the same tickers and aliases"""
+    key = (tuple(sorted(tickers.items())), None if aliases is None else tuple(sorted(aliases.items())))
+    with _SHARED_LOCK:
+        if key not in _SHARED:
+            _SHARED[key] = TickerResolver(tickers, aliases)
+        return _SHARED[key]
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    with open("./models/moex_ru_shares.json", "r", encoding="utf-8") as f:
+        moex_tickers = {cname: ticker for ticker, cname in json.load(f).items()}
+    resolver = TickerResolver(moex_tickers)
+    names = ["Сбербанк", "Sber", "ПАО Газпром", "Газпрома", "Норникель", "Лукойлу", "Минфин", "Apple"]
+    start_time = time.perf_counter()
+    print(dict(zip(names, resolver.resolve_many(names))), f"{time.perf_counter() - start_time:.3f} s")
@@ -1,6 +1,8 @@
-import matplotlib.pyplot as plt
+import time
+
 import numpy as np
 from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
 from sklearn.preprocessing import StandardScaler
 
 class NeuralGas:
@@ -135,9 +137,150 @@ class NeuralGas:
         return error / len(X)
 
 
+class BatchNeuralGas(NeuralGas):
+    """
+    Vectorized mini-batch Neural Gas
+
+    Distances, neighborhood ranks and prototype updates are computed for a whole mini-batch with matrix ops.
+    Ranks are the true neighborhood ranks (position of every prototype in the distance ordering of a sample).
+    For a mini-batch every prototype moves towards the h-weighted mean of the batch with step
+    1 - prod(1 - epsilon_t * h), which is exactly the sequential update for batch_size=1.
+    """
+
+    def __init__(self, n_units, max_iter=100, lambda_i=10, lambda_f=0.01,
+                 epsilon_i=0.5, epsilon_f=0.05, random_state=None, batch_size=256, chunk_size=4096,
+                 verbose=False):
+        """
+        Initialize Batch Neural Gas
+
+        Parameters:
+        - n_units, max_iter, lambda_i, lambda_f, epsilon_i, epsilon_f, random_state: As in NeuralGas
+        - batch_size: Number of samples per prototype update
+        - chunk_size: Number of samples per distance matrix in predict, bounds memory to chunk_size x n_units
+        - verbose: Print progress every 20 iterations
+        """
+        super().__init__(n_units, max_iter=max_iter, lambda_i=lambda_i, lambda_f=lambda_f,
+                         epsilon_i=epsilon_i, epsilon_f=epsilon_f, random_state=random_state)
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.verbose = verbose
+        self.n_steps_ = 0
+        self._rng = np.random.RandomState(random_state)
+
+    def _initialize_prototypes(self, X):
+        """Initialize prototype vectors randomly from the data"""
+        indices = self._rng.choice(X.shape[0], self.n_units, replace=False)
+        self.prototypes_ = X[indices].astype(np.float64)
+
+    def _squared_distances(self, X):
+        """Squared euclidean distances of shape (n_samples, n_units)"""
+        x_norms = np.einsum("ij,ij->i", X, X)[:, None]
+        p_norms = np.einsum("ij,ij->i", self.prototypes_, self.prototypes_)[None, :]
+        distances = x_norms + p_norms - 2.0 * X @ self.prototypes_.T
+        np.maximum(distances, 0.0, out=distances)
+        return distances
+
+    def _update_batch(self, X_batch, t):
+        """Update prototype vectors for a mini-batch at annealing time t in [0, 1]"""
+        epsilon_t = self.epsilon_i * (self.epsilon_f / self.epsilon_i) ** t
+        lambda_t = self.lambda_i * (self.lambda_f / self.lambda_i) ** t
+
+        # ranks[i, k] - rank of prototype k for sample i (0 = closest)
+        order = np.argsort(self._squared_distances(X_batch), axis=1)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(self.n_units)[None, :], axis=1)
+
+        h = np.exp(-ranks / lambda_t)
+        step = 1.0 - np.exp(np.log1p(-epsilon_t * h).sum(axis=0))
+        h_sum = h.sum(axis=0)
+        weighted_mean = np.divide(h.T @ X_batch, h_sum[:, None],
+                                  out=self.prototypes_.copy(), where=h_sum[:, None] > 0)
+        self.prototypes_ += step[:, None] * (weighted_mean - self.prototypes_)
+
+    def _run_epoch(self, X, t):
+        indices = self._rng.permutation(X.shape[0])
+        for start in range(0, X.shape[0], self.batch_size):
+            self._update_batch(X[indices[start:start + self.batch_size]], t)
+
+    def fit(self, X):
+        """
+        Fit the Neural Gas model to the data
+
+        Parameters:
+        - X: Input data of shape (n_samples, n_features)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        self._initialize_prototypes(X)
+        for iteration in range(self.max_iter):
+            self._run_epoch(X, iteration / self.max_iter)
+            if self.verbose and (iteration + 1) % 20 == 0:
+                print(f"Iteration {iteration + 1}/{self.max_iter}")
+        self.n_steps_ = self.max_iter
+        self.labels_ = self.predict(X)
+        return self
+
+    def partial_fit(self, X):
+        """
+        Update the model with one mini-batch (or a larger block split into mini-batches)
+
+        Every call is one step of the annealing schedule, learning rate and neighborhood range
+        reach their final values after max_iter calls and stay there.
+
+        Parameters:
+        - X: Input data of shape (n_samples, n_features)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.prototypes_ is None:
+            self._initialize_prototypes(X)
+        self._run_epoch(X, min(self.n_steps_ / self.max_iter, 1.0))
+        self.n_steps_ += 1
+        return self
+
+    def _closest(self, X):
+        """Index of and squared distance to the closest prototype, computed in chunks"""
+        if self.prototypes_ is None:
+            raise ValueError("Model not fitted yet. Call fit() first.")
+        X = np.asarray(X, dtype=np.float64)
+        labels = np.empty(X.shape[0], dtype=np.int64)
+        distances = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], self.chunk_size):
+            chunk_distances = self._squared_distances(X[start:start + self.chunk_size])
+            labels[start:start + self.chunk_size] = chunk_distances.argmin(axis=1)
+            distances[start:start + self.chunk_size] = chunk_distances.min(axis=1)
+        return labels, distances
+
+    def predict(self, X):
+        """
+        Predict cluster labels for input data
+
+        Parameters:
+        - X: Input data of shape (n_samples, n_features)
+
+        Returns:
+        - labels: Cluster labels for each data point
+        """
+        return self._closest(X)[0]
+
+    def fit_predict(self, X):
+        return self.fit(X).labels_
+
+    def quantization_error(self, X):
+        """
+        Calculate quantization error
+
+        Parameters:
+        - X: Input data
+
+        Returns:
+        - error: Average distance to closest prototype
+        """
+        return float(np.sqrt(self._closest(X)[1]).mean())
+
+
 # Example usage and visualization
 def demonstrate_neural_gas():
     """Demonstrate the Neural Gas algorithm on synthetic data"""
+    import matplotlib.pyplot as plt
 
     # Generate sample data
     X, y_true = make_blobs(n_samples=300, centers=4, cluster_std=0.60,
@@ -189,6 +332,7 @@ def find_optimal_clusters(X, max_clusters=10):
     """
     Find optimal number of clusters using elbow method with quantization error
     """
+    import matplotlib.pyplot as plt
     errors = []
     cluster_range = range(2, max_clusters + 1)
 
@@ -211,6 +355,41 @@ def find_optimal_clusters(X, max_clusters=10):
     return errors
 
 
+def benchmark_neural_gas(n_samples=2000, n_features=384, n_units=20, max_iter=5, batch_size=256):
+    """
+    Compare NeuralGas and BatchNeuralGas on the demo blobs and on embedding-sized data
+
+    Returns:
+    - results: List of dicts with timings, quantization errors and ARI between the two labelings
+    """
+    datasets = [
+        ("demo_blobs", make_blobs(n_samples=300, centers=4, cluster_std=0.60, random_state=42), 4, 100),
+        ("embedding_blobs", make_blobs(n_samples=n_samples, n_features=n_features, centers=n_units,
+                                       random_state=42), n_units, max_iter),
+    ]
+    results = []
+    for name, (X, y_true), units, iterations in datasets:
+        X = StandardScaler().fit_transform(X)
+        row = {"dataset": name, "n_samples": X.shape[0], "n_features": X.shape[1]}
+        for key, model in [("reference", NeuralGas(n_units=units, max_iter=iterations, random_state=42)),
+                           ("batch", BatchNeuralGas(n_units=units, max_iter=iterations, random_state=42,
+                                                    batch_size=batch_size))]:
+            start_time = time.perf_counter()
+            model.fit(X)
+            row[f"{key}_fit_s"] = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            labels = model.predict(X)
+            row[f"{key}_predict_s"] = time.perf_counter() - start_time
+            row[f"{key}_quantization_error"] = float(model.quantization_error(X))
+            row[f"{key}_ari_true"] = adjusted_rand_score(y_true, labels)
+            row[f"{key}_labels"] = labels
+        row["ari_between"] = adjusted_rand_score(row.pop("reference_labels"), row.pop("batch_labels"))
+        row["fit_speedup"] = row["reference_fit_s"] / row["batch_fit_s"]
+        print(", ".join(f"{k}: {v:.4f}" if isinstance(v, float) else f"{k}: {v}" for k, v in row.items()))
+        results.append(row)
+    return results
+
+
 if __name__ == "__main__":
     # Demonstrate the algorithm
     ng_model, X_data, true_labels, pred_labels = demonstrate_neural_gas()
@@ -222,3 +401,5 @@ if __name__ == "__main__":
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X_data)
     find_optimal_clusters(X_scaled, max_clusters=24)
+
+    benchmark_neural_gas()
@@ -1,98 +1,535 @@
 import json
+import time
 from collections import defaultdict
-from typing import List
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from threading import Event, Thread
+from typing import Callable, Dict, List, Optional
 
+import numpy as np
 from sklearn.cluster import DBSCAN
 from tqdm import tqdm
 
-from src.data_struct.news import NewsStruct, NewsStructNE, NewsStructEmbed, NewsStructCompany
+from src.asset_index import AssetIndex
+from src.clusterization_step import select_representatives
+from src.data_struct.news import NewsStruct, NewsStructNE, NewsStructEmbed, NewsStructCompany, NewsRecord, \
+    news_timestamp, normalize_url, content_hash
+from src.data_struct.news_batch import NewsBatch
+from src.hotness import HotnessScorer, top_k
 from src.models.company_extractor import CompanyClassificator
-from src.models.embeddings_extractor import EmbeddingsExtractor
-from src.models.gigachat_api import GIGACHAT_cstm
 from src.models.named_entities_extractor import NEExtractor
 from src.models.summurizator import SummarizatorHotness
+from src.metrics import METRICS, InstrumentedLLM, Metrics
+from src.online_clustering import OnlineClusterizator
+from src.pipeline_executor import Stage, StagedPipeline
+from src.provenance import ORIGIN, ProvenanceAnalyzer
+from src.quotes import QuoteStore
+from src.progress import ProgressCallback, ProgressReporter
+from src.snapshot import save_snapshot, save_snapshot_clusters
+from src.story_store import StoryStore
+from src.story_timeline import StoryTimeline
 
 
 class NewsProcessor:
 
-    def __init__(self):
-        self.clusterer = DBSCAN(eps=3, min_samples=2)
+    def __init__(self, online: bool = False, story_horizon: timedelta = timedelta(hours=24),
+                 archive_dir: str = "stories_archive", snapshot_dir: str = "clusters_snapshot",
+                 metrics: Optional[Metrics] = None, gpt_model=None, emb_extr=None,
+                 tickers: Optional[Dict[str, str]] = None, hotness_scorer: Optional[HotnessScorer] = None,
+                 llm_hotness_top_k: int = 20, quote_store: Optional[QuoteStore] = None):
+        """
+        gpt_model (an object with process(messages)), emb_extr (EmbeddingsExtractor interface) and
+        tickers (company name -> ticker) default to GigaChat, all-MiniLM-L6-v2 and models/moex_ru_shares.json;
+        they are imported only when not given, so fakes can be used without credentials and models.
+        Hotness of every cluster comes from hotness_scorer (stories are ranked by it), the LLM score is asked
+        only for the llm_hotness_top_k locally hottest clusters of each cluster_analysis call and reported
+        separately as hotness_llm.
+        With a quote_store every story gets the price reaction of its tickers around its first publication.
+        """
+        self.online = online
+        self.metrics = metrics if metrics is not None else METRICS
+        self.snapshot_dir = snapshot_dir
+        self.hotness_scorer = hotness_scorer if hotness_scorer is not None else HotnessScorer()
+        self.llm_hotness_top_k = llm_hotness_top_k
+        # labels of the current cluster_analysis call: local hotness and whether the LLM scores them
+        self.local_hotness: Dict[int, float] = dict()
+        self.llm_hotness_labels: set = set()
+        # origin, reprints and rewrites inside every formatted story
+        self.provenance_analyzer = ProvenanceAnalyzer()
+        self.quote_store = quote_store
+        # latest publication time processed (never ahead of the wall clock): local hotness is measured at it,
+        # so stories scored by different calls share one clock
+        self.watermark: Optional[float] = None
+        if online:
+            self.clusterer = OnlineClusterizator()
+            self.story_store = StoryStore(self.clusterer, story_horizon, archive_dir)
+        else:
+            self.clusterer = DBSCAN(eps=3, min_samples=2)
         self.clusters_dict = defaultdict(list)
         self.clusters_analysed_dict = defaultdict(dict)
-        self.giga_cstm_instance = GIGACHAT_cstm()
-        self.neextr = NEExtractor(self.giga_cstm_instance)
-        cnames2tickers = dict()
-        with open("./models/moex_ru_shares.json", "r", encoding="utf-8") as f:
-            tickers2names = json.load(f)
-            for ticker, cname in tickers2names.items():
-                cnames2tickers[cname] = ticker
-                cnames2tickers[cname.lower()] = ticker
-        self.company_classificator = CompanyClassificator(self.giga_cstm_instance, cnames2tickers)
-        self.emb_extr = EmbeddingsExtractor()
-        self.hotness_analyser_summarizer = SummarizatorHotness(self.giga_cstm_instance)
-
-    def process_news(self, news_structs_list: List[NewsStruct]):
-        news_struct_ne_list = self.extract_ne_news(news_structs_list)
-        news_struct_classified_list = self.classify_news(news_struct_ne_list)
-        news_struct_embeds_list = self.extract_embeddings(news_struct_classified_list)
-
-        self.cluster_news(news_struct_embeds_list)
-
-        cstm_clusters_dict = dict()
-        for label, cluster_list in self.clusters_dict.items():
-            cstm_clusters_dict[label] = [str(x) for x in cluster_list]
+        self.asset_index = AssetIndex(self.clusterer.resolve if online else None)
+        # incremental mode: normalized url -> (content hash, processed news)
+        self.processed_cache: Dict[str, tuple] = dict()
+        # batch incremental mode: member urls of a cluster -> its analysis from the previous call
+        self.analysed_by_members: Dict[frozenset, dict] = dict()
+        # progress events and cancellation of the current process_news call, see _progress
+        self.reporter = ProgressReporter(llm_in_flight=self.metrics.llm_in_flight_total)
+        if gpt_model is None:
+            from src.models.gigachat_api import GIGACHAT_cstm
+            gpt_model = GIGACHAT_cstm()
+        self.giga_cstm_instance = gpt_model
+        self.neextr = NEExtractor(InstrumentedLLM(self.giga_cstm_instance, "ne_extractor", self.metrics))
+        if tickers is None:
+            with open("./models/moex_ru_shares.json", "r", encoding="utf-8") as f:
+                tickers = {cname: ticker for ticker, cname in json.load(f).items()}
+        self.company_classificator = CompanyClassificator(
+            InstrumentedLLM(self.giga_cstm_instance, "company_classificator", self.metrics), tickers)
+        if emb_extr is None:
+            from src.models.embeddings_extractor import EmbeddingsExtractor
+            emb_extr = EmbeddingsExtractor()
+        self.emb_extr = emb_extr
+        self.hotness_analyser_summarizer = SummarizatorHotness(
+            InstrumentedLLM(self.giga_cstm_instance, "summarizator_hotness", self.metrics))
 
-        with open("clusters_summarization.json", "w", encoding="utf-8") as f:
-            json.dump(cstm_clusters_dict, f, ensure_ascii=False)
+    @contextmanager
+    def _progress(self, progress: Optional[ProgressCallback] = None, cancel_event: Optional[Event] = None):
+        """
+        Send phase events of the run inside the block to progress (see src.progress.ProgressReporter):
+        NE extraction, classification, embeddings, clustering and summarizing report items done/total
+        and LLM calls in flight. When cancel_event is set the run stops with Cancelled
+        between items (summarizing with several workers finishes clusters already in progress).
+        """
+        previous = self.reporter
+        self.reporter = ProgressReporter(progress, cancel_event, llm_in_flight=self.metrics.llm_in_flight_total)
+        try:
+            yield self.reporter
+        finally:
+            self.reporter = previous
 
-        self.cluster_analysis()
-        news_clusters_formated_list = self.news_clusters_formater()
+    def process_news(self, news_structs_list: List[NewsStruct], progress: Optional[ProgressCallback] = None,
+                     cancel_event: Optional[Event] = None):
+        with self._progress(progress, cancel_event):
+            if not self.online:
+                # batch mode: every call is a separate run, labels of previous runs are meaningless
+                self.clusters_dict.clear()
+                self.clusters_analysed_dict.clear()
+                self.asset_index = AssetIndex()
+            # one NewsRecord per article enriched in place instead of a new object per stage
+            news_records_list = [NewsRecord.from_news(x) for x in news_structs_list]
+            news_struct_ne_list = self.extract_ne_news(news_records_list)
+            news_struct_classified_list = self.classify_news(news_struct_ne_list)
+            news_struct_embeds_list = self.extract_embeddings(news_struct_classified_list)
+
+            self.cluster_news(news_struct_embeds_list)
+            return self.summarize_clusters()
+
+    def process_news_incremental(self, news_structs_list: List[NewsStruct],
+                                 progress: Optional[ProgressCallback] = None,
+                                 cancel_event: Optional[Event] = None) -> Dict[str, list]:
+        """
+        process_news for overlapping windows (periodic refresh): news already processed by a previous call
+        (same normalized url and content hash) reuse their entities, companies and embeddings,
+        only new or edited news go through the LLM and embedding models.
+        Only stories that gained members are summarized again.
+
+        Online mode clusters only the new news, batch mode re-runs DBSCAN on cached embeddings of the whole
+        window and reuses the analysis of clusters with exactly the same members.
+
+        Returns:
+        - diff: {"new": [...], "updated": [...], "unchanged": [...]} formatted stories
+        """
+        with self._progress(progress, cancel_event):
+            fresh, known, window_keys = [], [], set()
+            for news_struct in news_structs_list:
+                key = normalize_url(news_struct.source_link)
+                if key in window_keys:
+                    continue
+                window_keys.add(key)
+                cached = self.processed_cache.get(key)
+                if cached is not None and cached[0] == content_hash(news_struct):
+                    known.append(news_struct)
+                    continue
+                fresh.append(NewsRecord.from_news(news_struct))
+            print(f"Incremental processing: {len(fresh)} new or changed, {len(known)} already processed news")
+            self.metrics.cache("processed_news", hits=len(known), misses=len(fresh))
+
+            news_struct_embeds_list = self.extract_embeddings(self.classify_news(self.extract_ne_news(fresh)))
+            for news_struct, news_struct_embed in zip(fresh, news_struct_embeds_list):
+                self.processed_cache[normalize_url(news_struct.source_link)] = (content_hash(news_struct),
+                                                                                  news_struct_embed)
+
+            if self.online:
+                previous_labels = set(self.clusters_analysed_dict)
+                self.clusters_dict.clear()
+                if news_struct_embeds_list:
+                    self.cluster_news(news_struct_embeds_list)
+                changed_labels = list(self.clusters_dict)
+                updated_labels = set(changed_labels) & previous_labels
+                horizon_start = None
+                if self.story_store.watermark is not None:
+                    horizon_start = self.story_store.watermark - self.story_store.horizon.total_seconds()
+                self._trim_processed_cache(window_keys, horizon_start)
+            else:
+                self.clusters_dict.clear()
+                self.clusters_analysed_dict.clear()
+                self.asset_index = AssetIndex()
+                window = [self.processed_cache[normalize_url(x.source_link)][1] for x in known]
+                window += news_struct_embeds_list
+                if window:
+                    self.cluster_news(window)
+                previous_keys = set().union(*self.analysed_by_members) if self.analysed_by_members else set()
+                changed_labels, updated_labels, analysed_by_members = [], set(), dict()
+                for label, cluster_list in self.clusters_dict.items():
+                    members = frozenset(normalize_url(x.source_link) for x in cluster_list)
+                    self.metrics.cache("cluster_analysis", hits=int(members in self.analysed_by_members),
+                                       misses=int(members not in self.analysed_by_members))
+                    if members in self.analysed_by_members:
+                        self.clusters_analysed_dict[label] = self.analysed_by_members[members]
+                    else:
+                        changed_labels.append(label)
+                        if members & previous_keys:
+                            updated_labels.add(label)
+                self._trim_processed_cache(window_keys)
+
+            news_clusters_formated_list = self.summarize_clusters(labels=changed_labels)
+            if not self.online:
+                self.analysed_by_members = {
+                    frozenset(normalize_url(x.source_link) for x in cluster_analysed["cluster_list"]): cluster_analysed
+                    for cluster_analysed in self.clusters_analysed_dict.values()
+                }
+            diff = {"new": [], "updated": [], "unchanged": []}
+            changed_labels = set(changed_labels)
+            for story in news_clusters_formated_list:
+                if story["dedup_group"] in updated_labels:
+                    diff["updated"].append(story)
+                elif story["dedup_group"] in changed_labels:
+                    diff["new"].append(story)
+                else:
+                    diff["unchanged"].append(story)
+            print(f"Stories: {len(diff['new'])} new, {len(diff['updated'])} updated, "
+                  f"{len(diff['unchanged'])} unchanged")
+            return diff
+
+    def _trim_processed_cache(self, window_keys: set, horizon_start: Optional[float] = None):
+        # keep news of the current window and, in online mode, news still inside the story horizon
+        for key in [x for x in self.processed_cache if x not in window_keys]:
+            timestamp = news_timestamp(self.processed_cache[key][1])
+            if horizon_start is None or timestamp is None or timestamp < horizon_start:
+                del self.processed_cache[key]
+
+    def process_news_pipelined(self, news_structs_list: List[NewsStruct], llm_workers: int = 8,
+                               embed_batch_size: int = 32, summary_workers: int = 4,
+                               progress: Optional[ProgressCallback] = None, cancel_event: Optional[Event] = None):
+        """
+        Same result as process_news, but NE extraction, classification and embedding run as concurrent
+        stages connected by bounded queues: LLM stages with llm_workers threads each, embeddings in batches
+        of embed_batch_size. Cluster summarization runs summary_workers clusters at once.
+        The running pipeline is available as self.pipeline, setting cancel_event cancels it.
+        """
+        with self._progress(progress, cancel_event), ExitStack() as phases:
+            if not self.online:
+                self.clusters_dict.clear()
+                self.clusters_analysed_dict.clear()
+                self.asset_index = AssetIndex()
+            self.pipeline = StagedPipeline([
+                Stage("NE extraction", self._reported("NE extraction", self.neextr.extract_ne_from_news),
+                      workers=llm_workers),
+                Stage("Company and industry Classification",
+                      self._reported("Company and industry Classification", self.company_classificator.extract),
+                      workers=llm_workers),
+                Stage("Extract embeddings",
+                      self._reported("Extract embeddings", self.emb_extr.extract_from_news_list, batched=True),
+                      batch_size=embed_batch_size),
+            ])
+            for stage in self.pipeline.stages:
+                phases.enter_context(self.reporter.phase(stage.name, len(news_structs_list)))
+            watcher, finished = None, Event()
+            if cancel_event is not None:
+                # stops the stages even when no item finishes, e.g. all workers wait for the LLM
+                watcher = Thread(target=self._cancel_pipeline_on, args=(self.pipeline, cancel_event, finished),
+                                 name="pipeline-cancel", daemon=True)
+                watcher.start()
+            try:
+                with self.metrics.stage("Enrichment pipeline", len(news_structs_list)):
+                    news_struct_embeds_list = self.pipeline.run([NewsRecord.from_news(x) for x in news_structs_list])
+            finally:
+                finished.set()
+                if watcher is not None:
+                    watcher.join()
+            phases.close()
+            self.reporter.check_cancelled("Enrichment pipeline")
+            self.cluster_news(news_struct_embeds_list)
+            return self.summarize_clusters(summary_workers)
+
+    def _reported(self, phase: str, fn: Callable, batched: bool = False) -> Callable:
+        # stage function that counts its items in the phase of self.reporter,
+        # Cancelled raised by advance fails the stage and so cancels the whole pipeline
+        def run(value):
+            result = fn(value)
+            self.reporter.advance(phase, len(result) if batched else 1)
+            return result
+
+        return run
+
+    @staticmethod
+    def _cancel_pipeline_on(pipeline: StagedPipeline, cancel_event: Event, finished: Event):
+        while not finished.is_set():
+            if cancel_event.wait(0.1):
+                pipeline.cancel()
+                return
 
-        with open("news_clusters_formated_list.json", "w", encoding="utf-8") as f:
-            json.dump(news_clusters_formated_list, f, ensure_ascii=False)
+    def process_news_cluster_first(self, news_structs_list: List[NewsStruct], n_representatives: int = 3,
+                                   progress: Optional[ProgressCallback] = None, cancel_event: Optional[Event] = None):
+        """
+        Alternative pipeline order: embed raw header+text, cluster, run LLM enrichment only for
+        representatives of every cluster (medoid plus the most diverse members) and propagate
+        their entities, industries, companies and tickers to the rest of the cluster
+        """
+        with self._progress(progress, cancel_event):
+            if not self.online:
+                self.clusters_dict.clear()
+                self.clusters_analysed_dict.clear()
+                self.asset_index = AssetIndex()
+            news_records_list = [NewsRecord.from_news(x) for x in news_structs_list]
+            self.cluster_batch(self.extract_raw_embeddings(news_records_list), news_records_list)
+            self.enrich_clusters(n_representatives)
+            return self.summarize_clusters()
+
+    def summarize_clusters(self, summary_workers: int = 1, labels: Optional[List[int]] = None):
+        # articles, enrichments, embeddings and assignments are saved before the LLM analysis
+        # so the run can be inspected or re-clustered without recomputation, see src/snapshot.py
+        for label, cluster_list in self.clusters_dict.items():
+            for news_struct in cluster_list:
+                self.asset_index.add_news(news_struct, None if label == -1 and not self.online else label)
+        # online mode: clusters_dict has only the stories touched by this batch, the snapshot keeps
+        # all live stories like clusters.json
+        snapshot_clusters = self.clusters_dict.items() if not self.online else \
+            ((story_id, [x for x in story.members if x is not None])
+             for story_id, story in self.clusterer.stories.items())
+        news_list, labels_list = [], []
+        for label, cluster_list in snapshot_clusters:
+            news_list.extend(cluster_list)
+            labels_list.extend([label] * len(cluster_list))
+        with self.metrics.stage("Save snapshot", len(news_list)):
+            save_snapshot(self.snapshot_dir, news_list, labels_list)
+
+        self.cluster_analysis(summary_workers, labels)
+        news_clusters_formated_list = self.news_clusters_formater()
+        # the formatted stories are kept only as clusters.json of the snapshot
+        save_snapshot_clusters(self.snapshot_dir, news_clusters_formated_list)
         return news_clusters_formated_list
 
     def extract_ne_news(self, news_structs_list: List[NewsStruct]) -> List[NewsStructNE]:
         news_struct_ne_list = list()
-        for news_struct in tqdm(news_structs_list, desc="NE extraction"):
-            news_struct_ne = self.neextr.extract_ne_from_news(news_struct)
-            news_struct_ne_list.append(news_struct_ne)
+        with self.metrics.stage("NE extraction", len(news_structs_list)), \
+                self.reporter.phase("NE extraction", len(news_structs_list)):
+            for news_struct in tqdm(news_structs_list, desc="NE extraction"):
+                news_struct_ne = self.neextr.extract_ne_from_news(news_struct)
+                news_struct_ne_list.append(news_struct_ne)
+                self.reporter.advance("NE extraction")
         return news_struct_ne_list
 
     def classify_news(self, news_struct_ne_list: List[NewsStructNE]) -> List[NewsStructCompany]:
         news_struct_classified_list = list()
-        for news_struct_ne in tqdm(news_struct_ne_list, desc="Company and industry Classification"):
-            news_struct_classified = self.company_classificator.extract(news_struct_ne)
-            news_struct_classified_list.append(news_struct_classified)
+        with self.metrics.stage("Company and industry Classification", len(news_struct_ne_list)), \
+                self.reporter.phase("Company and industry Classification", len(news_struct_ne_list)):
+            for news_struct_ne in tqdm(news_struct_ne_list, desc="Company and industry Classification"):
+                news_struct_classified = self.company_classificator.extract(news_struct_ne, resolve=False)
+                news_struct_classified_list.append(news_struct_classified)
+                self.reporter.advance("Company and industry Classification")
+            self.company_classificator.resolve_tickers(news_struct_classified_list)
         return news_struct_classified_list
 
     def extract_embeddings(self, news_struct_classified_list: List[NewsStructCompany]) -> List[NewsStructEmbed]:
         news_struct_embeds_list = list()
-        for news_struct_classified in tqdm(news_struct_classified_list, desc="Extract embeddings"):
-            news_struct_embed = self.emb_extr.extract_from_news(news_struct_classified)
-            news_struct_embeds_list.append(news_struct_embed)
+        with self.metrics.stage("Extract embeddings", len(news_struct_classified_list)), \
+                self.reporter.phase("Extract embeddings", len(news_struct_classified_list)):
+            for news_struct_classified in tqdm(news_struct_classified_list, desc="Extract embeddings"):
+                news_struct_embed = self.emb_extr.extract_from_news(news_struct_classified)
+                news_struct_embeds_list.append(news_struct_embed)
+                self.reporter.advance("Extract embeddings")
         return news_struct_embeds_list
 
+    def extract_raw_embeddings(self, news_structs_list: List[NewsStruct]) -> NewsBatch:
+        """Columnar batch of the news with embeddings of raw header and text, one model call for all of them"""
+        print("Extract raw embeddings")
+        news_batch = NewsBatch.from_news_list(news_structs_list)
+        with self.metrics.stage("Extract raw embeddings", len(news_batch)), \
+                self.reporter.phase("Extract raw embeddings", len(news_batch)):
+            self.emb_extr.extract_from_batch(news_batch)
+            self.reporter.advance("Extract raw embeddings", len(news_batch))
+        return news_batch
+
+    def enrich_clusters(self, n_representatives: int = 3):
+        """
+        LLM enrichment of the representatives of every cluster (every article of DBSCAN noise),
+        their tickers are resolved in one batched call, then the merged entities, industries,
+        companies and tickers of the representatives are copied to the other members of the cluster
+        """
+        representatives_dict = dict()
+        for label, cluster_list in self.clusters_dict.items():
+            if not self.online and label == -1:
+                # DBSCAN noise: every article is its own cluster
+                representatives_dict[label] = list(cluster_list)
+            else:
+                idx = select_representatives(np.stack([x.embedding for x in cluster_list]), n_representatives)
+                representatives_dict[label] = [cluster_list[i] for i in idx]
+        to_enrich = [x for representatives in representatives_dict.values() for x in representatives
+                     if x.named_entities is None]
+        with self.metrics.stage("Representatives enrichment", len(to_enrich)), \
+                self.reporter.phase("Representatives enrichment", len(to_enrich)):
+            for news_struct in tqdm(to_enrich, desc="Representatives enrichment"):
+                self.company_classificator.extract(self.neextr.extract_ne_from_news(news_struct), resolve=False)
+                self.reporter.advance("Representatives enrichment")
+            self.company_classificator.resolve_tickers(to_enrich)
+
+        for label, representatives in representatives_dict.items():
+            if not self.online and label == -1:
+                continue
+            named_entities, industry_list, companies_names_list, companies_tickers_list = {}, {}, {}, {}
+            for news_struct in representatives:
+                for x in news_struct.named_entities:
+                    named_entities.setdefault((x.name_type, x.name_text), x)
+                for x in news_struct.industry_list:
+                    industry_list.setdefault(x.industry_name, x)
+                for x, ticker in zip(news_struct.companies_names_list, news_struct.companies_tickers_list):
+                    if x.company_name not in companies_names_list:
+                        companies_names_list[x.company_name] = x
+                        companies_tickers_list[x.company_name] = ticker
+            for news_struct in self.clusters_dict[label]:
+                if news_struct.named_entities is None:
+                    news_struct.named_entities = list(named_entities.values())
+                    news_struct.industry_list = list(industry_list.values())
+                    news_struct.companies_names_list = list(companies_names_list.values())
+                    news_struct.companies_tickers_list = list(companies_tickers_list.values())
+        n_news = sum(len(x) for x in self.clusters_dict.values())
+        self.metrics.cache("representatives_enrichment", hits=n_news - len(to_enrich), misses=len(to_enrich))
+        print(f"LLM enrichment for {len(to_enrich)} of {n_news} news")
+
     def cluster_news(self, news_structs: List[NewsStructEmbed]):
         embeddings_list = [x.embedding for x in news_structs]
         print("Start clustering")
-        labels = self.clusterer.fit_predict(embeddings_list)
+        with self.metrics.stage("Clustering", len(news_structs)), self.reporter.phase("Clustering", len(news_structs)):
+            if self.online:
+                # future-dated news would otherwise keep their stories live and evict all the others
+                timestamps = self.story_store.clamp([news_timestamp(x) for x in news_structs])
+                labels = self.clusterer.partial_fit_predict(embeddings_list, news_structs, timestamps)
+                self.story_store.observe(timestamps)
+                self.story_store.advance()
+                self.watermark = self.story_store.watermark
+                if self.story_store.watermark is not None:
+                    self.asset_index.trim_before(
+                        self.story_store.watermark - self.story_store.horizon.total_seconds())
+            else:
+                labels = self.clusterer.fit_predict(embeddings_list)
+                self._advance_watermark([news_timestamp(x) for x in news_structs])
+            self.reporter.advance("Clustering", len(news_structs))
         print("Clustering complete")
         self.news_structs_embed_list = news_structs
         self.news_structs_labels_list = labels
+        if self.online:
+            # story ids are persistent: stories touched by this batch are reported with all their members
+            self.clusters_dict.clear()
+            for story_id in set(int(x) for x in labels):
+                if story_id in self.clusterer.stories:
+                    self.clusters_dict[story_id] = list(self.clusterer.stories[story_id].members)
+            for story_id in [x for x in self.clusters_analysed_dict if x not in self.clusterer.stories]:
+                del self.clusters_analysed_dict[story_id]
+            return
         for news_structs_embed, news_structs_labels in zip(news_structs, labels):
             self.clusters_dict[int(news_structs_labels)].append(news_structs_embed)
 
-    def cluster_analysis(self):
-        for label, cluster_list in tqdm(self.clusters_dict.items(), total=len(self.clusters_dict), desc="Summarizing"):
-            texts_list = [x.header + "\n" + x.text for x in cluster_list]
-            summarization = self.hotness_analyser_summarizer.summarize(texts_list)
-            hottness = self.hotness_analyser_summarizer.hotness_extractor(texts_list)
-            self.clusters_analysed_dict[label] = {
-                "cluster_list": cluster_list,
-                "summarization": summarization,
-                "hotness": hottness
-            }
+    def _advance_watermark(self, timestamps: List[Optional[float]]):
+        # publication times from the future (wrong time zones, bogus dates) are clamped to the wall clock
+        wall_time = time.time()
+        known = [min(x, wall_time) for x in timestamps if x is not None]
+        if known and (self.watermark is None or max(known) > self.watermark):
+            self.watermark = max(known)
+
+    def cluster_batch(self, news_batch: NewsBatch, news_structs_list: Optional[List[NewsStruct]] = None) -> np.ndarray:
+        """
+        Cluster the rows of a batch like cluster_news (story store, watermark, clusters_dict),
+        labels are also stored in news_batch.labels
+
+        Parameters:
+        - news_batch: News with embeddings, they are computed from header and text when missing
+        - news_structs_list: Objects of the rows that become cluster members and get the row embeddings,
+          NewsRecords restored from the batch by default
+        """
+        if news_batch.embeddings is None:
+            self.emb_extr.extract_from_batch(news_batch)
+        if news_structs_list is None:
+            news_structs_list = news_batch.to_news_list()
+        else:
+            for news_struct, embedding in zip(news_structs_list, news_batch.embeddings):
+                news_struct.embedding = embedding
+        self.cluster_news(news_structs_list)
+        news_batch.labels = np.asarray(self.news_structs_labels_list, dtype=np.int64)
+        return news_batch.labels
+
+    def cluster_analysis(self, summary_workers: int = 1, labels: Optional[List[int]] = None):
+        """Summarize and score clusters with the given labels (all clusters by default)"""
+        clusters = list(self.clusters_dict.items()) if labels is None else \
+            [(x, self.clusters_dict[x]) for x in labels]
+        with self.metrics.stage("Local hotness", len(clusters)):
+            scores = self.hotness_scorer.score([x for _, x in clusters],
+                                               now=self.watermark if self.watermark is not None else time.time())
+        # DBSCAN noise is not a story: no hotness, never sent to the LLM scoring
+        self.local_hotness = {label: float(score) for (label, _), score in zip(clusters, scores)
+                              if self.online or label != -1}
+        candidates = [i for i, (label, _) in enumerate(clusters) if self.online or label != -1]
+        self.llm_hotness_labels = {clusters[candidates[i]][0]
+                                   for i in top_k(scores[candidates], self.llm_hotness_top_k)}
+        with self.metrics.stage("Summarizing", len(clusters)), self.reporter.phase("Summarizing", len(clusters)):
+            if summary_workers > 1:
+                pipeline = StagedPipeline([Stage("Summarizing", self._analyse_cluster, workers=summary_workers)])
+                for label, cluster_analysed in pipeline.run(clusters):
+                    self.clusters_analysed_dict[label] = cluster_analysed
+                return
+            for label, cluster_list in tqdm(clusters, total=len(clusters), desc="Summarizing"):
+                self.clusters_analysed_dict[label] = self._analyse_cluster((label, cluster_list))[1]
+
+    def _analyse_cluster(self, label_cluster):
+        label, cluster_list = label_cluster
+        texts_list = [x.header + "\n" + x.text for x in cluster_list]
+        summarization = self.hotness_analyser_summarizer.summarize(texts_list)
+        local_hotness = self.local_hotness.get(label)
+        llm_hotness = None
+        if label in self.llm_hotness_labels:
+            llm_hotness = self.hotness_analyser_summarizer.hotness_score(texts_list)
+        # Cancelled raised here also stops the summarizing pipeline
+        self.reporter.advance("Summarizing")
+        return label, {
+            "cluster_list": cluster_list,
+            "summarization": summarization,
+            # the LLM 1-100 score is not calibrated to the local scale, ranking uses the local score only
+            "hotness": local_hotness,
+            "hotness_local": local_hotness,
+            "hotness_llm": llm_hotness
+        }
+
+    def story_dynamics(self, label: int, cluster_list: List[NewsStruct],
+                       timestamps: Optional[List[Optional[float]]] = None) -> dict:
+        """
+        StoryTimeline signals of a cluster measured at the pipeline watermark: online stories keep their
+        timeline up to date as members arrive, batch clusters get one built from the member times
+        (given sorted, so the build is linear)
+        """
+        now = self.watermark if self.watermark is not None else time.time()
+        if self.online and label in self.clusterer.stories:
+            return self.clusterer.stories[label].timeline.signals(now)
+        if timestamps is None:
+            timestamps = [news_timestamp(x) for x in cluster_list]
+        return StoryTimeline.from_timestamps(timestamps).signals(now)
+
+    @staticmethod
+    def _why_now(dynamics: dict) -> str:
+        if dynamics["burst"]:
+            return f"Импульс: {dynamics['rolling_counts'][min(dynamics['rolling_counts'])]} публикаций " \
+                   f"за последние {min(dynamics['rolling_counts']) // 60} минут"
+        if dynamics["narrative"]:
+            return f"Нарастающий нарратив: {dynamics['count']} публикаций, новые выходят каждый час"
+        return ""
 
     def news_clusters_formater(self):
         results_list = []
@@ -101,17 +538,42 @@ class NewsProcessor:
             etities_list = []
             for news_struct_ in cluster_dict["cluster_list"]:
                 etities_list.extend(news_struct_.named_entities)
+            # members in publication order, news without time last
+            timestamps = [news_timestamp(x) for x in cluster_dict["cluster_list"]]
+            order = sorted(range(len(timestamps)), key=lambda i: (timestamps[i] is None, timestamps[i] or 0.0))
+            cluster_list = [cluster_dict["cluster_list"][i] for i in order]
+            timestamps = [timestamps[i] for i in order]
+            dynamics = self.story_dynamics(label, cluster_list, timestamps)
+            if not self.online and label == -1:
+                # DBSCAN noise: unrelated news, no common origin
+                provenance = []
+            else:
+                with self.metrics.stage("Provenance", len(cluster_list)):
+                    provenance = self.provenance_analyzer.analyse(cluster_list, timestamps)
+            market_reaction = None
+            if self.quote_store is not None and (self.online or label != -1):
+                with self.metrics.stage("Market reaction", len(cluster_list)):
+                    market_reaction = self.quote_store.story_reactions(cluster_list)
 
             results_list.append({
                 "headline": cluster_dict["summarization"],
                 "hotness": cluster_dict["hotness"],
-                "why_now": "",
+                "hotness_local": cluster_dict.get("hotness_local"),
+                "hotness_llm": cluster_dict.get("hotness_llm"),
+                "why_now": self._why_now(dynamics),
                 "entities": list(set([str(x) for x in etities_list])),
-                "sources": [x.date_time_ for x in cluster_dict["cluster_list"]],
-                "timeline": [x.source_link for x in cluster_dict["cluster_list"]],
+                "sources": [x.date_time_ for x in cluster_list],
+                "timeline": [x.source_link for x in cluster_list],
+                "dynamics": dynamics,
+                "origin": next((x["url"] for x in provenance if x["role"] == ORIGIN), None),
+                "provenance": provenance,
+                "market_reaction": market_reaction,
                 "draft": "",
                 "dedup_group": label
             })
+        # hottest stories first
+        results_list.sort(key=lambda x: x["hotness_local"] if x["hotness_local"] is not None else 0.0,
+                          reverse=True)
         return results_list
 
 
@@ -122,5 +584,7 @@ if __name__ == "__main__":
         for news in news_list:
             news_struct = NewsStruct(news["published"], news["url"], news["title"], news["text"])
             news_structs_list.append(news_struct)
-    np = NewsProcessor()
-    np.process_news(news_structs_list[:10])
+    news_processor = NewsProcessor()
+    news_processor.process_news(news_structs_list[:10])
+    news_processor.metrics.save_report("metrics_report.json")
+    news_processor.metrics.write_prometheus("metrics.prom")
@@ -0,0 +1,312 @@
+import json
+import sqlite3
+import threading
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.data_struct.news import NewsStruct, parse_timestamp
+from src.data_struct.news_batch import url_domain
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    domain TEXT,
+    published TEXT,
+    published_ts INTEGER,
+    title TEXT,
+    text TEXT,
+    source TEXT,
+    error TEXT,
+    story_id INTEGER,
+    enrichment TEXT
+);
+CREATE INDEX IF NOT EXISTS news_published_idx ON news(published_ts);
+CREATE INDEX IF NOT EXISTS news_domain_idx ON news(domain, published_ts);
+CREATE INDEX IF NOT EXISTS news_story_idx ON news(story_id, published_ts);
+
+CREATE TABLE IF NOT EXISTS news_tickers (
+    ticker TEXT NOT NULL,
+    published_ts INTEGER,
+    news_id INTEGER NOT NULL REFERENCES news(id) ON DELETE CASCADE,
+    PRIMARY KEY (ticker, published_ts, news_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS news_tickers_news_idx ON news_tickers(news_id);
+-- news_tickers keeps a copy of the publication time for ticker + time range scans
+CREATE TRIGGER IF NOT EXISTS news_tickers_published_update AFTER UPDATE OF published_ts ON news
+WHEN old.published_ts IS NOT new.published_ts BEGIN
+    UPDATE news_tickers SET published_ts = new.published_ts WHERE news_id = new.id;
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(title, text, content='news', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS news_fts_insert AFTER INSERT ON news BEGIN
+    INSERT INTO news_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS news_fts_delete AFTER DELETE ON news BEGIN
+    INSERT INTO news_fts(news_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS news_fts_update AFTER UPDATE OF title, text ON news BEGIN
+    INSERT INTO news_fts(news_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    INSERT INTO news_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+END;
+"""
+
+# sortable columns of page()
+PAGE_ORDER_COLUMNS = ("published_ts", "domain", "title", "story_id")
+
+
+def fts_quote(text: str) -> str:
+    """Plain words as an FTS5 query: every word must be present as a word prefix, punctuation is not syntax"""
+    return " ".join('"' + x.replace('"', '""') + '"*' for x in text.split())
+
+
+class NewsStore:
+    """
+    Persistent SQLite store of collected news (fetch_news output) and their enrichments
+
+    Indexed by publication time, domain, ticker and story id, with an FTS5 full-text index over title and text.
+    Rows are returned as dicts with the fetch_news fields plus domain, published_ts, story_id and enrichment.
+    """
+
+    def __init__(self, path: str = "news_store.sqlite"):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute("PRAGMA cache_size=-65536")
+            self.connection.execute("PRAGMA foreign_keys=ON")
+            self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> dict:
+        result = dict(row)
+        if result.get("enrichment"):
+            result["enrichment"] = json.loads(result["enrichment"])
+        return result
+
+    def upsert_news(self, items: Iterable[dict]) -> int:
+        """Insert or update fetch_news items by url in one transaction, returns number of items written"""
+        rows = []
+        for x in items:
+            if not x.get("url"):
+                continue
+            published_ts = parse_timestamp(x.get("published"))
+            rows.append((x["url"], url_domain(x["url"]), None if x.get("published") is None else str(x["published"]),
+                         None if published_ts is None else int(published_ts),
+                         x.get("title"), x.get("text"), x.get("source"), x.get("error")))
+        with self._lock, self.connection:
+            self.connection.executemany(
+                """
+                INSERT INTO news (url, domain, published, published_ts, title, text, source, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    published = excluded.published,
+                    published_ts = excluded.published_ts,
+                    title = excluded.title,
+                    text = COALESCE(excluded.text, news.text),
+                    source = excluded.source,
+                    error = excluded.error
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def upsert_enrichments(self, news_structs_list: Sequence[NewsStruct],
+                           story_ids: Optional[Sequence[Optional[int]]] = None) -> int:
+        """
+        Store NE/industry/company enrichments, tickers and story ids of processed news (matched by source_link).
+        News missing in the store are inserted, stored ones keep their fetched fields.
+        A None story id (DBSCAN noise) leaves the stored story id unchanged.
+        """
+        rows, ticker_rows = [], []
+        for i, news_struct in enumerate(news_structs_list):
+            url = news_struct.source_link
+            if not url:
+                continue
+            enrichment = {
+                "named_entities": [[x.name_type, x.name_text]
+                                   for x in getattr(news_struct, "named_entities", None) or []],
+                "industries": [[x.industry_name, x.industry_forecast]
+                               for x in getattr(news_struct, "industry_list", None) or []],
+                "companies": [[x.company_name, x.company_forecast]
+                              for x in getattr(news_struct, "companies_names_list", None) or []],
+                "tickers": list(getattr(news_struct, "companies_tickers_list", None) or []),
+            }
+            story_id = int(story_ids[i]) if story_ids is not None and story_ids[i] is not None else None
+            published_ts = parse_timestamp(news_struct.date_time_)
+            rows.append((url, url_domain(url), None if news_struct.date_time_ is None else str(news_struct.date_time_),
+                         None if published_ts is None else int(published_ts), news_struct.header, news_struct.text,
+                         json.dumps(enrichment, ensure_ascii=False), story_id))
+            ticker_rows.extend((ticker, url) for ticker in dict.fromkeys(x for x in enrichment["tickers"] if x))
+        # three statements per call, whatever the number of news
+        with self._lock, self.connection:
+            self.connection.executemany(
+                """
+                INSERT INTO news (url, domain, published, published_ts, title, text, enrichment, story_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    enrichment = excluded.enrichment,
+                    story_id = COALESCE(excluded.story_id, news.story_id)
+                """,
+                rows,
+            )
+            self.connection.executemany(
+                "DELETE FROM news_tickers WHERE news_id = (SELECT id FROM news WHERE url = ?)",
+                [(x[0],) for x in rows])
+            self.connection.executemany(
+                """
+                INSERT OR IGNORE INTO news_tickers (ticker, published_ts, news_id)
+                SELECT ?, published_ts, id FROM news WHERE url = ?
+                """,
+                ticker_rows,
+            )
+        return len(rows)
+
+    def set_story_ids(self, urls: Sequence[str], story_ids: Sequence[int]):
+        with self._lock, self.connection:
+            self.connection.executemany("UPDATE news SET story_id = ? WHERE url = ?",
+                                        [(int(s), u) for u, s in zip(urls, story_ids)])
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self.connection.execute("SELECT * FROM news WHERE url = ?", (url,)).fetchone()
+        return None if row is None else self._row(row)
+
+    def iter_range(self, since: Optional[float] = None, until: Optional[float] = None,
+                   batch_size: int = 1000) -> Iterator[dict]:
+        """Stream news ordered by publication time, batch_size rows are read at once"""
+        last_ts, last_id = -1 << 62, -1
+        until = until if until is not None else 1 << 62
+        since = since if since is not None else -1 << 62
+        while True:
+            # keyset pagination, so the lock is not held while the caller consumes rows
+            with self._lock:
+                rows = self.connection.execute(
+                    """
+                    SELECT * FROM news
+                    WHERE published_ts >= ? AND published_ts <= ? AND (published_ts, id) > (?, ?)
+                    ORDER BY published_ts, id LIMIT ?
+                    """,
+                    (since, until, last_ts, last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row(row)
+            last_ts, last_id = rows[-1]["published_ts"], rows[-1]["id"]
+
+    def query(self, ticker: Optional[str] = None, domain: Optional[str] = None, story_id: Optional[int] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 1000) -> List[dict]:
+        """News filtered by ticker, domain, story id and publication time, newest first"""
+        tables, conditions, params = ["news"], [], []
+        if ticker is not None:
+            tables.append("JOIN news_tickers ON news_tickers.news_id = news.id")
+            conditions.append("news_tickers.ticker = ?")
+            params.append(ticker)
+        if domain is not None:
+            conditions.append("news.domain = ?")
+            params.append(domain)
+        if story_id is not None:
+            conditions.append("news.story_id = ?")
+            params.append(story_id)
+        if since is not None:
+            conditions.append("news.published_ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("news.published_ts <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT news.* FROM {' '.join(tables)} {where} ORDER BY news.published_ts DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [self._row(x) for x in rows]
+
+    def search(self, text_query: str, since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = 100) -> List[dict]:
+        """Full-text search (FTS5 query syntax) over title and text, best matches first"""
+        conditions, params = ["news_fts MATCH ?"], [text_query]
+        if since is not None:
+            conditions.append("news.published_ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("news.published_ts <= ?")
+            params.append(until)
+        with self._lock:
+            rows = self.connection.execute(
+                f"""
+                SELECT news.* FROM news_fts JOIN news ON news.id = news_fts.rowid
+                WHERE {' AND '.join(conditions)} ORDER BY bm25(news_fts) LIMIT ?
+                """,
+                (*params, limit),
+            ).fetchall()
+        return [self._row(x) for x in rows]
+
+    def page(self, since: Optional[float] = None, until: Optional[float] = None,
+             domains: Optional[Sequence[str]] = None, ticker: Optional[str] = None,
+             text_query: Optional[str] = None, order_by: str = "published_ts", descending: bool = True,
+             offset: int = 0, limit: int = 50) -> Tuple[List[dict], int]:
+        """
+        One page of the news table for browsing: rows without text and enrichment, with tickers joined
+        into a string. Filters by time, domains, ticker and words of title/text are applied in SQL.
+
+        Returns:
+        - rows: At most limit rows starting at offset in the requested order
+        - total: Number of rows matching the filters
+        """
+        if order_by not in PAGE_ORDER_COLUMNS:
+            raise ValueError(f"order_by must be one of {PAGE_ORDER_COLUMNS}")
+        tables, conditions, params = ["news"], [], []
+        if text_query and text_query.strip():
+            tables.append("JOIN news_fts ON news_fts.rowid = news.id")
+            conditions.append("news_fts MATCH ?")
+            params.append(fts_quote(text_query))
+        if ticker:
+            conditions.append("news.id IN (SELECT news_id FROM news_tickers WHERE ticker = ?)")
+            params.append(ticker.strip().upper())
+        if domains:
+            conditions.append(f"news.domain IN ({', '.join('?' * len(domains))})")
+            params.extend(domains)
+        if since is not None:
+            conditions.append("news.published_ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("news.published_ts <= ?")
+            params.append(until)
+        source = f"{' '.join(tables)} {'WHERE ' + ' AND '.join(conditions) if conditions else ''}"
+        direction = "DESC" if descending else "ASC"
+        with self._lock:
+            total = self.connection.execute(f"SELECT COUNT(*) FROM {source}", params).fetchone()[0]
+            rows = self.connection.execute(
+                f"""
+                SELECT news.id, news.published, news.published_ts, news.domain, news.title, news.url,
+                       news.source, news.story_id, news.error,
+                       (SELECT group_concat(ticker, ', ') FROM news_tickers WHERE news_id = news.id) AS tickers
+                FROM {source} ORDER BY news.{order_by} {direction}, news.id {direction} LIMIT ? OFFSET ?
+                """,
+                (*params, limit, offset),
+            ).fetchall()
+        return [dict(x) for x in rows], total
+
+    def domains(self) -> List[Tuple[str, int]]:
+        """Domains with their number of news, the largest first"""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT domain, COUNT(*) FROM news GROUP BY domain ORDER BY COUNT(*) DESC").fetchall()
+        return [(x[0], x[1]) for x in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM news").fetchone()[0]
@@ -0,0 +1,316 @@
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from numpy import ndarray
+
+from src.story_timeline import StoryTimeline
+
+
+def _normalize(x: ndarray) -> ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    norm = np.linalg.norm(x, axis=-1, keepdims=True)
+    norm[norm == 0] = 1.0
+    return x / norm
+
+
+class Story:
+    """
+    Live story: running sum of member embeddings plus the members themselves.
+    The story_id never changes, merges keep the id of the older story.
+    timeline keeps the sorted member publication times with rolling counts, burst and narrative signals.
+    """
+
+    def __init__(self, story_id: int, embedding: ndarray, member=None, timestamp: Optional[float] = None,
+                 key: int = -1):
+        self.story_id = story_id
+        self.embedding_sum = embedding.astype(np.float32).copy()
+        self.member_embeddings = [embedding]
+        self.members = [member]
+        self.member_timestamps = [timestamp]
+        self.member_keys = [key]
+        self.centroid = _normalize(self.embedding_sum)
+        self.first_seen = timestamp
+        self.last_update = timestamp
+        self.timeline = StoryTimeline()
+        self.timeline.add(timestamp)
+
+    @property
+    def count(self) -> int:
+        return len(self.member_embeddings)
+
+    def add(self, embedding: ndarray, member=None, timestamp: Optional[float] = None, key: int = -1):
+        self.embedding_sum += embedding
+        self.member_embeddings.append(embedding)
+        self.members.append(member)
+        self.member_timestamps.append(timestamp)
+        self.member_keys.append(key)
+        self.centroid = _normalize(self.embedding_sum)
+        self.timeline.add(timestamp)
+        if timestamp is not None:
+            if self.first_seen is None or timestamp < self.first_seen:
+                self.first_seen = timestamp
+            if self.last_update is None or timestamp > self.last_update:
+                self.last_update = timestamp
+
+    def absorb(self, other: "Story"):
+        for i in range(other.count):
+            self.add(other.member_embeddings[i], other.members[i], other.member_timestamps[i], other.member_keys[i])
+
+
+class CentroidIndex:
+    """
+    Nearest-centroid index: a matrix of unit story centroids snapshotted at the last rebuild
+    plus a small brute-force buffer of stories created or moved since then.
+    Candidates are re-scored against live centroids by the caller.
+
+    Centroids are unit vectors, so the nearest ones are found by a matrix product. For sentence embeddings
+    (hundreds of dimensions) this is faster than a BallTree, whose pruning does not work in high dimension.
+    A query is still linear in the number of live stories (about 1 ms per 10000 stories of 384 dimensions),
+    so that number is bounded by StoryStore: by its time horizon and by max_stories.
+    """
+
+    def __init__(self, rebuild_ratio: float = 0.1, min_rebuild: int = 32, max_rebuild: int = 256,
+                 chunk_size: int = 1024):
+        self.rebuild_ratio = rebuild_ratio
+        self.min_rebuild = min_rebuild
+        # every query scans the whole buffer, so it is bounded also for large indexes
+        self.max_rebuild = max_rebuild
+        self.chunk_size = chunk_size
+        self.centroids = None
+        self.story_ids = np.empty(0, dtype=np.int64)
+        self.dirty: Set[int] = set()
+        self.removed: Set[int] = set()
+
+    def rebuild(self, stories: Dict[int, Story]):
+        self.dirty.clear()
+        self.removed.clear()
+        if not stories:
+            self.centroids = None
+            self.story_ids = np.empty(0, dtype=np.int64)
+            return
+        self.story_ids = np.fromiter(stories.keys(), dtype=np.int64, count=len(stories))
+        self.centroids = np.stack([stories[int(x)].centroid for x in self.story_ids])
+
+    def needs_rebuild(self) -> bool:
+        limit = min(self.max_rebuild, max(self.min_rebuild, self.rebuild_ratio * len(self.story_ids)))
+        return len(self.dirty) + len(self.removed) > limit
+
+    def touch(self, story_id: int):
+        self.dirty.add(story_id)
+
+    def remove(self, story_id: int):
+        self.dirty.discard(story_id)
+        self.removed.add(story_id)
+
+    def query(self, vectors: ndarray, k: int):
+        """
+        k most similar snapshot centroids for every row of vectors
+
+        Returns:
+        - similarities: (n, k) cosine similarities, most similar first
+        - idx: (n, k) positions in story_ids
+        """
+        k = min(k, len(self.story_ids))
+        similarities, idx = [], []
+        for start in range(0, len(vectors), self.chunk_size):
+            chunk_similarities = vectors[start:start + self.chunk_size] @ self.centroids.T
+            if k < chunk_similarities.shape[1]:
+                chunk_idx = np.argpartition(-chunk_similarities, k - 1, axis=1)[:, :k]
+            else:
+                chunk_idx = np.tile(np.arange(chunk_similarities.shape[1]), (len(chunk_similarities), 1))
+            chunk_similarities = np.take_along_axis(chunk_similarities, chunk_idx, axis=1)
+            order = np.argsort(-chunk_similarities, axis=1, kind="stable")
+            similarities.append(np.take_along_axis(chunk_similarities, order, axis=1))
+            idx.append(np.take_along_axis(chunk_idx, order, axis=1))
+        return np.concatenate(similarities), np.concatenate(idx)
+
+    def candidates(self, vector: ndarray, k: int) -> List[int]:
+        result = list(self.dirty)
+        if self.centroids is not None:
+            _, idx = self.query(vector.reshape(1, -1), k)
+            for story_id in self.story_ids[idx[0]].tolist():
+                if story_id not in self.dirty and story_id not in self.removed:
+                    result.append(story_id)
+        return result
+
+
+class OnlineClusterizator:
+    """
+    Incremental clustering for a continuous news feed
+
+    Every new embedding is matched against live story centroids through CentroidIndex and either joins
+    the most similar story or opens a new one. Story ids are persistent across calls, so downstream
+    caches keyed by story stay valid. Every maintenance_interval additions stories are merged
+    (centroid similarity above merge_threshold) and split (cohesion below split_threshold).
+    Default thresholds are tuned with benchmarks/clustering_benchmark.py: stricter ones split stories
+    whose members are spread like rewrites of the same news into many fragments.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.5, merge_threshold: float = 0.8,
+                 split_threshold: float = 0.4, maintenance_interval: int = 500,
+                 n_candidates: int = 8, min_split_size: int = 6):
+        """
+        Parameters:
+        - similarity_threshold: Minimal cosine similarity to the story centroid to join the story
+        - merge_threshold: Cosine similarity of two centroids above which stories are merged
+        - split_threshold: Mean member-to-centroid similarity below which a story is split in two
+        - maintenance_interval: Number of added articles between merge/split passes
+        - n_candidates: Number of nearest centroids taken from the index snapshot per query
+        - min_split_size: Stories smaller than that are never split
+        """
+        self.similarity_threshold = similarity_threshold
+        self.merge_threshold = merge_threshold
+        self.split_threshold = split_threshold
+        self.maintenance_interval = maintenance_interval
+        self.n_candidates = n_candidates
+        self.min_split_size = min_split_size
+        self.stories: Dict[int, Story] = dict()
+        self.aliases: Dict[int, int] = dict()
+        self.index = CentroidIndex()
+        self._next_story_id = 0
+        self._next_key = 0
+        self._since_maintenance = 0
+
+    def resolve(self, story_id: int) -> int:
+        while story_id in self.aliases:
+            story_id = self.aliases[story_id]
+        return story_id
+
+    def _new_story(self, embedding: ndarray, member=None, timestamp: Optional[float] = None,
+                   key: int = -1) -> Story:
+        story = Story(self._next_story_id, embedding, member, timestamp, key)
+        self._next_story_id += 1
+        self.stories[story.story_id] = story
+        self.index.touch(story.story_id)
+        return story
+
+    def _best_story(self, embedding: ndarray):
+        candidates = self.index.candidates(embedding, self.n_candidates)
+        if not candidates:
+            return None, -1.0
+        centroids = np.stack([self.stories[x].centroid for x in candidates])
+        similarities = centroids @ embedding
+        best = int(np.argmax(similarities))
+        return candidates[best], float(similarities[best])
+
+    def add(self, embedding: ndarray, member=None, timestamp: Optional[float] = None) -> int:
+        embedding = _normalize(embedding)
+        key = self._next_key
+        self._next_key += 1
+        story_id, similarity = self._best_story(embedding)
+        if story_id is not None and similarity >= self.similarity_threshold:
+            self.stories[story_id].add(embedding, member, timestamp, key)
+            self.index.touch(story_id)
+        else:
+            story_id = self._new_story(embedding, member, timestamp, key).story_id
+        self._since_maintenance += 1
+        if self._since_maintenance >= self.maintenance_interval:
+            self.maintain()
+        elif self.index.needs_rebuild():
+            self.index.rebuild(self.stories)
+        return story_id
+
+    def partial_fit_predict(self, embeddings: List[ndarray], members: Optional[list] = None,
+                            timestamps: Optional[List[Optional[float]]] = None) -> ndarray:
+        """
+        Assign a batch of embeddings to stories
+
+        Returns:
+        - labels: Persistent story id for each embedding (after merges and splits made during the batch)
+        """
+        n = len(embeddings)
+        members = members if members is not None else [None] * n
+        timestamps = timestamps if timestamps is not None else [None] * n
+        first_key = self._next_key
+        first_story_id = self._next_story_id
+        touched = set(self.add(e, m, t) for e, m, t in zip(embeddings, members, timestamps))
+        touched = set(self.resolve(x) for x in touched)
+        touched.update(x for x in self.stories if x >= first_story_id)
+        labels = np.full(n, -1, dtype=np.int64)
+        for story_id in touched:
+            for key in self.stories[story_id].member_keys:
+                if key >= first_key:
+                    labels[key - first_key] = story_id
+        return labels
+
+    def fit_predict(self, embeddings: List[ndarray]) -> ndarray:
+        return self.partial_fit_predict(embeddings)
+
+    def maintain(self):
+        self._since_maintenance = 0
+        self.index.rebuild(self.stories)
+        self._merge()
+        self._split()
+        self.index.rebuild(self.stories)
+
+    def _merge(self):
+        # one batched kNN query over the freshly rebuilt index, then candidate pairs from the most similar;
+        # live centroids are re-checked before every merge, so merged stories do not chain arbitrarily
+        story_ids = self.index.story_ids
+        if len(story_ids) < 2:
+            return
+        similarities, idx = self.index.query(self.index.centroids, self.n_candidates)
+        rows, columns = np.nonzero((similarities >= self.merge_threshold) & (idx != np.arange(len(idx))[:, None]))
+        order = np.argsort(-similarities[rows, columns], kind="stable")
+        for i, j in zip(rows[order].tolist(), idx[rows[order], columns[order]].tolist()):
+            story_id, other_id = self.resolve(int(story_ids[i])), self.resolve(int(story_ids[j]))
+            if story_id == other_id:
+                continue
+            story, other = self.stories[story_id], self.stories[other_id]
+            if float(other.centroid @ story.centroid) < self.merge_threshold:
+                continue
+            keep, drop = (story, other) if story_id < other_id else (other, story)
+            keep.absorb(drop)
+            del self.stories[drop.story_id]
+            self.aliases[drop.story_id] = keep.story_id
+            self.index.remove(drop.story_id)
+            self.index.touch(keep.story_id)
+
+    def _split(self):
+        for story_id in list(self.stories):
+            story = self.stories[story_id]
+            if story.count < self.min_split_size:
+                continue
+            members_matrix = np.stack(story.member_embeddings)
+            if float((members_matrix @ story.centroid).mean()) >= self.split_threshold:
+                continue
+            assignment = self._two_means(members_matrix)
+            if assignment.all() or not assignment.any():
+                continue
+            if assignment.sum() * 2 > len(assignment):
+                assignment = ~assignment
+            self.stories[story_id] = self._substory(story_id, story, np.flatnonzero(~assignment))
+            self.index.touch(story_id)
+            moved = self._substory(self._next_story_id, story, np.flatnonzero(assignment))
+            self._next_story_id += 1
+            self.stories[moved.story_id] = moved
+            self.index.touch(moved.story_id)
+
+    @staticmethod
+    def _substory(story_id: int, story: Story, idx: ndarray) -> Story:
+        first = int(idx[0])
+        substory = Story(story_id, story.member_embeddings[first], story.members[first],
+                         story.member_timestamps[first], story.member_keys[first])
+        for i in idx[1:]:
+            substory.add(story.member_embeddings[i], story.members[i], story.member_timestamps[i],
+                         story.member_keys[i])
+        return substory
+
+    @staticmethod
+    def _two_means(members_matrix: ndarray, n_iter: int = 10) -> ndarray:
+        centroid = _normalize(members_matrix.mean(axis=0))
+        seeds = [int(np.argmin(members_matrix @ centroid))]
+        seeds.append(int(np.argmin(members_matrix @ members_matrix[seeds[0]])))
+        centers = members_matrix[seeds]
+        assignment = np.zeros(len(members_matrix), dtype=bool)
+        for iteration in range(n_iter):
+            similarities = members_matrix @ centers.T
+            new_assignment = similarities[:, 1] > similarities[:, 0]
+            if iteration > 0 and (new_assignment == assignment).all():
+                break
+            assignment = new_assignment
+            if assignment.all() or not assignment.any():
+                break
+            centers = _normalize(np.stack([members_matrix[~assignment].mean(axis=0),
+                                           members_matrix[assignment].mean(axis=0)]))
+        return assignment
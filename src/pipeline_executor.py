@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Sequence
+
+from tqdm import tqdm
+
+# end of stream marker passed between stages
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a StagedPipeline
+
+    fn is applied to single items (batch_size=1) or to lists of up to batch_size items and then must return
+    a list of results of the same length. workers threads run the stage, its input queue holds at most
+    queue_size items, so a slow stage blocks the stages before it (backpressure).
+    """
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1, batch_size: int = 1, queue_size: int = 64,
+                 max_batch_wait: float = 0.05):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.max_batch_wait = max_batch_wait
+        self.cancelled = threading.Event()
+        self.done = 0
+        self.busy_time = 0.0
+        self.stats_lock = threading.Lock()
+
+
+class StagedPipeline:
+    """
+    Streaming executor: stages run concurrently in their own threads connected by bounded queues,
+    every item goes to the next stage as soon as it is ready, so total latency approaches the slowest stage
+    instead of the sum of all stages. Results are returned in input order.
+
+    cancel(stage_name) stops that stage and all stages before it, items already past it are finished.
+    cancel() stops everything. An exception in any stage cancels the pipeline and is re-raised by run.
+    """
+
+    def __init__(self, stages: Sequence[Stage], show_progress: bool = True):
+        self.stages = list(stages)
+        self.show_progress = show_progress
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+
+    def cancel(self, stage_name: Optional[str] = None):
+        for stage in self.stages:
+            stage.cancelled.set()
+            if stage.name == stage_name:
+                break
+
+    def _fail(self, error: BaseException):
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self.cancel()
+
+    @staticmethod
+    def _put(target: queue.Queue, value, stage: Optional[Stage]) -> bool:
+        # blocking put that gives up when the producing stage is cancelled
+        while True:
+            if stage is not None and stage.cancelled.is_set():
+                return False
+            try:
+                target.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+    def _next_batch(self, stage: Stage, source: queue.Queue) -> Optional[list]:
+        first = source.get()
+        if first is _DONE:
+            # leave the marker for the other workers of the stage
+            source.put(_DONE)
+            return None
+        batch = [first]
+        deadline = time.monotonic() + stage.max_batch_wait
+        while len(batch) < stage.batch_size:
+            try:
+                value = source.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if value is _DONE:
+                source.put(_DONE)
+                break
+            batch.append(value)
+        return batch
+
+    def _worker(self, stage: Stage, source: queue.Queue, target: queue.Queue, progress_bar):
+        while True:
+            batch = self._next_batch(stage, source)
+            if batch is None:
+                return
+            if stage.cancelled.is_set():
+                continue
+            start_time = time.perf_counter()
+            try:
+                if stage.batch_size == 1:
+                    outputs = [stage.fn(batch[0][1])]
+                else:
+                    outputs = list(stage.fn([x[1] for x in batch]))
+            except BaseException as e:
+                self._fail(e)
+                continue
+            with stage.stats_lock:
+                stage.busy_time += time.perf_counter() - start_time
+                stage.done += len(batch)
+            for (index, _), output in zip(batch, outputs):
+                if not self._put(target, (index, output), stage):
+                    break
+            if progress_bar is not None:
+                progress_bar.update(len(batch))
+
+    def run(self, items: Sequence) -> List:
+        """
+        Push items through all stages
+
+        Returns:
+        - results: Outputs of the last stage in input order, items dropped by cancellation are skipped
+        """
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages] + [queue.Queue()]
+        progress_bars = [tqdm(total=len(items), desc=stage.name, position=i) if self.show_progress else None
+                         for i, stage in enumerate(self.stages)]
+
+        def feed():
+            for index, item in enumerate(items):
+                if not self._put(queues[0], (index, item), self.stages[0]):
+                    break
+            queues[0].put(_DONE)
+
+        def run_stage(i: int):
+            stage = self.stages[i]
+            workers = [
+                threading.Thread(target=self._worker, args=(stage, queues[i], queues[i + 1], progress_bars[i]),
+                                 name=f"{stage.name}-{k}", daemon=True)
+                for k in range(stage.workers)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            queues[i + 1].put(_DONE)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        threads += [threading.Thread(target=run_stage, args=(i,), daemon=True) for i in range(len(self.stages))]
+        for thread in threads:
+            thread.start()
+
+        results = dict()
+        while True:
+            value = queues[-1].get()
+            if value is _DONE:
+                break
+            results[value[0]] = value[1]
+        for thread in threads:
+            thread.join()
+        for progress_bar in progress_bars:
+            if progress_bar is not None:
+                progress_bar.close()
+
+        if self._error is not None:
+            raise self._error
+        if len(results) < len(items) and any(stage.cancelled.is_set() for stage in self.stages):
+            print(f"Pipeline cancelled, {len(results)} of {len(items)} items completed")
+        return [results[i] for i in sorted(results)]
@@ -0,0 +1,129 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# progress callback: receives event dicts
+ProgressCallback = Callable[[dict], None]
+
+
+class Cancelled(Exception):
+    """Raised inside fetch_news / process_news when their cancel_event is set"""
+
+
+class ProgressReporter:
+    """
+    Sends progress events of a long run to a callback and checks for cancellation
+
+    Events are dicts with "type" and "time":
+    - {"type": "phase_started", "phase", "total"}
+    - {"type": "progress", "phase", "done", "total", "bytes", "llm_in_flight"}
+    - {"type": "phase_finished", "phase", "done", "total", "seconds"}
+    - {"type": "cancelled", "phase"}
+    Progress events are throttled to one per min_interval seconds per phase (the last one is always sent).
+    Thread-safe: workers of a phase may call advance concurrently.
+    """
+
+    def __init__(self, callback: Optional[ProgressCallback] = None, cancel_event: Optional[threading.Event] = None,
+                 min_interval: float = 0.1, llm_in_flight: Optional[Callable[[], int]] = None):
+        self.callback = callback
+        self.cancel_event = cancel_event
+        self.min_interval = min_interval
+        self.llm_in_flight = llm_in_flight
+        self._lock = threading.Lock()
+        self._phases: Dict[str, dict] = dict()
+
+    def emit(self, event_type: str, **fields):
+        if self.callback is not None:
+            self.callback({"type": event_type, "time": time.time(), **fields})
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def check_cancelled(self, phase: Optional[str] = None):
+        if self.cancelled:
+            self.emit("cancelled", phase=phase)
+            raise Cancelled(phase)
+
+    @contextmanager
+    def phase(self, name: str, total: Optional[int] = None):
+        self.check_cancelled(name)
+        with self._lock:
+            self._phases[name] = {"done": 0, "total": total, "bytes": 0, "started": time.perf_counter(),
+                                  "last_emit": 0.0}
+        self.emit("phase_started", phase=name, total=total)
+        try:
+            yield self
+        finally:
+            with self._lock:
+                state = self._phases.pop(name)
+        self._emit_progress(name, state)
+        self.emit("phase_finished", phase=name, done=state["done"], total=state["total"],
+                  seconds=time.perf_counter() - state["started"])
+
+    def _emit_progress(self, name: str, state: dict):
+        self.emit("progress", phase=name, done=state["done"], total=state["total"], bytes=state["bytes"],
+                  llm_in_flight=self.llm_in_flight() if self.llm_in_flight is not None else None)
+
+    def advance(self, name: str, items: int = 1, n_bytes: int = 0):
+        """Count finished items (and downloaded bytes) of a phase, raises Cancelled if cancellation was requested"""
+        with self._lock:
+            state = self._phases.get(name)
+            if state is None:
+                return
+            state["done"] += items
+            state["bytes"] += n_bytes
+            now = time.perf_counter()
+            send = now - state["last_emit"] >= self.min_interval
+            if send:
+                state["last_emit"] = now
+                state = dict(state)
+        if send:
+            self._emit_progress(name, state)
+        self.check_cancelled(name)
+
+
+class ProgressState:
+    """
+    Callback target that keeps the latest state of every phase, for polling from another thread (GUI)
+
+    snapshot() returns {phase: {"status", "done", "total", "bytes", "llm_in_flight", "seconds"}}
+    in the order phases started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases: Dict[str, dict] = dict()
+        self.cancelled = False
+
+    def __call__(self, event: dict):
+        with self._lock:
+            phase = event.get("phase")
+            if event["type"] == "cancelled":
+                self.cancelled = True
+                if phase in self.phases:
+                    self.phases[phase]["status"] = "cancelled"
+                return
+            if event["type"] == "phase_started":
+                self.phases[phase] = {"status": "running", "done": 0, "total": event["total"], "bytes": 0,
+                                      "llm_in_flight": None, "started": event["time"], "seconds": 0.0}
+                return
+            state = self.phases.setdefault(phase, {"status": "running", "done": 0, "total": None, "bytes": 0,
+                                                   "llm_in_flight": None, "started": event["time"],
+                                                   "seconds": 0.0})
+            state["done"] = event.get("done", state["done"])
+            state["total"] = event.get("total", state["total"])
+            state["bytes"] = event.get("bytes", state["bytes"])
+            state["llm_in_flight"] = event.get("llm_in_flight", state["llm_in_flight"])
+            state["seconds"] = event["time"] - state["started"]
+            if event["type"] == "phase_finished":
+                state["status"] = "finished"
+                state["seconds"] = event["seconds"]
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            now = time.time()
+            return {name: {**state, "seconds": now - state["started"] if state["status"] == "running"
+                           else state["seconds"]}
+                    for name, state in self.phases.items()}
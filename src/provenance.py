@@ -0,0 +1,187 @@
+import re
+import zlib
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.data_struct.news import NewsStruct, content_hash, news_timestamp
+
+ORIGIN = "origin"
+REPRINT = "reprint"
+REWRITE = "rewrite"
+INDEPENDENT = "independent"
+# no words in header and text: nothing to compare
+UNKNOWN = "unknown"
+
+_WORD = re.compile(r"\w+")
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingle_hashes(text: str, k: int = 3) -> np.ndarray:
+    """
+    Hashes of the word k-shingles of a text
+
+    Words are hashed once, shingle hashes are polynomial combinations of k consecutive word hashes computed
+    with numpy, so long articles cost one crc32 per word. A text without words has no shingles.
+    """
+    words = _WORD.findall((text or "").lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(x.encode("utf-8")) for x in words), dtype=np.uint64, count=len(words))
+    k = min(k, len(words))
+    shingles = np.zeros(len(words) - k + 1, dtype=np.uint64)
+    for j in range(k):
+        shingles = shingles * _MIX + word_hashes[j:len(words) - k + 1 + j]
+    return np.unique(shingles)
+
+
+class MinHasher:
+    """
+    MinHash signatures of shingle sets with num_perm multiply-shift hash functions
+
+    The share of equal signature positions of two documents estimates the Jaccard similarity
+    of their shingle sets (standard error about 1 / sqrt(num_perm)).
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        # (num_perm, n_shingles) hash values, uint64 arithmetic wraps modulo 2^64
+        hashed = (self.a[:, None] * shingles[None, :] + self.b[:, None]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+
+def jaccard_matrix(signatures: np.ndarray, chunk_size: int = 64) -> np.ndarray:
+    """Estimated pairwise Jaccard similarity of (n, num_perm) signatures, rows compared chunk by chunk"""
+    n = len(signatures)
+    similarities = np.empty((n, n), dtype=np.float32)
+    for start in range(0, n, chunk_size):
+        block = signatures[start:start + chunk_size]
+        similarities[start:start + chunk_size] = (block[:, None, :] == signatures[None, :, :]).mean(axis=2)
+    return similarities
+
+
+class ProvenanceAnalyzer:
+    """
+    Origin, reprints and rewrites inside a story from text overlap and publication times
+
+    Every member is compared with all members published before it (MinHash Jaccard of word shingles).
+    The most similar earlier member is its parent (the likely source it was taken from):
+    - similarity >= reprint_threshold: reprint of the parent
+    - rewrite_threshold <= similarity < reprint_threshold: divergent rewrite of the parent
+    - otherwise (or no earlier member): independent report of the story
+    The earliest member is the origin of the story. Members without words (empty or failed downloads)
+    are not compared at all: their role is unknown and they are never a parent or the origin.
+    Signatures are cached by content hash, so members of a story are sketched once across calls.
+
+    Parameters:
+    - shingle_size: Words per shingle
+    - num_perm: MinHash signature length
+    - reprint_threshold, rewrite_threshold: Jaccard similarity thresholds
+    - max_cache: Number of cached signatures
+    """
+
+    def __init__(self, shingle_size: int = 3, num_perm: int = 128, reprint_threshold: float = 0.8,
+                 rewrite_threshold: float = 0.1, max_cache: int = 100000):
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.reprint_threshold = reprint_threshold
+        self.rewrite_threshold = rewrite_threshold
+        self.max_cache = max_cache
+        self._signatures: OrderedDict = OrderedDict()
+
+    def signature(self, news_struct: NewsStruct) -> Optional[np.ndarray]:
+        """MinHash signature of header and text, None when they have no words"""
+        key = content_hash(news_struct)
+        if key in self._signatures:
+            self._signatures.move_to_end(key)
+            return self._signatures[key]
+        shingles = shingle_hashes(f"{news_struct.header or ''}\n{news_struct.text or ''}", self.shingle_size)
+        signature = self.hasher.signature(shingles) if len(shingles) else None
+        self._signatures[key] = signature
+        if len(self._signatures) > self.max_cache:
+            self._signatures.popitem(last=False)
+        return signature
+
+    def analyse(self, cluster_list: Sequence[NewsStruct],
+                timestamps: Optional[Sequence[Optional[float]]] = None) -> List[dict]:
+        """
+        Provenance of every member of a story
+
+        Parameters:
+        - cluster_list: Story members
+        - timestamps: Their publication times (news_timestamp by default), members without time count as latest
+
+        Returns:
+        - provenance: One dict per member in publication order:
+          {"url", "published", "role", "parent" (url or None), "similarity" (to the parent)}
+        """
+        n = len(cluster_list)
+        if n == 0:
+            return []
+        if timestamps is None:
+            timestamps = [news_timestamp(x) for x in cluster_list]
+        order = sorted(range(n), key=lambda i: (timestamps[i] is None, timestamps[i] or 0.0, i))
+        members = [cluster_list[i] for i in order]
+        member_signatures = [self.signature(x) for x in members]
+        # positions (in publication order) of members with text, only they are compared
+        compared = [i for i, x in enumerate(member_signatures) if x is not None]
+        roles = dict()
+        if compared:
+            similarities = jaccard_matrix(np.stack([member_signatures[i] for i in compared]))
+            # only members published earlier (earlier in the order) can be a source
+            similarities[np.triu_indices(len(compared))] = -1.0
+            parents = similarities.argmax(axis=1)
+            parent_similarities = similarities[np.arange(len(compared)), parents]
+            for j, i in enumerate(compared):
+                similarity = float(parent_similarities[j])
+                parent = members[compared[parents[j]]].source_link
+                if j == 0:
+                    roles[i] = (ORIGIN, None, None)
+                elif similarity >= self.reprint_threshold:
+                    roles[i] = (REPRINT, parent, similarity)
+                elif similarity >= self.rewrite_threshold:
+                    roles[i] = (REWRITE, parent, similarity)
+                else:
+                    roles[i] = (INDEPENDENT, None, similarity)
+
+        provenance = []
+        for i, news_struct in enumerate(members):
+            role, parent, similarity = roles.get(i, (UNKNOWN, None, None))
+            provenance.append({
+                "url": news_struct.source_link,
+                "published": news_struct.date_time_,
+                "role": role,
+                "parent": parent,
+                "similarity": similarity,
+            })
+        return provenance
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    random.seed(0)
+    vocabulary = [f"слово{i}" for i in range(5000)]
+    base = [random.choice(vocabulary) for _ in range(400)]
+    story = []
+    for i in range(500):
+        words = list(base)
+        if i % 3 == 1:
+            # rewrite: a fifth of the words replaced
+            for j in random.sample(range(len(words)), len(words) // 5):
+                words[j] = random.choice(vocabulary)
+        elif i % 3 == 2:
+            words = [random.choice(vocabulary) for _ in range(400)]
+        story.append(NewsStruct(1.7e9 + i * 60, f"https://example.com/{i}", "", " ".join(words)))
+    analyzer = ProvenanceAnalyzer()
+    start_time = time.perf_counter()
+    result = analyzer.analyse(story)
+    print(f"{len(story)} members in {time.perf_counter() - start_time:.2f} s:",
+          {role: sum(x["role"] == role for x in result) for role in (ORIGIN, REPRINT, REWRITE, INDEPENDENT)})
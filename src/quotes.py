@@ -0,0 +1,254 @@
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.atomic_dir import atomic_directory
+from src.data_struct.news import NewsStruct, news_timestamp
+
+# 5 minutes, 1 hour, 1 day
+DEFAULT_HORIZONS = (300, 3600, 86400)
+# composite key: ticker index in the high bits, unix seconds in the low 33 bits (until year 2242)
+_TIME_BITS = 33
+
+
+class QuoteStore:
+    """
+    Local columnar store of close prices per ticker with a vectorized as-of join
+
+    All candles live in flat arrays sorted by (ticker, time): timestamps (int64 unix seconds), close
+    and prefix sums of log returns and squared log returns for window volatility. The arrays are .npy
+    files opened with mmap_mode="r", so months of minute candles are not read into memory.
+    A composite (ticker index, time) key turns every as-of lookup of any ticker into one np.searchsorted
+    over the whole store, the keys are written as a column too, so opening a store reads no candles.
+
+    Parameters:
+    - directory: Folder with the .npy columns and tickers.json (ticker -> [start, end) rows)
+    """
+
+    COLUMNS = ("timestamps", "close", "log_return_sum", "log_return_sq_sum")
+
+    def __init__(self, directory: str = "quotes"):
+        self.directory = directory
+        self.tickers: Dict[str, List[int]] = dict()
+        self.ticker_ids: Dict[str, int] = dict()
+        self.columns: Dict[str, np.ndarray] = dict()
+        self.keys: Optional[np.ndarray] = None
+        self._starts: Optional[np.ndarray] = None
+        if os.path.exists(os.path.join(directory, "tickers.json")):
+            self.load()
+
+    def load(self):
+        with open(os.path.join(self.directory, "tickers.json"), "r", encoding="utf-8") as f:
+            self.tickers = json.load(f)
+        self.columns = {name: np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+                        for name in self.COLUMNS}
+        self.ticker_ids = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._starts = np.array([start for start, _ in self.tickers.values()], dtype=np.int64)
+        keys_path = os.path.join(self.directory, "keys.npy")
+        if os.path.exists(keys_path):
+            self.keys = np.load(keys_path, mmap_mode="r")
+        else:
+            # stores written before the keys column: built in memory from all timestamps
+            self.keys = self._build_keys(self.tickers, self.columns["timestamps"])
+
+    @staticmethod
+    def _build_keys(tickers: Dict[str, List[int]], timestamps: np.ndarray) -> np.ndarray:
+        """Composite (ticker index, time) keys of all rows, tickers is ticker -> [start, end) rows in store order"""
+        keys = np.empty(len(timestamps), dtype=np.int64)
+        for ticker_id, (start, end) in enumerate(tickers.values()):
+            keys[start:end] = (ticker_id << _TIME_BITS) + timestamps[start:end]
+        return keys
+
+    @staticmethod
+    def read_candles(path: str, time_column: str = "begin", close_column: str = "close"):
+        """(timestamps, close) of a CSV or Parquet candles file (MOEX ISS candles use begin/close)"""
+        import pandas as pd
+
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path, columns=[time_column, close_column])
+        else:
+            frame = pd.read_csv(path, usecols=[time_column, close_column])
+        times = frame[time_column]
+        if not pd.api.types.is_numeric_dtype(times):
+            # datetime resolution depends on the pandas version, count seconds from the epoch explicitly
+            times = (pd.to_datetime(times, utc=True) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+        return np.asarray(times, dtype=np.int64), np.asarray(frame[close_column], dtype=np.float64)
+
+    def import_candles(self, files: Dict[str, str], time_column: str = "begin", close_column: str = "close"):
+        """
+        Replace the store with candles of the given tickers
+
+        Parameters:
+        - files: Ticker -> CSV or Parquet file with a time column (unix seconds or datetime strings)
+          and a close column
+        """
+        self.write({ticker: self.read_candles(path, time_column, close_column) for ticker, path in files.items()})
+
+    def write(self, series: Dict[str, tuple]):
+        """
+        Replace the store with series: ticker -> (timestamps, close), then reopen it memory-mapped
+
+        The columns are written into a temporary directory that replaces the store as a whole,
+        so other QuoteStore instances keep reading their memory-mapped arrays.
+        """
+        timestamps, close, tickers, position = [], [], dict(), 0
+        for ticker, (ticker_times, ticker_close) in sorted(series.items()):
+            ticker_times = np.asarray(ticker_times, dtype=np.int64)
+            order = np.argsort(ticker_times, kind="stable")
+            ticker_close = np.asarray(ticker_close, dtype=np.float64)[order]
+            valid = np.isfinite(ticker_close) & (ticker_close > 0)
+            timestamps.append(ticker_times[order][valid])
+            close.append(ticker_close[valid])
+            tickers[ticker] = [position, position + int(valid.sum())]
+            position += int(valid.sum())
+        timestamps = np.concatenate(timestamps) if timestamps else np.zeros(0, dtype=np.int64)
+        close = np.concatenate(close) if close else np.zeros(0, dtype=np.float64)
+        log_return = np.zeros(len(close))
+        log_return[1:] = np.diff(np.log(close)) if len(close) else []
+        # the first candle of a ticker has no return, windows never cross ticker borders
+        for start, _ in tickers.values():
+            log_return[start] = 0.0
+        columns = {
+            "timestamps": timestamps,
+            "close": close,
+            "log_return_sum": np.concatenate([[0.0], np.cumsum(log_return)]),
+            "log_return_sq_sum": np.concatenate([[0.0], np.cumsum(log_return ** 2)]),
+            "keys": self._build_keys(tickers, timestamps),
+        }
+        with atomic_directory(self.directory) as directory:
+            for name, values in columns.items():
+                np.save(os.path.join(directory, f"{name}.npy"), values)
+            with open(os.path.join(directory, "tickers.json"), "w", encoding="utf-8") as f:
+                json.dump(tickers, f)
+        self.load()
+
+    def _positions(self, ticker_idx: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        """Row of the last candle at or before each time in its ticker, -1 when there is none"""
+        keys = (ticker_idx << _TIME_BITS) + timestamps
+        positions = np.searchsorted(self.keys, keys, side="right") - 1
+        found = positions >= 0
+        found[found] = (self.keys[positions[found]] >> _TIME_BITS) == ticker_idx[found]
+        return np.where(found, positions, -1)
+
+    def _ticker_idx(self, tickers: Sequence[str]) -> np.ndarray:
+        return np.array([self.ticker_ids.get(x, -1) for x in tickers], dtype=np.int64)
+
+    def price_asof(self, tickers: Sequence[str], timestamps, max_staleness: Optional[float] = None) -> np.ndarray:
+        """Last close at or before every time (NaN for unknown tickers, times before history or stale prices)"""
+        ticker_idx = self._ticker_idx(tickers)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.full(len(ticker_idx), np.nan)
+        valid = (ticker_idx >= 0) & np.isfinite(timestamps)
+        positions = self._positions(ticker_idx[valid], timestamps[valid].astype(np.int64))
+        ok = positions >= 0
+        if max_staleness is not None:
+            ok[ok] = timestamps[valid][ok] - self.columns["timestamps"][positions[ok]] <= max_staleness
+        values = np.full(len(positions), np.nan)
+        values[ok] = self.columns["close"][positions[ok]]
+        prices[valid] = values
+        return prices
+
+    def _window(self, ticker_idx: np.ndarray, start: np.ndarray, end: np.ndarray):
+        """Return and volatility of log returns in (start, end] per pair, NaN without a candle in the window"""
+        first = self._positions(ticker_idx, start)
+        last = self._positions(ticker_idx, end)
+        # the last candle at or before end must be after start, otherwise the window has no prices
+        # (e.g. the post window of an article newer than the latest quote)
+        ok = last > first
+        # no candle before start: the window begins at the first candle of the ticker
+        first = np.where(first < 0, self._starts[ticker_idx], first)
+        first, last = np.where(ok, first, 0), np.where(ok, last, 0)
+        close = self.columns["close"]
+        window_return = np.where(ok, close[last] / close[first] - 1.0, np.nan)
+        n = last - first
+        sums = self.columns["log_return_sum"][last + 1] - self.columns["log_return_sum"][first + 1]
+        squares = self.columns["log_return_sq_sum"][last + 1] - self.columns["log_return_sq_sum"][first + 1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sums / n
+            volatility = np.sqrt(np.maximum(squares / n - mean ** 2, 0.0))
+        volatility = np.where(ok & (n >= 2), volatility, np.nan)
+        return window_return, volatility
+
+    def reactions(self, tickers: Sequence[str], timestamps,
+                  horizons: Sequence[int] = DEFAULT_HORIZONS) -> Dict[str, np.ndarray]:
+        """
+        Market reaction features of (ticker, publication time) pairs
+
+        Returns:
+        - features: Arrays aligned with the pairs: pre_return_<h>, pre_volatility_<h> over (t - h, t]
+          and post_return_<h>, post_volatility_<h> over (t, t + h] for every horizon h in seconds;
+          volatility is the standard deviation of candle log returns; NaN for unknown tickers and for windows
+          without a candle in them
+        """
+        ticker_idx = self._ticker_idx(tickers)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        valid = (ticker_idx >= 0) & np.isfinite(timestamps)
+        idx, times = ticker_idx[valid], timestamps[valid].astype(np.int64)
+        # pairs sorted by (ticker, time) stay sorted after shifting by a horizon, and np.searchsorted
+        # over sorted queries walks the keys in order instead of a cache miss per pair
+        order = np.lexsort((times, idx))
+        idx, times = idx[order], times[order]
+        rows = np.flatnonzero(valid)[order]
+        features = dict()
+        for horizon in horizons:
+            for name, (start, end) in (("pre", (times - horizon, times)), ("post", (times, times + horizon))):
+                window_return, volatility = self._window(idx, start, end)
+                for column, values in ((f"{name}_return_{horizon}", window_return),
+                                       (f"{name}_volatility_{horizon}", volatility)):
+                    features[column] = np.full(len(ticker_idx), np.nan)
+                    features[column][rows] = values
+        return features
+
+    def article_reactions(self, news_structs_list: Sequence[NewsStruct],
+                          horizons: Sequence[int] = DEFAULT_HORIZONS) -> List[dict]:
+        """One row per (article, resolved ticker) pair: url, ticker, published timestamp and reaction features"""
+        urls, tickers, timestamps = [], [], []
+        for news_struct in news_structs_list:
+            timestamp = news_timestamp(news_struct)
+            for ticker in dict.fromkeys(getattr(news_struct, "companies_tickers_list", None) or []):
+                urls.append(news_struct.source_link)
+                tickers.append(ticker)
+                timestamps.append(np.nan if timestamp is None else timestamp)
+        features = self.reactions(tickers, timestamps, horizons)
+        return [{"url": url, "ticker": ticker, "published": timestamp,
+                 **{name: _value(values[i]) for name, values in features.items()}}
+                for i, (url, ticker, timestamp) in enumerate(zip(urls, tickers, timestamps))]
+
+    def story_reactions(self, cluster_list: Sequence[NewsStruct],
+                        horizons: Sequence[int] = DEFAULT_HORIZONS) -> Dict[str, dict]:
+        """Reaction of every ticker of a story measured from the first publication of the story: ticker -> features"""
+        timestamps = [x for x in (news_timestamp(x) for x in cluster_list) if x is not None]
+        tickers = list(dict.fromkeys(ticker for x in cluster_list
+                                     for ticker in getattr(x, "companies_tickers_list", None) or []))
+        if not timestamps or not tickers:
+            return dict()
+        features = self.reactions(tickers, [min(timestamps)] * len(tickers), horizons)
+        return {ticker: {name: _value(values[i]) for name, values in features.items()}
+                for i, ticker in enumerate(tickers)}
+
+
+def _value(x: float) -> Optional[float]:
+    # JSON-friendly: NaN becomes None
+    return None if np.isnan(x) else float(x)
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(0)
+    start = 1_700_000_000
+    series = {f"T{i:03d}": (start + 60 * np.arange(100_000),
+                            100 * np.exp(np.cumsum(rng.normal(0, 1e-3, 100_000)))) for i in range(50)}
+    with tempfile.TemporaryDirectory() as directory:
+        store = QuoteStore(directory)
+        store.write(series)
+        n_pairs = 1_000_000
+        tickers = [f"T{i:03d}" for i in rng.integers(0, 50, n_pairs)]
+        timestamps = start + rng.uniform(0, 60 * 100_000, n_pairs)
+        start_time = time.perf_counter()
+        features = store.reactions(tickers, timestamps)
+        print(f"{n_pairs} (article, ticker) pairs, {len(features)} features "
+              f"in {time.perf_counter() - start_time:.2f} s")
@@ -0,0 +1,204 @@
+import json
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+from numpy import ndarray
+
+from src.atomic_dir import atomic_directory
+from src.data_struct.news import NewsRecord, NewsStruct, intern_industry_entity, intern_companies_entity
+from src.data_struct.news_batch import NewsBatch, ragged_encode
+
+SNAPSHOT_VERSION = 1
+# separator of fields inside encoded industry/company values
+_FIELDS_SEPARATOR = "\x1f"
+
+_ARRAY_COLUMNS = ["timestamps", "url_codes", "domain_codes", "entity_offsets", "entity_codes",
+                  "ticker_offsets", "ticker_codes"]
+_DICTIONARY_COLUMNS = ["urls", "domains", "entities", "tickers"]
+
+
+class StringColumn:
+    """
+    Read-only column of strings stored as one utf-8 buffer plus offsets, decoded on access.
+    Indexing with an array or slice returns a view, so memory-mapped texts are never loaded as a whole.
+    """
+
+    def __init__(self, data: ndarray, offsets: ndarray, nulls: ndarray, index: Optional[ndarray] = None):
+        self.data = data
+        self.offsets = offsets
+        self.nulls = nulls
+        self.index = index if index is not None else np.arange(len(nulls))
+
+    def __len__(self):
+        return len(self.index)
+
+    def _decode(self, i: int) -> Optional[str]:
+        if self.nulls[i]:
+            return None
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return self._decode(int(self.index[item]))
+        return StringColumn(self.data, self.offsets, self.nulls, self.index[item])
+
+    def __iter__(self):
+        for i in self.index:
+            yield self._decode(int(i))
+
+    def tolist(self) -> List[Optional[str]]:
+        return list(self)
+
+
+def _save_strings(path: str, name: str, values: Sequence[Optional[str]]):
+    encoded = [b"" if x is None else str(x).encode("utf-8") for x in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(x) for x in encoded], out=offsets[1:])
+    np.save(os.path.join(path, f"{name}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+    np.save(os.path.join(path, f"{name}.nulls.npy"), np.fromiter((x is None for x in values), dtype=bool,
+                                                                  count=len(encoded)))
+
+
+def _load_strings(path: str, name: str, mmap_mode: Optional[str]) -> StringColumn:
+    return StringColumn(*[np.load(os.path.join(path, f"{name}.{part}.npy"), mmap_mode=mmap_mode)
+                          for part in ("data", "offsets", "nulls")])
+
+
+def _dictionary(column: StringColumn) -> ndarray:
+    array = np.empty(len(column), dtype=object)
+    array[:] = column.tolist()
+    return array
+
+
+def save_snapshot(path: str, news_structs_list: Sequence[NewsStruct], labels: Optional[Sequence[int]] = None,
+                  clusters: Optional[list] = None):
+    """
+    Save articles, enrichments, embeddings and cluster assignments as a directory of .npy columns
+
+    Strings are stored as utf-8 buffers with offsets, so the snapshot can be reloaded memory-mapped.
+    The columns are written into a temporary sibling directory that replaces path as a whole, so a Snapshot
+    memory-mapped from path keeps reading the previous files.
+
+    Parameters:
+    - path: Snapshot directory, replaced if it exists
+    - news_structs_list: News of any NewsStruct* stage or NewsRecord
+    - labels: Cluster label of every news
+    - clusters: Formatted clusters (news_clusters_formater output), saved to clusters.json
+    """
+    with atomic_directory(path) as tmp:
+        _write_snapshot(tmp, news_structs_list, labels, clusters)
+
+
+def _write_snapshot(path: str, news_structs_list: Sequence[NewsStruct], labels: Optional[Sequence[int]],
+                    clusters: Optional[list]):
+    batch = NewsBatch.from_news_list(news_structs_list)
+    for name in _ARRAY_COLUMNS:
+        np.save(os.path.join(path, f"{name}.npy"), getattr(batch, name))
+    for name in _DICTIONARY_COLUMNS:
+        _save_strings(path, name, getattr(batch, name))
+    _save_strings(path, "headers", batch.headers)
+    _save_strings(path, "texts", batch.texts)
+    if batch.embeddings is not None:
+        np.save(os.path.join(path, "embeddings.npy"), batch.embeddings)
+    if labels is not None:
+        np.save(os.path.join(path, "labels.npy"), np.asarray(labels, dtype=np.int64))
+
+    industries = [[_FIELDS_SEPARATOR.join(map(str, (e.industry_name, e.industry_forecast)))
+                   for e in x.industry_list]
+                  if getattr(x, "industry_list", None) else None for x in news_structs_list]
+    companies = [[_FIELDS_SEPARATOR.join(map(str, (e.company_name, e.company_forecast, ticker)))
+                  for e, ticker in zip(x.companies_names_list, x.companies_tickers_list)]
+                 if getattr(x, "companies_names_list", None) else None for x in news_structs_list]
+    for name, lists in [("industry", industries), ("company", companies)]:
+        offsets, codes, dictionary = ragged_encode(lists)
+        np.save(os.path.join(path, f"{name}_offsets.npy"), offsets)
+        np.save(os.path.join(path, f"{name}_codes.npy"), codes)
+        _save_strings(path, f"{name}_values", dictionary)
+
+    if clusters is not None:
+        _write_clusters(os.path.join(path, "clusters.json"), clusters)
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "n_news": len(batch),
+                   "has_embeddings": batch.embeddings is not None, "has_labels": labels is not None}, f)
+
+
+def _write_clusters(path: str, clusters: list):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(clusters, f, ensure_ascii=False)
+
+
+def save_snapshot_clusters(path: str, clusters: list):
+    """Add clusters.json to a saved snapshot, replacing the file atomically"""
+    tmp_path = os.path.join(path, "clusters.json.tmp")
+    _write_clusters(tmp_path, clusters)
+    os.replace(tmp_path, os.path.join(path, "clusters.json"))
+
+
+class Snapshot:
+    """
+    Loaded snapshot: a NewsBatch with memory-mapped columns and lazily decoded headers/texts,
+    industries and companies of every news and formatted clusters if they were saved
+    """
+
+    def __init__(self, path: str, mmap_mode: Optional[str] = "r"):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.meta['version']}")
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        columns = {name: load(name) for name in _ARRAY_COLUMNS}
+        columns.update({name: _dictionary(_load_strings(path, name, mmap_mode)) for name in _DICTIONARY_COLUMNS})
+        self.batch = NewsBatch(
+            columns["timestamps"], columns["url_codes"], columns["urls"], columns["domain_codes"],
+            columns["domains"], _load_strings(path, "headers", mmap_mode), _load_strings(path, "texts", mmap_mode),
+            load("embeddings") if self.meta["has_embeddings"] else None,
+            columns["entity_offsets"], columns["entity_codes"], columns["entities"],
+            columns["ticker_offsets"], columns["ticker_codes"], columns["tickers"],
+            load("labels") if self.meta["has_labels"] else None,
+        )
+        self._ragged = {
+            name: (load(f"{name}_offsets"), load(f"{name}_codes"),
+                   _dictionary(_load_strings(path, f"{name}_values", mmap_mode)))
+            for name in ("industry", "company")
+        }
+        self.clusters = None
+        clusters_path = os.path.join(path, "clusters.json")
+        if os.path.exists(clusters_path):
+            with open(clusters_path, "r", encoding="utf-8") as f:
+                self.clusters = json.load(f)
+
+    def __len__(self):
+        return len(self.batch)
+
+    def _ragged_values(self, name: str, i: int) -> List[List[str]]:
+        offsets, codes, dictionary = self._ragged[name]
+        return [x.split(_FIELDS_SEPARATOR) for x in dictionary[codes[offsets[i]:offsets[i + 1]]]]
+
+    def industries_of(self, i: int) -> List[List[str]]:
+        return self._ragged_values("industry", i)
+
+    def companies_of(self, i: int) -> List[List[str]]:
+        return self._ragged_values("company", i)
+
+    def to_news_list(self) -> List[NewsRecord]:
+        """Full NewsRecord objects with all enrichments, ready to re-cluster or re-summarize"""
+        news_records_list = self.batch.to_news_list()
+        for i, news_record in enumerate(news_records_list):
+            industries = self.industries_of(i)
+            companies = self.companies_of(i)
+            news_record.industry_list = [intern_industry_entity(name, forecast) for name, forecast in industries]
+            news_record.companies_names_list = [intern_companies_entity(name, forecast)
+                                                for name, forecast, _ in companies]
+            news_record.companies_tickers_list = [ticker for _, _, ticker in companies]
+            if news_record.named_entities is None:
+                news_record.named_entities = []
+        return news_records_list
+
+
+def load_snapshot(path: str, mmap_mode: Optional[str] = "r") -> Snapshot:
+    return Snapshot(path, mmap_mode)
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.online_clustering import OnlineClusterizator, Story
+
+
+class StoryStore:
+    """
+    Sliding time window over the stories of an OnlineClusterizator
+
+    A story stays in memory while its last member is younger than horizon relative to the newest
+    publication time seen (date_time_ of the members). Older stories are removed from the clusterizator
+    and, when archive_dir is set, written to disk: member embeddings to <story_id>.npz and
+    story metadata to stories.jsonl. Every assignment of the clusterizator scans all live stories,
+    so at most max_stories stay live: beyond that the least recently updated ones are evicted as well.
+    Publication times are trusted up to max_skew ahead of the wall clock: a later (future-dated) time
+    would move the window and evict every live story, so it is clamped (see clamp).
+    """
+
+    def __init__(self, clusterizator: OnlineClusterizator, horizon: timedelta = timedelta(hours=24),
+                 archive_dir: Optional[str] = "stories_archive", max_stories: Optional[int] = 50000,
+                 max_skew: timedelta = timedelta(minutes=10)):
+        self.clusterizator = clusterizator
+        self.horizon = horizon
+        self.archive_dir = archive_dir
+        self.max_stories = max_stories
+        self.max_skew = max_skew
+        self.watermark: Optional[float] = None
+        self._first_seen_wall: Dict[int, float] = dict()
+        if archive_dir is not None:
+            os.makedirs(archive_dir, exist_ok=True)
+
+    def clamp(self, timestamps: List[Optional[float]], now: Optional[float] = None) -> List[Optional[float]]:
+        """Publication times capped at now (the wall clock by default) plus max_skew, None stays None"""
+        limit = (time.time() if now is None else now) + self.max_skew.total_seconds()
+        return [None if x is None else min(x, limit) for x in timestamps]
+
+    def observe(self, timestamps: List[Optional[float]], now: Optional[float] = None):
+        """Advance the watermark to the newest of timestamps, clamped like clamp(timestamps, now)"""
+        known = [x for x in self.clamp(timestamps, now) if x is not None]
+        if known and (self.watermark is None or max(known) > self.watermark):
+            self.watermark = max(known)
+
+    def _last_update(self, story: Story, now: float) -> float:
+        # stories without publication times expire by the time they were first seen by the store
+        if story.last_update is not None:
+            return story.last_update
+        return self._first_seen_wall.setdefault(story.story_id, now)
+
+    def advance(self, now: Optional[float] = None) -> List[int]:
+        """
+        Evict stories that fell out of the window, then the least recently updated ones above max_stories
+
+        Parameters:
+        - now: Current time as unix timestamp, the newest observed publication time by default
+
+        Returns:
+        - evicted: Ids of evicted stories
+        """
+        if now is None:
+            now = self.watermark if self.watermark is not None else time.time()
+        border = now - self.horizon.total_seconds()
+        stories = self.clusterizator.stories
+        last_updates = {story_id: self._last_update(story, now) for story_id, story in stories.items()}
+        evicted = [story_id for story_id, last_update in last_updates.items() if last_update < border]
+        if self.max_stories is not None and len(stories) - len(evicted) > self.max_stories:
+            evicted_set = set(evicted)
+            live = sorted((x for x in last_updates if x not in evicted_set), key=last_updates.get)
+            evicted += live[:len(live) - self.max_stories]
+        for story_id in evicted:
+            story = stories.pop(story_id)
+            self.clusterizator.index.remove(story_id)
+            self._first_seen_wall.pop(story_id, None)
+            if self.archive_dir is not None:
+                self._archive(story)
+        if evicted:
+            evicted_set = set(evicted)
+            aliases = self.clusterizator.aliases
+            for alias in [x for x, target in aliases.items() if self.clusterizator.resolve(target) in evicted_set]:
+                del aliases[alias]
+            self.clusterizator.index.rebuild(stories)
+        return evicted
+
+    def _archive(self, story: Story):
+        np.savez(os.path.join(self.archive_dir, f"{story.story_id}.npz"),
+                 embeddings=np.stack(story.member_embeddings),
+                 timestamps=np.array([np.nan if x is None else x for x in story.member_timestamps]))
+        record = {
+            "story_id": story.story_id,
+            "first_seen": story.first_seen,
+            "last_update": story.last_update,
+            "count": story.count,
+            "members": [
+                {
+                    "date_time_": str(getattr(x, "date_time_", "")),
+                    "source_link": getattr(x, "source_link", None),
+                    "header": getattr(x, "header", None),
+                }
+                for x in story.members if x is not None
+            ]
+        }
+        with open(os.path.join(self.archive_dir, "stories.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def load_archived_embeddings(self, story_id: int) -> np.ndarray:
+        with np.load(os.path.join(self.archive_dir, f"{story_id}.npz")) as data:
+            return data["embeddings"]
+
+    @property
+    def n_active_stories(self) -> int:
+        return len(self.clusterizator.stories)
+
+    @property
+    def n_active_members(self) -> int:
+        return sum(x.count for x in self.clusterizator.stories.values())
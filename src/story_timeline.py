@@ -0,0 +1,142 @@
+from bisect import bisect_right, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# rolling windows in seconds: 15 minutes, 1 hour, 2 hours (for acceleration), 6 hours, 24 hours
+DEFAULT_WINDOWS = (900, 3600, 2 * 3600, 6 * 3600, 24 * 3600)
+
+
+class StoryTimeline:
+    """
+    Arrival times of the members of one story, kept sorted and updated per article
+
+    Rolling counts ending at the latest arrival (last_update) are kept up to date: one start pointer per window
+    moves forward as arrivals come in time order, so add is O(1) amortized and reading the counts never
+    scans the members. Late (out of order) arrivals are inserted with a binary search.
+    Arrivals are also counted in buckets of bucket seconds for narrative detection.
+    signals are measured back from a given now (the pipeline watermark or the current time), so a story
+    that went silent loses its burst and narrative flags.
+
+    Signals:
+    - burst (мгновенный импульс): at least burst_min_count arrivals in the shortest window and their rate
+      burst_ratio times above the rate of the rest of the longest window
+    - narrative (нарастающий нарратив): the last narrative_buckets buckets all have arrivals and the later
+      half of them has at least as many as the earlier half, so the story keeps getting publications
+    """
+
+    def __init__(self, windows: Sequence[int] = DEFAULT_WINDOWS, bucket: int = 3600,
+                 burst_min_count: int = 3, burst_ratio: float = 4.0, narrative_buckets: int = 4):
+        self.windows = tuple(sorted(windows))
+        self.bucket = bucket
+        self.burst_min_count = burst_min_count
+        self.burst_ratio = burst_ratio
+        self.narrative_buckets = narrative_buckets
+        self.arrivals: List[float] = []
+        self.first_seen: Optional[float] = None
+        self.last_update: Optional[float] = None
+        # members without publication time, counted but not placed on the timeline
+        self.n_unknown = 0
+        self._starts = [0] * len(self.windows)
+        self._buckets: Dict[int, int] = defaultdict(int)
+
+    @classmethod
+    def from_timestamps(cls, timestamps: Iterable[Optional[float]], **kwargs) -> "StoryTimeline":
+        timeline = cls(**kwargs)
+        for timestamp in sorted(timestamps, key=lambda x: (x is None, x or 0.0)):
+            timeline.add(timestamp)
+        return timeline
+
+    @property
+    def count(self) -> int:
+        return len(self.arrivals) + self.n_unknown
+
+    def add(self, timestamp: Optional[float]):
+        if timestamp is None:
+            self.n_unknown += 1
+            return
+        self._buckets[int(timestamp // self.bucket)] += 1
+        if self.first_seen is None or timestamp < self.first_seen:
+            self.first_seen = timestamp
+        if not self.arrivals or timestamp >= self.arrivals[-1]:
+            self.arrivals.append(timestamp)
+            self.last_update = timestamp
+            for i, window in enumerate(self.windows):
+                start = self._starts[i]
+                while self.arrivals[start] <= timestamp - window:
+                    start += 1
+                self._starts[i] = start
+            return
+        insort(self.arrivals, timestamp)
+        for i, window in enumerate(self.windows):
+            self._starts[i] = bisect_right(self.arrivals, self.last_update - window)
+
+    def extend(self, timestamps: Iterable[Optional[float]]):
+        for timestamp in timestamps:
+            self.add(timestamp)
+
+    def rolling_counts(self, now: Optional[float] = None) -> Dict[int, int]:
+        """
+        Arrivals in (end - window, end] for every window
+
+        Parameters:
+        - now: Window end, last_update by default (O(1)); another end costs a binary search per window
+        """
+        if now is None or now == self.last_update:
+            return {window: len(self.arrivals) - start for window, start in zip(self.windows, self._starts)}
+        end = bisect_right(self.arrivals, now)
+        return {window: end - bisect_right(self.arrivals, now - window, 0, end) for window in self.windows}
+
+    def bucket_counts(self, n_buckets: int, now: Optional[float] = None) -> List[int]:
+        """Arrivals in the last n_buckets buckets, oldest first, ending with the bucket of now (last_update)"""
+        end = now if now is not None else self.last_update
+        if end is None:
+            return [0] * n_buckets
+        last = int(end // self.bucket)
+        return [self._buckets.get(x, 0) for x in range(last - n_buckets + 1, last + 1)]
+
+    def is_burst(self, now: Optional[float] = None) -> bool:
+        counts = self.rolling_counts(now)
+        short, long = self.windows[0], self.windows[-1]
+        if counts[short] < self.burst_min_count:
+            return False
+        if long == short:
+            return True
+        baseline = (counts[long] - counts[short]) / (long - short)
+        return counts[short] / short >= self.burst_ratio * baseline
+
+    def is_narrative(self, now: Optional[float] = None) -> bool:
+        counts = self.bucket_counts(self.narrative_buckets, now)
+        if not all(counts):
+            return False
+        half = self.narrative_buckets // 2
+        return sum(counts[-half:]) >= sum(counts[:half])
+
+    def signals(self, now: float) -> dict:
+        """
+        Dynamics of the story
+
+        Parameters:
+        - now: Time the windows end at, the pipeline watermark or the current time (not the story's own
+          last_update, otherwise a story keeps the signals of its last publication forever)
+
+        Returns:
+        - signals: measured_at (now), first_seen, last_update, count, rolling counts per window (seconds -> count),
+          velocity (arrivals per hour in the last hour), acceleration (velocity minus the hour before),
+          burst and narrative flags
+        """
+        counts = self.rolling_counts(now)
+        velocity = counts.get(3600)
+        acceleration = None
+        if velocity is not None and 7200 in counts:
+            acceleration = velocity - (counts[7200] - velocity)
+        return {
+            "measured_at": now,
+            "first_seen": self.first_seen,
+            "last_update": self.last_update,
+            "count": self.count,
+            "rolling_counts": counts,
+            "velocity": velocity,
+            "acceleration": acceleration,
+            "burst": self.is_burst(now),
+            "narrative": self.is_narrative(now),
+        }
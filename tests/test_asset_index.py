@@ -0,0 +1,45 @@
+import time
+
+from src.asset_index import AssetIndex
+
+
+def test_query_intersects_keys_within_window():
+    index = AssetIndex()
+    index.add_article("a", 100.0, tickers=["SBER"], industries=["Банки"], story_id=1)
+    index.add_article("b", 200.0, tickers=["SBER", "VTBR"], story_id=2)
+    index.add_article("c", 300.0, tickers=["sber"], entities=["«Сбербанк»"], story_id=3)
+    assert index.query(tickers=["SBER"]) == ["a", "b", "c"]
+    assert index.query(tickers=["SBER", "VTBR"]) == ["b"]
+    assert index.query(tickers=["SBER"], since=150.0, until=300.0) == ["b", "c"]
+    assert index.query(entities=["сбербанк"]) == ["c"]
+    assert index.query(tickers=["GAZP"]) == []
+
+
+def test_query_stories_most_recent_first():
+    index = AssetIndex(story_resolver=lambda x: 10 if x == 3 else x)
+    index.add_article("a", 100.0, tickers=["SBER"], story_id=1)
+    index.add_article("b", 200.0, tickers=["SBER"], story_id=2)
+    index.add_article("c", 300.0, tickers=["SBER"], story_id=3)
+    index.add_article("d", 400.0, tickers=["SBER"], story_id=1)
+    assert index.query_stories(tickers=["SBER"]) == [1, 10, 2]
+
+
+def test_reindexing_enriched_article_merges_new_keys():
+    index = AssetIndex()
+    index.add_article("a", 100.0, entities=["Сбербанк"], story_id=1)
+    index.add_article("b", 200.0, tickers=["SBER"], story_id=2)
+    index.add_article("a", None, tickers=["SBER"], industries=["Банки"], entities=["Сбербанк"])
+    assert index.query(tickers=["SBER"]) == ["a", "b"]
+    assert index.query(industries=["банки"], since=50.0, until=150.0) == ["a"]
+    assert len(index.postings[("entity", "сбербанк")]) == 1
+    assert index.article_story["a"] == 1
+
+
+def test_undated_article_is_kept_at_ingest_time():
+    index = AssetIndex()
+    before = time.time()
+    index.add_article("a", None, tickers=["SBER"])
+    index.add_article("b", before - 3600, tickers=["SBER"])
+    assert index.trim_before(before - 60) == 1
+    assert "a" in index and "b" not in index
+    assert index.query(tickers=["SBER"]) == ["a"]
@@ -0,0 +1,51 @@
+import codecs
+
+import pytest
+
+# collect_news needs the scraping stack (newspaper3k, readability-lxml, ...)
+collect_news = pytest.importorskip("collect_news")
+
+
+@pytest.mark.parametrize("status, ctype, content_length, reason", [
+    (200, "text/html; charset=utf-8", "1000", None),
+    (200, "application/rss+xml", None, None),
+    (200, "", None, None),
+    (404, "text/html", "10", "http_status"),
+    (200, "application/pdf", "10", "content_type"),
+    (200, "image/jpeg", None, "content_type"),
+    (200, "text/html", "2000", "too_large"),
+    (200, "text/html", "abc", None),
+    (200, "text/html", "-5", None),
+])
+def test_skip_reason(status, ctype, content_length, reason):
+    assert collect_news._skip_reason(status, ctype, content_length, max_bytes=1024) == reason
+
+
+def test_charset_bom_wins_over_header():
+    assert collect_news._charset(codecs.BOM_UTF8 + "новость".encode("utf-8"), "text/html; charset=windows-1251") \
+        == "utf-8-sig"
+    assert collect_news._charset(codecs.BOM_UTF32_LE + "a".encode("utf-32-le"), None) == "utf-32"
+    assert collect_news._charset(codecs.BOM_UTF16_LE + "a".encode("utf-16-le"), None) == "utf-16"
+
+
+def test_charset_header_meta_and_xml_declaration():
+    assert collect_news._charset(b"<html></html>", "text/html; charset=windows-1251") == "cp1251"
+    # header first, then the document
+    assert collect_news._charset(b'<meta charset="koi8-r">', "text/html; charset=windows-1251") == "cp1251"
+    assert collect_news._charset(b'<html><head><meta charset="windows-1251"></head>', "text/html") == "cp1251"
+    assert collect_news._charset(b'<meta http-equiv="Content-Type" content="text/html; charset=koi8-r">',
+                                 None) == "koi8-r"
+    assert collect_news._charset(b'<?xml version="1.0" encoding="windows-1251"?><rss/>', "application/rss+xml") \
+        == "cp1251"
+
+
+def test_charset_unknown_falls_back():
+    assert collect_news._charset(b"<html></html>", "text/html; charset=x-unknown") == "utf-8"
+    # an unknown header charset does not hide a valid one of the document
+    assert collect_news._charset(b'<meta charset="windows-1251">', "text/html; charset=x-unknown") == "cp1251"
+    assert collect_news._charset(b"", None) == "utf-8"
+
+
+def test_decode_windows_1251():
+    text = "Новости рынка"
+    assert collect_news._decode(f'<meta charset="windows-1251">{text}'.encode("cp1251"), None).endswith(text)
@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+
+import pytest
+
+from src.exports import ExportCache, iter_csv, iter_json, iter_ndjson, write_parquet
+
+ROWS = [
+    {"label": 1, "title": "Сбер", "hotness": 0.5, "sources": ["a.ru", "b.ru"]},
+    {"label": 2, "title": "Газпром", "hotness": 1, "sources": []},
+]
+
+
+def test_json_formats_roundtrip():
+    assert json.loads(b"".join(iter_json(ROWS, chunk_size=1))) == ROWS
+    lines = b"".join(iter_ndjson(ROWS, chunk_size=1)).decode("utf-8").splitlines()
+    assert [json.loads(x) for x in lines] == ROWS
+
+
+def test_csv_keeps_nested_values_as_json():
+    rows = list(csv.DictReader(io.StringIO(b"".join(iter_csv(ROWS, chunk_size=1)).decode("utf-8"))))
+    assert rows[0]["title"] == "Сбер" and json.loads(rows[0]["sources"]) == ["a.ru", "b.ru"]
+
+
+def test_parquet_with_late_keys_and_mixed_types(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    rows = [{"label": i, "hotness": 1, "title": "Сбер"} for i in range(5)]
+    rows += [{"label": 5, "hotness": 0.5, "title": 7, "dynamics": {"rolling_counts": {3600: 2, 86400: 5}}},
+             {"label": 6, "hotness": None, "flag": True}]
+    path = str(tmp_path / "rows.parquet")
+    write_parquet(rows, path, chunk_size=2)
+    table = pq.read_table(path)
+    assert table.column_names == ["label", "hotness", "title", "dynamics", "flag"]
+    assert str(table.schema.field("hotness").type) == "double"
+    assert str(table.schema.field("label").type) == "int64"
+    result = table.to_pylist()
+    assert result[5]["title"] == "7" and result[0]["title"] == "Сбер"
+    assert json.loads(result[5]["dynamics"]) == {"rolling_counts": {"3600": 2, "86400": 5}}
+    assert result[6]["flag"] is True and result[0]["flag"] is None and result[6]["hotness"] is None
+
+
+def test_export_cache_builds_once_and_evicts(tmp_path):
+    cache = ExportCache(str(tmp_path), max_files=1)
+    path = cache.build("clusters", 1, "json", ROWS)
+    assert cache.build("clusters", 1, "json", []) == path
+    assert cache.get("clusters", 1, "json") == path
+    cache.build("clusters", 2, "json", ROWS)
+    assert cache.get("clusters", 1, "json") is None
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.data_struct.news import NewsStruct
+from src.hotness import FEATURES, HotnessScorer, source_domain, top_k
+
+NOW = 1_700_000_000.0
+
+
+def _story(n, age, domain="https://www.rbc.ru/a"):
+    return [NewsStruct(NOW - age - i, f"{domain}{i}", "", "") for i in range(n)]
+
+
+def test_score_does_not_depend_on_other_stories():
+    scorer = HotnessScorer()
+    story = _story(5, 600)
+    alone = scorer.score([story], now=NOW)
+    with_newer = scorer.score([story, _story(3, 0)], now=NOW)
+    assert alone[0] == with_newer[0]
+
+
+def test_recency_uses_given_now():
+    scorer = HotnessScorer()
+    story = _story(5, 0)
+    fresh = scorer.score([story], now=NOW)[0]
+    stale = scorer.score([story], now=NOW + 3 * 86400)[0]
+    assert stale < fresh
+
+
+def test_features_and_range():
+    scorer = HotnessScorer()
+    clusters = [_story(10, 60), _story(1, 86400, "https://example.com/"), []]
+    features = scorer.features(clusters, now=NOW)
+    assert features.shape == (3, len(FEATURES))
+    assert features[0, FEATURES.index("size")] == 10
+    assert features[0, FEATURES.index("trust")] == pytest.approx(scorer.trust("rbc.ru"))
+    scores = scorer.score(clusters, now=NOW)
+    assert np.all((scores >= 1) & (scores <= 100))
+    assert scores[0] > scores[1]
+
+
+def test_source_domain_and_trust_fallback():
+    scorer = HotnessScorer()
+    assert source_domain("https://www.Interfax.ru/x") == "interfax.ru"
+    assert scorer.trust("news.tass.ru") == 1.0
+    assert scorer.trust("unknown.org") == scorer.default_trust
+
+
+def test_top_k():
+    scores = np.array([3.0, 9.0, 1.0, 7.0])
+    assert top_k(scores, 2) == [1, 3]
+    assert top_k(scores, 10) == [1, 3, 0, 2]
+    assert top_k(scores, 0) == []
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from src.job_manager import CANCELLED, FINISHED, JobManager
+
+
+def _wait(manager, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while manager.poll(job_id)["status"] not in (FINISHED, CANCELLED) and time.time() < deadline:
+        time.sleep(0.01)
+    return manager.poll(job_id)["status"]
+
+
+def test_waiting_exclusive_jobs_do_not_hold_workers():
+    manager = JobManager(workers=2)
+    release = threading.Event()
+    running, max_running = [0], [0]
+    lock = threading.Lock()
+
+    def exclusive(i, progress=None, cancel_event=None):
+        with lock:
+            running[0] += 1
+            max_running[0] = max(max_running[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+        return i
+
+    exclusive_ids = [manager.submit("process", exclusive, i, exclusive=True) for i in range(3)]
+    other = manager.submit("collect", lambda progress=None, cancel_event=None: "done")
+    assert _wait(manager, other) == FINISHED
+    assert manager.poll(exclusive_ids[2])["status"] == "queued"
+    assert manager.cancel(exclusive_ids[2])
+    assert manager.poll(exclusive_ids[2])["status"] == CANCELLED
+    release.set()
+    assert [_wait(manager, x) for x in exclusive_ids[:2]] == [FINISHED, FINISHED]
+    assert [manager.result(x) for x in exclusive_ids] == [0, 1, None]
+    assert max_running[0] == 1
+    manager.shutdown()
@@ -0,0 +1,18 @@
+from src.metrics import SIZE_BUCKETS, Metrics
+
+
+def test_prometheus_exports_http_histograms():
+    metrics = Metrics()
+    metrics.observe_http("a.ru", 0.2, 2000)
+    metrics.observe_http("a.ru", 0.4, 1 << 21)
+    metrics.observe_http("a.ru", 1.0, error="TimeoutError")
+    metrics.skip_http("a.ru", "too_large")
+    text = metrics.to_prometheus()
+    p = metrics.prefix
+    assert f"# TYPE {p}_http_response_size_bytes histogram" in text
+    assert f'{p}_http_response_size_bytes_bucket{{domain="a.ru",le="{SIZE_BUCKETS[0]}"}} 0' in text
+    assert f'{p}_http_response_size_bytes_bucket{{domain="a.ru",le="{SIZE_BUCKETS[1]}"}} 1' in text
+    assert f'{p}_http_response_size_bytes_bucket{{domain="a.ru",le="+Inf"}} 2' in text
+    assert f'{p}_http_response_size_bytes_count{{domain="a.ru"}} 2' in text
+    assert f'{p}_http_latency_seconds_count{{domain="a.ru"}} 3' in text
+    assert f'{p}_http_skipped_total{{domain="a.ru",reason="too_large"}} 1' in text
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+from sklearn.preprocessing import StandardScaler
+
+from src.neural_gas import BatchNeuralGas, NeuralGas
+
+
+@pytest.fixture(scope="module")
+def demo_blobs():
+    # the data of demonstrate_neural_gas
+    X, y_true = make_blobs(n_samples=300, centers=4, cluster_std=0.60, random_state=42)
+    return StandardScaler().fit_transform(X), y_true
+
+
+def test_quantization_error_not_worse_than_reference(demo_blobs):
+    X, y_true = demo_blobs
+    reference = NeuralGas(n_units=4, max_iter=100, random_state=42).fit(X)
+    for batch_size in (1, 32, 256):
+        model = BatchNeuralGas(n_units=4, max_iter=100, random_state=42, batch_size=batch_size).fit(X)
+        assert model.quantization_error(X) <= reference.quantization_error(X) * 1.1
+        assert adjusted_rand_score(y_true, model.labels_) == pytest.approx(1.0)
+
+
+def test_partial_fit_over_chunks_converges(demo_blobs):
+    X, y_true = demo_blobs
+    fitted = BatchNeuralGas(n_units=4, max_iter=50, random_state=0, batch_size=32).fit(X)
+    model = BatchNeuralGas(n_units=4, max_iter=50, random_state=0, batch_size=32)
+    rng = np.random.RandomState(0)
+    errors = []
+    for step in range(60):
+        model.partial_fit(X[rng.choice(X.shape[0], 64, replace=False)])
+        errors.append(model.quantization_error(X))
+    assert model.n_steps_ == 60
+    assert errors[-1] < errors[0]
+    assert errors[-1] <= fitted.quantization_error(X) * 1.1
+    assert adjusted_rand_score(y_true, model.predict(X)) == pytest.approx(1.0)
+
+
+def test_chunked_predict_equals_argmin():
+    rng = np.random.RandomState(1)
+    X = rng.normal(size=(1000, 16))
+    model = BatchNeuralGas(n_units=12, max_iter=3, random_state=1, chunk_size=37).fit(X)
+    distances = np.linalg.norm(X[:, None, :] - model.prototypes_[None, :, :], axis=2)
+    assert np.array_equal(model.predict(X), distances.argmin(axis=1))
+    assert model.quantization_error(X) == pytest.approx(distances.min(axis=1).mean())
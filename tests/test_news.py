@@ -0,0 +1,47 @@
+from src.data_struct import news
+from src.data_struct.news import (NewsRecord, NewsStruct, content_hash, intern_companies_entity,
+                                  intern_named_entity, news_timestamp, normalize_url)
+
+
+def test_interned_entities_are_shared():
+    assert intern_named_entity("org", "Сбербанк") is intern_named_entity("org", "Сбербанк")
+
+
+def test_intern_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(news, "INTERN_CACHE_SIZE", 10)
+    for i in range(100):
+        intern_named_entity("person", f"name {i}")
+    assert len(news._entities_cache) <= 10
+    # the most recently used entity survives
+    assert (news.NamedEntity, "person", "name 99") in news._entities_cache
+
+
+def test_intern_coerces_unhashable_llm_values():
+    entity = intern_companies_entity(["Сбер", "ВТБ"], {"forecast": "positive"})
+    assert entity.company_name == '["Сбер", "ВТБ"]'
+    assert entity.company_forecast == '{"forecast": "positive"}'
+    assert intern_named_entity("org", 5).name_text == "5"
+
+
+def test_default_pipeline_enriches_news_records(tmp_path, monkeypatch):
+    from benchmarks.fake_services import FAKE_TICKERS, FakeLLM, HashingEmbeddingsExtractor
+    from src.news_processor import NewsProcessor
+
+    monkeypatch.chdir(tmp_path)
+    processor = NewsProcessor(gpt_model=FakeLLM(0.0), emb_extr=HashingEmbeddingsExtractor(), tickers=FAKE_TICKERS,
+                              snapshot_dir=str(tmp_path / "snapshot"))
+    processor.process_news([NewsStruct(1.7e9 + i, f"https://rbc.ru/{i}", f"h{i}", "Сбербанк " * 50)
+                            for i in range(4)])
+    members = [x for cluster_list in processor.clusters_dict.values() for x in cluster_list]
+    assert len(members) == 4
+    assert all(type(x) is NewsRecord and x.embedding is not None for x in members)
+
+
+def test_news_record_from_news_keeps_fields():
+    news_struct = NewsStruct("2024-01-01T00:00:00Z", "https://www.rbc.ru/a?utm_source=x", "h", "t")
+    record = NewsRecord.from_news(news_struct)
+    assert (record.header, record.text, record.embedding) == ("h", "t", None)
+    assert NewsRecord.from_news(record) is record
+    assert content_hash(record) == content_hash(news_struct)
+    assert news_timestamp(record) == 1704067200.0
+    assert normalize_url(record.source_link) == "rbc.ru/a"
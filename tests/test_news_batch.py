@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.fake_services import FAKE_TICKERS, FakeLLM, HashingEmbeddingsExtractor
+from benchmarks.synthetic_news import make_news_corpus
+from src.data_struct.news import NewsRecord, NewsStruct, intern_named_entity
+from src.data_struct.news_batch import MISSING_TIMESTAMP, NewsBatch, ragged_encode
+from src.news_processor import NewsProcessor
+
+T = 1_700_000_000
+
+
+def _records():
+    records = []
+    for i, (entities, tickers) in enumerate([([("ORG", "Сбербанк"), ("PER", "Греф")], ["SBER"]),
+                                             (None, None),
+                                             ([("ORG", "Сбербанк")], ["SBER", "", "VTBR"])]):
+        record = NewsRecord.from_news(NewsStruct(None if i == 1 else T + i, f"https://rbc.ru/{i}", f"h{i}", f"t{i}"))
+        if entities is not None:
+            record.named_entities = [intern_named_entity(*x) for x in entities]
+        record.companies_tickers_list = tickers
+        records.append(record)
+    return records
+
+
+def test_ragged_encode_offsets_and_dictionary():
+    offsets, codes, dictionary = ragged_encode([["a", "b"], None, [], ["b", "c", "a"]])
+    assert offsets.tolist() == [0, 2, 2, 2, 5]
+    assert dictionary[codes].tolist() == ["a", "b", "b", "c", "a"]
+    assert dictionary.tolist() == ["a", "b", "c"]
+
+
+def test_from_news_list_columns():
+    batch = NewsBatch.from_news_list(_records())
+    assert len(batch) == 3 and batch.embeddings is None
+    assert batch.timestamps.tolist() == [T, MISSING_TIMESTAMP, T + 2]
+    assert [batch.domain(i) for i in range(3)] == ["rbc.ru"] * 3
+    assert batch.entities_of(0) == ["ORG:Сбербанк", "PER:Греф"] and batch.entities_of(1) == []
+    assert batch.tickers_of(2) == ["SBER", "VTBR"]
+    assert batch.ticker_mask(["VTBR"]).tolist() == [False, False, True]
+    assert batch.entity_mask(["ORG:Сбербанк"]).tolist() == [True, False, True]
+    taken = batch.take([2, 0])
+    assert taken.tickers_of(0) == ["SBER", "VTBR"] and taken.entities_of(1) == ["ORG:Сбербанк", "PER:Греф"]
+    restored = batch.to_news_list()
+    assert restored[1].date_time_ is None and restored[2].companies_tickers_list == ["SBER", "VTBR"]
+    assert restored[0].named_entities[1].name_text == "Греф"
+
+
+def test_to_frame():
+    batch = NewsBatch.from_news_list(_records())
+    batch.labels = np.array([0, -1, 0])
+    frame = batch.to_frame()
+    assert frame.columns.tolist() == ["published", "domain", "title", "url", "tickers", "cluster"]
+    assert frame["published"].isna().tolist() == [False, True, False]
+    assert frame["published"][0].timestamp() == T
+    assert frame["tickers"].tolist() == ["SBER", "", "SBER, VTBR"]
+    assert frame["domain"].tolist() == ["rbc.ru"] * 3 and frame["cluster"].tolist() == [0, -1, 0]
+
+
+def test_cluster_batch_keeps_story_bookkeeping(tmp_path):
+    items = make_news_corpus(60, start_timestamp=1.7e9, random_state=1)
+    news = [NewsStruct(datetime.fromtimestamp(x["published"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                       f"https://rbc.ru/{i}", x["title"], x["text"]) for i, x in enumerate(items)]
+    processor = NewsProcessor(online=True, gpt_model=FakeLLM(0.0), emb_extr=HashingEmbeddingsExtractor(),
+                              tickers=FAKE_TICKERS, archive_dir=None, snapshot_dir=str(tmp_path / "snapshot"))
+    batch = NewsBatch.from_news_list(news)
+    labels = processor.cluster_batch(batch)
+    assert batch.labels is labels and len(labels) == 60
+    assert processor.watermark == int(max(x["published"] for x in items))
+    assert processor.story_store.watermark == processor.watermark
+    members = [x for story in processor.clusterer.stories.values() for x in story.members]
+    assert len(members) == 60 and all(x is not None for x in members)
+    assert sum(len(x) for x in processor.clusters_dict.values()) == 60
+    assert {x.source_link for x in processor.clusters_dict[int(labels[0])]} >= {"https://rbc.ru/0"}
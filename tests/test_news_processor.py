@@ -0,0 +1,136 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+
+from benchmarks.fake_services import FAKE_TICKERS, FakeLLM, HashingEmbeddingsExtractor
+from benchmarks.synthetic_news import make_news_corpus
+from src.clusterization_step import select_representatives
+from src.data_struct.news import NewsStruct
+from src.news_processor import NewsProcessor
+from src.progress import Cancelled, ProgressState
+
+
+def _news(n: int, random_state: int = 0):
+    items = make_news_corpus(n, start_timestamp=1.7e9, random_state=random_state)
+    return [NewsStruct(datetime.fromtimestamp(x["published"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                       f"https://rbc.ru/{i}", x["title"], x["text"]) for i, x in enumerate(items)]
+
+
+def _processor(tmp_path, llm: FakeLLM, online: bool = False) -> NewsProcessor:
+    return NewsProcessor(online=online, gpt_model=llm, emb_extr=HashingEmbeddingsExtractor(),
+                         tickers=FAKE_TICKERS, archive_dir=None, snapshot_dir=str(tmp_path / "snapshot"))
+
+
+def test_pipelined_reports_stage_progress(tmp_path):
+    processor = _processor(tmp_path, FakeLLM(0.0))
+    state = ProgressState()
+    stories = processor.process_news_pipelined(_news(30), llm_workers=4, embed_batch_size=8, progress=state)
+    phases = state.snapshot()
+    for name in ("NE extraction", "Company and industry Classification", "Extract embeddings"):
+        assert phases[name]["status"] == "finished" and phases[name]["done"] == phases[name]["total"] == 30
+    assert phases["Clustering"]["status"] == phases["Summarizing"]["status"] == "finished"
+    assert sum(len(x["cluster_list"]) for x in processor.clusters_analysed_dict.values()) == 30
+    assert len(stories) == len(processor.clusters_analysed_dict)
+
+
+def test_pipelined_cancel_event_stops_the_pipeline(tmp_path):
+    llm = FakeLLM(0.05)
+    processor = _processor(tmp_path, llm)
+    news = _news(200)
+    cancel_event, state = threading.Event(), ProgressState()
+    threading.Timer(0.2, cancel_event.set).start()
+    started = time.perf_counter()
+    with pytest.raises(Cancelled):
+        processor.process_news_pipelined(news, llm_workers=2, progress=state, cancel_event=cancel_event)
+    assert time.perf_counter() - started < 2.0
+    # without cancellation: 200 news x (1 NE + 2 classification) calls
+    assert llm.calls < 100
+    assert state.cancelled
+
+
+def test_cluster_first_enriches_only_representatives(tmp_path):
+    processor = _processor(tmp_path, FakeLLM(0.0))
+    # hashed unit-norm embeddings: the default eps=3 would put everything in one cluster
+    processor.clusterer = DBSCAN(eps=0.9, min_samples=2)
+    enriched, resolve_calls, extract_ne = [], [], processor.neextr.extract_ne_from_news
+    extract, resolve_tickers = processor.company_classificator.extract, processor.company_classificator.resolve_tickers
+
+    def counting_extract_ne(news_struct):
+        enriched.append(news_struct.source_link)
+        return extract_ne(news_struct)
+
+    def unresolved_extract(news_struct, resolve=True):
+        assert not resolve
+        return extract(news_struct, resolve)
+
+    def counting_resolve(news_structs_list):
+        resolve_calls.append(len(news_structs_list))
+        return resolve_tickers(news_structs_list)
+
+    processor.neextr.extract_ne_from_news = counting_extract_ne
+    processor.company_classificator.extract = unresolved_extract
+    processor.company_classificator.resolve_tickers = counting_resolve
+    state = ProgressState()
+    processor.process_news_cluster_first(_news(60), n_representatives=3, progress=state)
+
+    noise = processor.clusters_dict[-1]
+    assert noise and len(processor.clusters_dict) > 2
+    expected = {x.source_link for x in noise}
+    for label, cluster_list in processor.clusters_dict.items():
+        if label == -1:
+            continue
+        idx = select_representatives(np.stack([x.embedding for x in cluster_list]), 3)
+        representatives = [cluster_list[i] for i in idx]
+        expected |= {x.source_link for x in representatives}
+        companies = {x.company_name for r in representatives for x in r.companies_names_list}
+        tickers = {t for r in representatives for t in r.companies_tickers_list}
+        for news_struct in cluster_list:
+            if news_struct in representatives:
+                continue
+            assert {x.company_name for x in news_struct.companies_names_list} == companies
+            assert set(news_struct.companies_tickers_list) == tickers
+            assert {(x.name_type, x.name_text) for x in news_struct.named_entities} == \
+                {(x.name_type, x.name_text) for r in representatives for x in r.named_entities}
+    assert sorted(enriched) == sorted(expected) and len(enriched) < 60
+    assert resolve_calls == [len(enriched)]
+    assert all(t for x in noise for t in x.companies_tickers_list)
+    phase = state.snapshot()["Representatives enrichment"]
+    assert phase["status"] == "finished" and phase["done"] == len(enriched)
+
+
+def test_incremental_batch_mode_diff_over_overlapping_windows(tmp_path):
+    llm = FakeLLM(0.0)
+    processor = _processor(tmp_path, llm)
+    processor.clusterer = DBSCAN(eps=0.9, min_samples=2)
+    news = _news(60)
+    first = processor.process_news_incremental(news[:40])
+    assert not first["updated"] and not first["unchanged"]
+    first_members = {frozenset(x["timeline"]) for x in first["new"]}
+    assert set().union(*first_members) == {x.source_link for x in news[:40]}
+
+    # the same window again: nothing goes to the LLM, every story is reused
+    calls = llm.calls
+    again = processor.process_news_incremental(news[:40])
+    assert llm.calls == calls
+    assert not again["new"] and not again["updated"]
+    assert {frozenset(x["timeline"]) for x in again["unchanged"]} == first_members
+
+    # the window moves by 20 news: only they are enriched, stories are split by their members
+    enriched, extract_ne = [], processor.neextr.extract_ne_from_news
+    processor.neextr.extract_ne_from_news = lambda x: enriched.append(x.source_link) or extract_ne(x)
+    shifted = processor.process_news_incremental(news[20:])
+    assert sorted(enriched) == sorted(x.source_link for x in news[40:])
+    old_urls, fresh_urls = {x.source_link for x in news[20:40]}, {x.source_link for x in news[40:]}
+    stories = shifted["new"] + shifted["updated"] + shifted["unchanged"]
+    assert set().union(*(x["timeline"] for x in stories)) == old_urls | fresh_urls
+    assert shifted["new"] and shifted["updated"] and shifted["unchanged"]
+    for story in shifted["new"]:
+        assert set(story["timeline"]) <= fresh_urls
+    for story in shifted["updated"]:
+        assert set(story["timeline"]) & old_urls
+    for story in shifted["unchanged"]:
+        assert frozenset(story["timeline"]) in first_members
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+from src.data_struct.news import (CompaniesEntity, IndustryEntity, NamedEntity, NewsStruct, NewsStructCompany,
+                                  NewsStructNE)
+from src.news_store import NewsStore
+
+
+def _enriched(url, tickers, published=datetime(2024, 1, 1, tzinfo=timezone.utc), text="Сбербанк отчитался"):
+    news = NewsStructNE(NewsStruct(published, url, "Заголовок", text), [NamedEntity("ORG", "Сбербанк")])
+    return NewsStructCompany(news, [IndustryEntity("Банки", "up")],
+                             [CompaniesEntity("Сбербанк", "up")] * len(tickers), tickers)
+
+
+def test_upsert_and_query(tmp_path):
+    with NewsStore(str(tmp_path / "news.sqlite")) as store:
+        store.upsert_news([
+            {"url": "https://a.ru/1", "published": "2024-01-01T10:00:00+00:00", "title": "Газпром", "text": "нефть"},
+            {"url": "https://b.ru/2", "published": "2024-01-02T10:00:00+00:00", "title": "Сбер", "text": "банк"},
+            {"title": "без ссылки"},
+        ])
+        assert store.count() == 2
+        assert [x["url"] for x in store.query(domain="b.ru")] == ["https://b.ru/2"]
+        assert [x["url"] for x in store.search("нефть")] == ["https://a.ru/1"]
+        assert [x["url"] for x in store.iter_range(batch_size=1)] == ["https://a.ru/1", "https://b.ru/2"]
+        rows, total = store.page(text_query="газ", order_by="published_ts")
+        assert total == 1 and rows[0]["url"] == "https://a.ru/1"
+
+
+def test_upsert_enrichments_inserts_missing_and_keeps_fetched_fields(tmp_path):
+    with NewsStore(str(tmp_path / "news.sqlite")) as store:
+        store.upsert_news([{"url": "https://a.ru/1", "published": "2024-01-01T00:00:00+00:00",
+                            "title": "Полный заголовок", "text": "полный текст"}])
+        written = store.upsert_enrichments([_enriched("https://a.ru/1", ["SBER", "SBER", ""]),
+                                            _enriched("https://b.ru/2", ["VTBR"])], story_ids=[7, 8])
+        assert written == 2
+        row = store.get("https://a.ru/1")
+        assert row["title"] == "Полный заголовок" and row["story_id"] == 7
+        assert row["enrichment"]["tickers"] == ["SBER", "SBER", ""]
+        assert store.get("https://b.ru/2")["story_id"] == 8
+        assert [x["url"] for x in store.query(ticker="SBER")] == ["https://a.ru/1"]
+
+        store.upsert_enrichments([_enriched("https://a.ru/1", ["GAZP"])])
+        assert store.query(ticker="SBER") == []
+        assert store.get("https://a.ru/1")["story_id"] == 7
+
+
+def test_ticker_rows_follow_publication_time(tmp_path):
+    with NewsStore(str(tmp_path / "news.sqlite")) as store:
+        store.upsert_enrichments([_enriched("https://a.ru/1", ["SBER"])])
+        new_time = datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp()
+        store.upsert_news([{"url": "https://a.ru/1", "published": "2024-03-01T00:00:00+00:00", "title": "t"}])
+        assert [x["url"] for x in store.query(ticker="SBER", since=new_time)] == ["https://a.ru/1"]
+        ticker_ts = store.connection.execute("SELECT published_ts FROM news_tickers").fetchall()
+        assert [x[0] for x in ticker_ts] == [int(new_time)]
+
+
+def test_none_story_id_keeps_stored_one(tmp_path):
+    with NewsStore(str(tmp_path / "news.sqlite")) as store:
+        store.upsert_enrichments([_enriched("https://a.ru/1", ["SBER"])], story_ids=[3])
+        store.upsert_enrichments([_enriched("https://a.ru/1", ["SBER"]), _enriched("https://b.ru/2", [])],
+                                 story_ids=[None, None])
+        assert store.get("https://a.ru/1")["story_id"] == 3
+        assert store.get("https://b.ru/2")["story_id"] is None
@@ -0,0 +1,35 @@
+import numpy as np
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.synthetic_news import make_news_embeddings
+from src.online_clustering import CentroidIndex, OnlineClusterizator, Story
+
+
+def test_default_thresholds_recover_planted_stories():
+    data = make_news_embeddings(n_items=2000, story_spread=1.0, noise_rate=0.0, random_state=1)
+    labels = OnlineClusterizator().partial_fit_predict(list(data["embeddings"]), None,
+                                                       data["timestamps"].tolist())
+    assert adjusted_rand_score(data["labels"], labels) > 0.85
+    sizes = np.bincount(labels)
+    assert (sizes > 1).sum() < 1.3 * len(set(data["labels"].tolist()))
+
+
+def test_story_ids_are_stable_across_calls():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((2, 64))
+    clusterizator = OnlineClusterizator()
+    first = clusterizator.partial_fit_predict([centers[0], centers[1]], timestamps=[1.0, 2.0])
+    second = clusterizator.partial_fit_predict([centers[1] + 0.01, centers[0] + 0.01], timestamps=[3.0, 4.0])
+    assert second.tolist() == first[::-1].tolist()
+    assert clusterizator.stories[int(first[0])].last_update == 4.0
+
+
+def test_index_candidates_include_dirty_and_skip_removed():
+    rng = np.random.default_rng(0)
+    stories = {i: Story(i, x / np.linalg.norm(x)) for i, x in enumerate(rng.standard_normal((20, 16)))}
+    index = CentroidIndex()
+    index.rebuild(stories)
+    index.remove(3)
+    index.touch(5)
+    candidates = index.candidates(stories[3].centroid, 4)
+    assert 3 not in candidates and candidates[0] == 5
@@ -0,0 +1,43 @@
+import random
+import time
+
+import pytest
+
+from src.pipeline_executor import Stage, StagedPipeline
+
+
+def test_results_keep_input_order_with_workers_and_batches():
+    def slow_square(x):
+        time.sleep(random.random() * 0.002)
+        return x * x
+
+    stages = [Stage("square", slow_square, workers=4, queue_size=4),
+              Stage("plus one", lambda batch: [x + 1 for x in batch], workers=2, batch_size=8)]
+    assert StagedPipeline(stages, show_progress=False).run(list(range(200))) == [x * x + 1 for x in range(200)]
+
+
+def test_stage_error_is_raised_by_run():
+    def fail_on_seven(x):
+        if x == 7:
+            raise ValueError("bad item")
+        return x
+
+    pipeline = StagedPipeline([Stage("check", fail_on_seven, workers=2), Stage("copy", lambda x: x)],
+                              show_progress=False)
+    with pytest.raises(ValueError, match="bad item"):
+        pipeline.run(list(range(100)))
+
+
+def test_cancel_keeps_finished_items():
+    pipeline = None
+
+    def first(x):
+        if x == 10:
+            pipeline.cancel("first")
+        return x
+
+    pipeline = StagedPipeline([Stage("first", first, queue_size=2), Stage("second", lambda x: -x)],
+                              show_progress=False)
+    results = pipeline.run(list(range(1000)))
+    assert 0 < len(results) < 1000
+    assert results == [-x for x in range(len(results))]
@@ -0,0 +1,29 @@
+from src.data_struct.news import NewsStruct
+from src.provenance import INDEPENDENT, ORIGIN, REPRINT, REWRITE, UNKNOWN, ProvenanceAnalyzer, shingle_hashes
+
+T = 1_700_000_000.0
+BASE = " ".join(f"слово{i}" for i in range(200))
+
+
+def _news(i, text, header=""):
+    return NewsStruct(T + 60 * i, f"https://example.com/{i}", header, text)
+
+
+def test_roles_follow_publication_order():
+    rewrite = BASE.replace("слово1 ", "иное ").replace("слово5", "другое").replace("слово9", "третье")
+    story = [_news(3, " ".join(f"иное{i}" for i in range(200))), _news(1, BASE), _news(0, BASE),
+             _news(2, " ".join(BASE.split()[:120] + [f"новое{i}" for i in range(80)])), _news(4, rewrite)]
+    result = ProvenanceAnalyzer().analyse(story)
+    assert [x["url"] for x in result] == [f"https://example.com/{i}" for i in range(5)]
+    assert [x["role"] for x in result[:4]] == [ORIGIN, REPRINT, REWRITE, INDEPENDENT]
+    assert result[1]["parent"] == "https://example.com/0" and result[0]["similarity"] is None
+    assert result[4]["role"] in (REPRINT, REWRITE) and result[4]["parent"] is not None
+
+
+def test_texts_without_words_are_not_reprints():
+    assert len(shingle_hashes("  \n ")) == 0
+    story = [_news(0, ""), _news(1, "   "), _news(2, BASE), _news(3, "..."), _news(4, BASE)]
+    result = ProvenanceAnalyzer().analyse(story)
+    assert [x["role"] for x in result] == [UNKNOWN, UNKNOWN, ORIGIN, UNKNOWN, REPRINT]
+    assert result[4]["parent"] == "https://example.com/2"
+    assert all(x["parent"] is None for x in result[:4])
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.data_struct.news import NewsStruct
+from src.quotes import QuoteStore
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = QuoteStore(str(tmp_path / "quotes"))
+    times = START + 60 * np.arange(600)
+    store.write({
+        "SBER": (times, 100.0 + 0.1 * np.arange(600)),
+        "GAZP": (times[::-1], np.full(600, 50.0)),
+    })
+    return store
+
+
+def test_reopen_is_memory_mapped(store):
+    reopened = QuoteStore(store.directory)
+    assert reopened.tickers == store.tickers
+    assert isinstance(reopened.columns["close"], np.memmap)
+    assert isinstance(reopened.keys, np.memmap)
+    assert np.array_equal(reopened.keys, QuoteStore._build_keys(reopened.tickers, reopened.columns["timestamps"]))
+
+
+def test_store_without_keys_column(store):
+    os.remove(os.path.join(store.directory, "keys.npy"))
+    reopened = QuoteStore(store.directory)
+    assert not isinstance(reopened.keys, np.memmap)
+    t = START + 300 * 60 + 30
+    assert np.array_equal(reopened.price_asof(["SBER", "GAZP"], [t, t]), store.price_asof(["SBER", "GAZP"], [t, t]))
+
+
+def test_price_asof(store):
+    t = START + 300 * 60 + 30
+    prices = store.price_asof(["SBER", "GAZP", "UNKNOWN", "SBER"], [t, t, t, START - 1])
+    assert prices[0] == pytest.approx(130.0)
+    assert prices[1] == 50.0
+    assert np.isnan(prices[2]) and np.isnan(prices[3])
+    assert np.isnan(store.price_asof(["SBER"], [t], max_staleness=10)[0])
+
+
+def test_reactions_match_brute_force(store):
+    t = START + 300 * 60 + 30
+    features = store.reactions(["SBER", "SBER"], [t, t - 7200], horizons=[3600])
+    close = 100.0 + 0.1 * np.arange(600)
+    log_returns = np.diff(np.log(close))
+    assert features["pre_return_3600"][0] == pytest.approx(close[300] / close[240] - 1)
+    assert features["post_return_3600"][0] == pytest.approx(close[360] / close[300] - 1)
+    assert features["pre_return_3600"][1] == pytest.approx(close[180] / close[120] - 1)
+    assert features["pre_volatility_3600"][0] == pytest.approx(log_returns[240:300].std())
+
+
+def test_post_window_without_later_candle_is_nan(store):
+    after_last_quote = START + 600 * 60 + 10
+    features = store.reactions(["SBER"], [after_last_quote], horizons=[300])
+    assert np.isnan(features["post_return_300"][0])
+    assert np.isnan(features["post_volatility_300"][0])
+    assert not np.isnan(features["pre_return_300"][0])
+
+
+def test_rewrite_keeps_mapped_readers_valid(store):
+    reader = QuoteStore(store.directory)
+    before = np.array(reader.columns["close"][:10])
+    store.write({"SBER": (START + 60 * np.arange(10), np.full(10, 1.0))})
+    assert np.array_equal(np.array(reader.columns["close"][:10]), before)
+    assert QuoteStore(store.directory).tickers == {"SBER": [0, 10]}
+
+
+def test_story_reactions_use_first_publication(store):
+    first = NewsStruct(START + 100 * 60, "http://a", "", "")
+    first.companies_tickers_list = ["SBER"]
+    later = NewsStruct(START + 200 * 60, "http://b", "", "")
+    later.companies_tickers_list = ["SBER", "GAZP"]
+    reactions = store.story_reactions([later, first], horizons=[600])
+    assert set(reactions) == {"SBER", "GAZP"}
+    assert reactions["SBER"]["post_return_600"] == pytest.approx(111.0 / 110.0 - 1)
@@ -0,0 +1,67 @@
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.fake_services import FAKE_TICKERS, FakeLLM, HashingEmbeddingsExtractor
+from benchmarks.synthetic_news import make_news_corpus
+from src.data_struct.news import NewsRecord, NewsStruct, intern_companies_entity, intern_industry_entity
+from src.news_processor import NewsProcessor
+from src.snapshot import load_snapshot, save_snapshot, save_snapshot_clusters
+
+
+def _records(n, offset=0):
+    records = []
+    for i in range(n):
+        record = NewsRecord.from_news(NewsStruct(1.7e9 + i, f"https://rbc.ru/{offset + i}", f"h{i}", f"текст {i}"))
+        record.named_entities = []
+        record.industry_list = [intern_industry_entity("Banks", "positive")]
+        record.companies_names_list = [intern_companies_entity("Сбербанк", "positive")]
+        record.companies_tickers_list = ["SBER"]
+        record.embedding = np.full(4, i, dtype=np.float32)
+        records.append(record)
+    return records
+
+
+def test_roundtrip(tmp_path):
+    path = str(tmp_path / "snapshot")
+    save_snapshot(path, _records(5), labels=[0, 0, 1, 1, -1], clusters=[{"headline": "x"}])
+    snapshot = load_snapshot(path)
+    assert len(snapshot) == 5
+    assert snapshot.batch.texts[3] == "текст 3"
+    assert snapshot.batch.labels.tolist() == [0, 0, 1, 1, -1]
+    assert snapshot.companies_of(2) == [["Сбербанк", "positive", "SBER"]]
+    assert snapshot.clusters == [{"headline": "x"}]
+    restored = snapshot.to_news_list()
+    assert restored[4].companies_tickers_list == ["SBER"]
+    assert np.array_equal(restored[4].embedding, np.full(4, 4, dtype=np.float32))
+
+
+def test_rewrite_keeps_mapped_snapshot_readable(tmp_path):
+    path = str(tmp_path / "snapshot")
+    save_snapshot(path, _records(5), labels=[0] * 5)
+    reader = load_snapshot(path)
+    save_snapshot(path, _records(2, offset=100), labels=[1, 1])
+    save_snapshot_clusters(path, [{"headline": "new"}])
+    assert reader.batch.texts[4] == "текст 4"
+    assert reader.batch.embeddings[4][0] == 4
+    fresh = load_snapshot(path)
+    assert len(fresh) == 2 and fresh.clusters == [{"headline": "new"}]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["snapshot"]
+
+
+def test_online_snapshot_keeps_all_live_stories(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    items = make_news_corpus(120, start_timestamp=1.7e9, random_state=1)
+    news = [NewsStruct(datetime.fromtimestamp(x["published"], timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                       f"https://rbc.ru/{i}", x["title"], x["text"]) for i, x in enumerate(items)]
+    processor = NewsProcessor(online=True, gpt_model=FakeLLM(0.0), emb_extr=HashingEmbeddingsExtractor(),
+                              tickers=FAKE_TICKERS, archive_dir=None, snapshot_dir=str(tmp_path / "snapshot"))
+    processor.process_news_incremental(news[:60])
+    processor.process_news_incremental(news[60:])
+    snapshot = load_snapshot(str(tmp_path / "snapshot"))
+    n_live = sum(story.count for story in processor.clusterer.stories.values())
+    assert len(snapshot) == n_live == 120
+    with open(tmp_path / "snapshot" / "clusters.json", encoding="utf-8") as f:
+        clusters = json.load(f)
+    assert {x["dedup_group"] for x in clusters} == set(snapshot.batch.labels.tolist())
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import numpy as np
+
+from src.online_clustering import OnlineClusterizator
+from src.story_store import StoryStore
+
+T = 1_700_000_000.0
+
+
+def _store(tmp_path, **kwargs):
+    clusterizator = OnlineClusterizator()
+    return clusterizator, StoryStore(clusterizator, timedelta(hours=1), str(tmp_path / "archive"), **kwargs)
+
+
+def _orthogonal(n, dim=32):
+    return list(np.eye(dim, dtype=np.float32)[:n])
+
+
+def test_stories_outside_horizon_are_archived(tmp_path):
+    clusterizator, store = _store(tmp_path)
+    timestamps = [T, T + 600, T + 7200]
+    labels = clusterizator.partial_fit_predict(_orthogonal(3), timestamps=timestamps)
+    store.observe(timestamps)
+    assert sorted(store.advance()) == sorted(labels[:2].tolist())
+    assert list(clusterizator.stories) == [int(labels[2])]
+    assert store.load_archived_embeddings(int(labels[0])).shape == (1, 32)
+
+
+def test_live_stories_are_capped(tmp_path):
+    clusterizator, store = _store(tmp_path, max_stories=2)
+    timestamps = [T + 30, T, T + 20, T + 10]
+    labels = clusterizator.partial_fit_predict(_orthogonal(4), timestamps=timestamps)
+    store.observe(timestamps)
+    assert sorted(store.advance()) == sorted(labels[[1, 3]].tolist())
+    assert sorted(clusterizator.stories) == sorted(labels[[0, 2]].tolist())
+    assert len(clusterizator.index.story_ids) == 2
+
+
+def test_future_timestamp_does_not_evict_live_stories(tmp_path):
+    clusterizator, store = _store(tmp_path)
+    timestamps = store.clamp([T, T + 600, T + 365 * 86400], now=T + 900)
+    assert timestamps[2] == T + 900 + store.max_skew.total_seconds()
+    labels = clusterizator.partial_fit_predict(_orthogonal(3), timestamps=timestamps)
+    store.observe([T, T + 600, T + 365 * 86400, None], now=T + 900)
+    assert store.watermark == timestamps[2]
+    assert store.advance() == []
+    assert sorted(clusterizator.stories) == sorted(labels.tolist())
@@ -0,0 +1,40 @@
+from src.story_timeline import StoryTimeline
+
+T = 1_700_000_000.0
+
+
+def test_rolling_counts_incremental_match_rebuild():
+    times = [T + 100 * i for i in range(50)] + [T + 250, T + 4000]
+    timeline = StoryTimeline()
+    timeline.extend(times)
+    rebuilt = StoryTimeline.from_timestamps(times)
+    assert timeline.rolling_counts() == rebuilt.rolling_counts()
+    end = max(times)
+    expected = {w: sum(end - w < x <= end for x in times) for w in timeline.windows}
+    assert timeline.rolling_counts() == expected
+    assert timeline.rolling_counts(T + 1000) == {w: sum(T + 1000 - w < x <= T + 1000 for x in times)
+                                                for w in timeline.windows}
+
+
+def test_unknown_timestamps_are_counted_but_not_placed():
+    timeline = StoryTimeline.from_timestamps([None, T, None])
+    assert timeline.count == 3
+    assert timeline.arrivals == [T]
+
+
+def test_burst_is_measured_at_now():
+    # quiet baseline over the day, then five publications within ten minutes
+    times = [T - 3600 * h for h in range(1, 20, 4)] + [T - 60 * i for i in range(5)]
+    timeline = StoryTimeline.from_timestamps(times)
+    assert timeline.signals(T)["burst"]
+    silent = timeline.signals(T + 3 * 86400)
+    assert not silent["burst"]
+    assert silent["velocity"] == 0
+    assert silent["measured_at"] == T + 3 * 86400
+
+
+def test_narrative_expires_when_story_goes_silent():
+    times = [T - 3600 * h - 60 * i for h in range(4) for i in range(h % 2 + 1)]
+    timeline = StoryTimeline.from_timestamps(times)
+    assert timeline.signals(T)["narrative"]
+    assert not timeline.signals(T + 86400)["narrative"]
@@ -0,0 +1,27 @@
+import pytest
+
+from src.models.ticker_resolver import TickerResolver, normalize_company_name
+
+TICKERS = {"Сбербанк России": "SBER", "Сбербанк России ап": "SBERP", "Газпром": "GAZP", "ЛУКОЙЛ": "LKOH",
+           "Банк ВТБ": "VTBR"}
+
+
+def test_normalized_names_match_across_forms():
+    assert normalize_company_name("ПАО «Газпром»") == normalize_company_name("Газпрома")
+    assert normalize_company_name("Gazprom") == normalize_company_name("газпром")
+
+
+def test_resolve_by_table_aliases_and_fuzzy():
+    pytest.importorskip("rapidfuzz")
+    resolver = TickerResolver(TICKERS)
+    assert resolver.resolve_many(["Сбербанк", "Sber", "ПАО Газпром", "Лукойлу", "ВТБ", "Сбербнк", "банк",
+                                  "Apple", None]) == ["SBER", "SBER", "GAZP", "LKOH", "VTBR", "SBER", "", "", ""]
+
+
+def test_memo_keeps_recent_names_only():
+    resolver = TickerResolver(TICKERS, max_memo=2)
+    assert resolver.resolve_many(["Газпром", "Лукойл", "Газпром"]) == ["GAZP", "LKOH", "GAZP"]
+    resolver.resolve("Apple")
+    assert list(resolver._memo) == ["Газпром", "Apple"]
+    assert resolver.resolve("Лукойл") == "LKOH"
+    assert len(resolver._memo) == 2